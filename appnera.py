@@ -5,16 +5,44 @@ AppNEra - A new era for web apps on Linux
 Modern GUI for creating lightweight web app wrappers
 """
 
-import os
-import shutil
+import argparse
+import json
 import subprocess
-import threading
+import sys
 from pathlib import Path
 from tkinter import filedialog
-from typing import Optional
+from typing import List, Optional
 
 import customtkinter as ctk
 
+from build import build_app, discard_build, failed_builds, resume_build, switch_runtime
+from core import (
+    APPS_DIR,
+    GOVERNOR_AUTOSTART,
+    ZYGOTE_AUTOSTART,
+    disable_governor,
+    disable_zygote,
+    enable_governor,
+    enable_zygote,
+    dir_size,
+    governor_pids,
+    installed_app_dirs,
+    list_apps,
+    load_thumbnail,
+    read_app_config,
+    sync_apps,
+    uninstall_app,
+    write_app_config,
+    zygote_pids,
+)
+from desktop import reconcile_desktop_entries
+from preview import keep_preview_ready, start_preview
+from monitor import ResourceSampler
+from perflog import describe_perf, read_perf_log, summarize_perf
+from runtime import find_system_runtime, find_webkit_runtime
+from storage import cache_usage, compact_apps, find_orphans, remove_orphans, storage_budget, storage_usage
+from tasks import TaskRunner
+
 # Color Palette
 COLORS = {
     "bg_primary": "#1a1b26",
@@ -28,6 +56,9 @@ COLORS = {
     "input_bg": "#1f2335",
 }
 
+# How often worker results are applied to the UI (about 30 frames per second)
+UI_FRAME_MS = 33
+
 
 class AppNEraGUI(ctk.CTk):
     """Main AppNEra application window"""
@@ -49,8 +80,24 @@ class AppNEraGUI(ctk.CTk):
 
         # Font size multiplier (default 1.2 = Large)
         self.font_multiplier = 1.2
+        # Resource monitor sampling interval in seconds
+        self.monitor_interval = 2.0
         self._load_settings()
 
+        # Live resource usage of running apps, keyed by app id
+        self.apps = []
+        self.usage = {}
+        self.app_rows = {}
+        self.apps_list_order = []
+        self.sort_key = "Name"
+        self.details_app = None
+        self.details_request = None
+
+        # File system and subprocess work runs on a pool; results come back
+        # through one queue drained on the UI thread every frame
+        self.tasks = TaskRunner()
+        self._drain_tasks()
+
         # Build UI
         self._create_header()
         self._create_tabview()
@@ -61,6 +108,33 @@ class AppNEraGUI(ctk.CTk):
         # Loading overlay (initially hidden)
         self.loading_overlay = None
 
+        # Sample running apps on a worker thread
+        self.monitor = ResourceSampler(
+            get_apps=lambda: self.apps,
+            on_sample=lambda usage: self.tasks.progress("usage", self._on_usage_sample, usage),
+            interval=self.monitor_interval,
+        )
+        self.monitor.start()
+
+        # Trim caches of apps that are over their cache budget and not running
+        self.tasks.submit(lambda: compact_apps(installed_app_dirs()))
+
+        # Drop launchers and icons left behind by apps deleted outside AppNEra
+        self.tasks.submit(reconcile_desktop_entries)
+        # Previews start from a ready environment (skipped while it would need a download)
+        self.tasks.submit(keep_preview_ready)
+
+    def _drain_tasks(self):
+        """Apply queued worker results, then schedule the next frame"""
+        try:
+            self.tasks.drain()
+        finally:
+            self.after(UI_FRAME_MS, self._drain_tasks)
+
+    def _report_progress(self, message: str):
+        """Show a build step in the loading overlay (safe from worker threads)"""
+        self.tasks.progress("loading", self._update_loading_message, message)
+
     def _configure_colors(self):
         """Configure custom color theme"""
         self.configure(fg_color=COLORS["bg_primary"])
@@ -151,7 +225,7 @@ class AppNEraGUI(ctk.CTk):
 
         self.url_entry = ctk.CTkEntry(
             form_frame,
-            placeholder_text="https://website.com/login",
+            placeholder_text="https://website.com/login  (add more URLs, separated by spaces, to get tabs)",
             height=44,
             fg_color=COLORS["input_bg"],
             border_color=COLORS["border"],
@@ -211,7 +285,50 @@ class AppNEraGUI(ctk.CTk):
             anchor="w",
             command=self._select_icon,
         )
-        self.icon_btn.pack(fill="x", pady=(0, 32))
+        self.icon_btn.pack(fill="x", pady=(0, 24))
+
+        # Optional network-level blocking of ads and trackers
+        self.block_requests_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            form_frame,
+            text="Block ads and trackers (uses host lists in ~/.config/appnera/blocklists)",
+            variable=self.block_requests_var,
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+            text_color=COLORS["text_primary"],
+            fg_color=COLORS["accent"],
+            border_color=COLORS["border"],
+        ).pack(anchor="w", pady=(0, 12))
+
+        # Web engine; enabled once the system WebKitGTK has been found
+        self.webkit_var = ctk.BooleanVar(value=False)
+        self.webkit_check = ctk.CTkCheckBox(
+            form_frame,
+            text="Use the system WebKitGTK engine (looking for it...)",
+            variable=self.webkit_var,
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+            text_color=COLORS["text_primary"],
+            fg_color=COLORS["accent"],
+            border_color=COLORS["border"],
+            state="disabled",
+        )
+        self.webkit_check.pack(anchor="w", pady=(0, 32))
+        self.tasks.submit(find_webkit_runtime, on_done=self._on_webkit_probed)
+
+        # Preview button: a disposable window, no build
+        self.preview_btn = ctk.CTkButton(
+            form_frame,
+            text="👁  Preview",
+            height=40,
+            fg_color=COLORS["input_bg"],
+            hover_color=COLORS["border"],
+            border_color=COLORS["border"],
+            border_width=1,
+            text_color=COLORS["text_primary"],
+            font=("Ubuntu", int(13 * self.font_multiplier)),
+            corner_radius=8,
+            command=self._preview_url,
+        )
+        self.preview_btn.pack(fill="x", pady=(0, 12))
 
         # Create button
         self.create_btn = ctk.CTkButton(
@@ -266,6 +383,47 @@ class AppNEraGUI(ctk.CTk):
         )
         list_title.pack(pady=(16, 8), padx=16, anchor="w")
 
+        # Sort order for the apps list
+        self.sort_selector = ctk.CTkSegmentedButton(
+            left_panel,
+            values=["Name", "Memory", "CPU"],
+            fg_color=COLORS["bg_secondary"],
+            selected_color=COLORS["accent"],
+            selected_hover_color=COLORS["accent"],
+            unselected_color=COLORS["input_bg"],
+            text_color=COLORS["text_primary"],
+            font=("Ubuntu", int(11 * self.font_multiplier)),
+            command=self._on_sort_change,
+        )
+        self.sort_selector.set(self.sort_key)
+        self.sort_selector.pack(fill="x", padx=16, pady=(0, 8))
+
+        # Apply template improvements to every installed app
+        self.update_apps_btn = ctk.CTkButton(
+            left_panel,
+            text="⟳  Update All Apps",
+            height=36,
+            fg_color=COLORS["input_bg"],
+            hover_color=COLORS["border"],
+            text_color=COLORS["text_primary"],
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+            command=self._update_all_apps,
+        )
+        self.update_apps_btn.pack(side="bottom", fill="x", padx=16, pady=(0, 16))
+
+        # Check all apps and repair whatever is broken
+        self.doctor_btn = ctk.CTkButton(
+            left_panel,
+            text="🩺  Check & Repair Apps",
+            height=36,
+            fg_color=COLORS["input_bg"],
+            hover_color=COLORS["border"],
+            text_color=COLORS["text_primary"],
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+            command=self._run_doctor,
+        )
+        self.doctor_btn.pack(side="bottom", fill="x", padx=16, pady=(0, 8))
+
         # Scrollable apps list
         self.apps_list_frame = ctk.CTkScrollableFrame(
             left_panel,
@@ -315,12 +473,47 @@ class AppNEraGUI(ctk.CTk):
                 text_color="white",
             )
 
+    def _on_webkit_probed(self, webkit: Optional[dict]):
+        """Offer the WebKitGTK engine if the system has it"""
+        if webkit is None:
+            self.webkit_check.configure(text="Use the system WebKitGTK engine (not installed)")
+        else:
+            self.webkit_check.configure(
+                text=f"Use the system WebKitGTK {webkit['webkit']} engine instead of QtWebEngine",
+                state="normal",
+            )
+
+    def _preview_url(self):
+        """Open the entered URL in a disposable window on the preview environment"""
+        url = next(iter(self.url_entry.get().split()), "")
+        if not url.startswith(("http://", "https://")):
+            self._show_status("❌ URL must start with http:// or https://", COLORS["danger"])
+            return
+        self.preview_btn.configure(state="disabled")
+        self._show_status("Opening preview...", COLORS["text_secondary"])
+        self.tasks.submit(
+            start_preview,
+            url,
+            on_done=lambda _: self._on_preview_opened(None),
+            on_error=lambda e: self._on_preview_opened(str(e)),
+        )
+
+    def _on_preview_opened(self, error_msg: Optional[str]):
+        """Called on main thread once the preview has started or failed to"""
+        self.preview_btn.configure(state="normal")
+        if error_msg is None:
+            self._show_status("👁  Preview opened; close its window to discard it", COLORS["text_secondary"])
+        else:
+            self._show_status(f"❌ Preview failed: {error_msg}", COLORS["danger"])
+
     def _create_app(self):
         """Handle app creation"""
-        # Get values
-        url = self.url_entry.get().strip()
+        # Get values; further URLs become tabs of the same window
+        url, *tab_urls = self.url_entry.get().split() or [""]
         name = self.name_entry.get().strip()
         icon_path = self.selected_icon_path
+        block_requests = self.block_requests_var.get()
+        backend = "webkitgtk" if self.webkit_var.get() else "qtwebengine"
 
         # Validate
         if not url:
@@ -335,30 +528,31 @@ class AppNEraGUI(ctk.CTk):
             self._show_status("❌ Please select an app icon", COLORS["danger"])
             return
 
-        if not url.startswith(("http://", "https://")):
+        if not all(u.startswith(("http://", "https://")) for u in (url, *tab_urls)):
             self._show_status("❌ URL must start with http:// or https://", COLORS["danger"])
             return
 
+        if tab_urls and backend == "webkitgtk":
+            self._show_status("❌ Apps with several URLs need the QtWebEngine engine", COLORS["danger"])
+            return
+
         # Show loading overlay
         self._show_loading("Creating your app...")
         self.create_btn.configure(state="disabled")
         self.update()
 
-        # Run app creation in a separate thread to keep UI responsive
-        def build_thread():
-            try:
-                self._build_app(url, name, icon_path)
-                
-                # Schedule UI updates on main thread
-                self.after(0, self._on_build_success)
-                
-            except Exception as e:
-                # Schedule error handling on main thread
-                self.after(0, lambda: self._on_build_error(str(e)))
-        
-        # Start the build process in background
-        thread = threading.Thread(target=build_thread, daemon=True)
-        thread.start()
+        # Build on a worker to keep the UI responsive
+        self.tasks.submit(
+            self._build_app,
+            url,
+            name,
+            icon_path,
+            block_requests,
+            backend,
+            tab_urls,
+            on_done=lambda _: self._on_build_success(),
+            on_error=lambda e: self._on_build_error(str(e)),
+        )
     
     def _on_build_success(self):
         """Called on main thread when build succeeds"""
@@ -374,6 +568,8 @@ class AppNEraGUI(ctk.CTk):
             fg_color=COLORS["input_bg"],
             text_color=COLORS["text_secondary"],
         )
+        self.block_requests_var.set(False)
+        self.webkit_var.set(False)
         
         # Refresh manage tab
         self._refresh_apps_list()
@@ -382,107 +578,65 @@ class AppNEraGUI(ctk.CTk):
     def _on_build_error(self, error_msg: str):
         """Called on main thread when build fails"""
         self._hide_loading()
-        self._show_status(f"❌ Error: {error_msg}", COLORS["danger"])
+        self._show_status(f"❌ Error: {error_msg}\nCreate the app again to resume the build", COLORS["danger"])
         self.create_btn.configure(state="normal")
+        # The failed build is listed in the Manage Apps tab
+        self._refresh_apps_list()
 
-    def _build_app(self, url: str, name: str, icon_path: Optional[str]):
-        """Build the web app using the template"""
-        app_id = name.lower().replace(" ", "-")
-        app_dir = Path.home() / ".local" / name
-        template_dir = Path(__file__).parent / "template"
-
-        # Check if app already exists
-        if app_dir.exists():
-            raise ValueError(f"App '{name}' already exists")
-
-        # Create app directory
-        self.after(0, lambda: self._update_loading_message("Creating app directory..."))
-        app_dir.mkdir(parents=True, exist_ok=True)
-
-        try:
-            # Copy template files
-            self.after(0, lambda: self._update_loading_message("Copying template files..."))
-            shutil.copy(template_dir / "app.py", app_dir / "app.py")
-            shutil.copy(template_dir / "uninstall.sh", app_dir / "uninstall.sh")
-            os.chmod(app_dir / "uninstall.sh", 0o755)
-
-            # Copy selected icon
-            self.after(0, lambda: self._update_loading_message("Setting up icon..."))
-            if not Path(icon_path).exists():
-                raise ValueError("Selected icon file not found")
-            shutil.copy(icon_path, app_dir / "icon.png")
-
-            # Create isolated venv
-            self.after(0, lambda: self._update_loading_message("Creating Python environment..."))
-            subprocess.run(
-                ["python3", "-m", "venv", str(app_dir / "venv")],
-                check=True,
-                capture_output=True,
-            )
-
-            # Install PyQt5 dependencies in venv (fully self-contained, no system packages needed)
-            self.after(0, lambda: self._update_loading_message("Installing dependencies (this may take a moment)..."))
-            pip_path = app_dir / "venv" / "bin" / "pip"
-            subprocess.run(
-                [str(pip_path), "install", "PyQt5", "PyQtWebEngine"],
-                check=True,
-                capture_output=True,
-            )
-
-            # Create launcher script
-            self.after(0, lambda: self._update_loading_message("Creating launcher..."))
-            launcher_path = app_dir / "run.sh"
-            launcher_content = f"""#!/usr/bin/env bash
-set -euo pipefail
-
-export APPNERA_APP_NAME="{name}"
-export APPNERA_APP_ID="{app_id}"
-export APPNERA_URL="{url}"
-
-exec "{app_dir / 'venv' / 'bin' / 'python'}" "{app_dir / 'app.py'}"
-"""
-            launcher_path.write_text(launcher_content)
-            os.chmod(launcher_path, 0o755)
-
-            # Create .desktop entry
-            self.after(0, lambda: self._update_loading_message("Registering app..."))
-            desktop_content = f"""[Desktop Entry]
-Name={name}
-Comment={name}
-Exec={app_dir / 'run.sh'}
-Icon={app_dir / 'icon.png'}
-Terminal=false
-Type=Application
-Categories=Network;WebBrowser;
-"""
-            desktop_path = app_dir / f"{app_id}.desktop"
-            desktop_path.write_text(desktop_content)
+    def _resume_build(self, build: dict):
+        """Retry a failed build from its last checkpoint"""
+        self._show_loading(f"Resuming {build['name']}...")
+        self.tasks.submit(
+            resume_build,
+            build["path"],
+            on_progress=self._report_progress,
+            on_done=lambda _: self._on_resume_finished(build, None),
+            on_error=lambda e: self._on_resume_finished(build, str(e)),
+        )
 
-            # Link to user applications
-            desktop_dir = Path.home() / ".local" / "share" / "applications"
-            desktop_dir.mkdir(parents=True, exist_ok=True)
-            desktop_link = desktop_dir / f"{app_id}.desktop"
-            
-            if desktop_link.exists():
-                desktop_link.unlink()
-            desktop_link.symlink_to(desktop_path)
-
-            # Link icon
-            icon_dir = Path.home() / ".local" / "share" / "icons"
-            icon_dir.mkdir(parents=True, exist_ok=True)
-            icon_link = icon_dir / f"{app_id}.png"
-            
-            if icon_link.exists():
-                icon_link.unlink()
-            icon_link.symlink_to(app_dir / "icon.png")
-            
-            self.after(0, lambda: self._update_loading_message("Finalizing..."))
+    def _on_resume_finished(self, build: dict, error_msg: Optional[str]):
+        """Called on main thread when a resumed build finished or failed again"""
+        self._hide_loading()
+        self._refresh_apps_list()
+        for widget in self.right_panel.winfo_children():
+            widget.destroy()
+        self.details_app = None
+        if error_msg is None:
+            text, color = f"{build['name']} was created successfully!", COLORS["success"]
+        else:
+            text, color = f"Building {build['name']} failed again:\n{error_msg}", COLORS["danger"]
+        self.empty_state = ctk.CTkLabel(
+            self.right_panel,
+            text=text,
+            font=("Ubuntu", int(14 * self.font_multiplier)),
+            text_color=color,
+            wraplength=500,
+        )
+        self.empty_state.pack(expand=True)
 
-        except Exception as e:
-            # Cleanup on failure
-            if app_dir.exists():
-                shutil.rmtree(app_dir)
-            raise e
+    def _discard_build(self, build: dict):
+        """Delete a failed build"""
+        self.tasks.submit(discard_build, build["path"], on_done=lambda _: self._refresh_apps_list())
+
+    def _build_app(
+        self,
+        url: str,
+        name: str,
+        icon_path: Optional[str],
+        block_requests: bool = False,
+        backend: str = "qtwebengine",
+        tab_urls: Optional[List[str]] = None,
+    ):
+        """Build the web app using the template (runs on a worker thread).
+
+        A failed build keeps its finished stages; creating the same app
+        again resumes it (see build.py).
+        """
+        build_app(
+            name, url, icon_path, block_requests,
+            on_progress=self._report_progress, backend=backend, tab_urls=tab_urls,
+        )
+        self._report_progress("Finalizing...")
 
     def _build_settings_tab(self):
         """Build the Settings tab"""
@@ -590,6 +744,129 @@ Categories=Network;WebBrowser;
             )
             btn.pack(side="left", padx=4)
 
+        # Resource Monitor Section
+        monitor_section = ctk.CTkFrame(
+            content_frame,
+            fg_color=COLORS["input_bg"],
+            corner_radius=8,
+        )
+        monitor_section.pack(fill="x", pady=(0, 16))
+
+        ctk.CTkLabel(
+            monitor_section,
+            text="Resource Monitor",
+            font=("Ubuntu", int(16 * self.font_multiplier), "bold"),
+            text_color=COLORS["text_primary"],
+            anchor="w",
+        ).pack(anchor="w", padx=16, pady=(16, 8))
+
+        ctk.CTkLabel(
+            monitor_section,
+            text="How often running apps are sampled for the Manage Apps tab",
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+            text_color=COLORS["text_secondary"],
+            anchor="w",
+        ).pack(anchor="w", padx=16, pady=(0, 12))
+
+        interval_frame = ctk.CTkFrame(monitor_section, fg_color="transparent")
+        interval_frame.pack(fill="x", padx=16, pady=(0, 16))
+
+        self.monitor_interval_selector = ctk.CTkSegmentedButton(
+            interval_frame,
+            values=["1s", "2s", "5s", "10s"],
+            fg_color=COLORS["bg_secondary"],
+            selected_color=COLORS["accent"],
+            selected_hover_color=COLORS["accent"],
+            unselected_color=COLORS["bg_secondary"],
+            text_color=COLORS["text_primary"],
+            font=("Ubuntu", int(11 * self.font_multiplier)),
+            command=lambda value: self._set_monitor_interval(float(value.rstrip("s"))),
+        )
+        self.monitor_interval_selector.set(f"{self.monitor_interval:g}s")
+        self.monitor_interval_selector.pack(side="left")
+
+        self.governor_var = ctk.BooleanVar(value=GOVERNOR_AUTOSTART.exists())
+        ctk.CTkSwitch(
+            monitor_section,
+            text="Free memory of hidden apps when the system runs low",
+            variable=self.governor_var,
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+            text_color=COLORS["text_primary"],
+            progress_color=COLORS["accent"],
+            command=self._toggle_governor,
+        ).pack(anchor="w", padx=16, pady=(0, 16))
+
+        # App Startup Section
+        startup_section = ctk.CTkFrame(
+            content_frame,
+            fg_color=COLORS["input_bg"],
+            corner_radius=8,
+        )
+        startup_section.pack(fill="x", pady=(0, 16))
+
+        ctk.CTkLabel(
+            startup_section,
+            text="App Startup",
+            font=("Ubuntu", int(16 * self.font_multiplier), "bold"),
+            text_color=COLORS["text_primary"],
+            anchor="w",
+        ).pack(anchor="w", padx=16, pady=(16, 8))
+
+        ctk.CTkLabel(
+            startup_section,
+            text="Keep Qt loaded in a small background process from login so apps open faster",
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+            text_color=COLORS["text_secondary"],
+            anchor="w",
+        ).pack(anchor="w", padx=16, pady=(0, 12))
+
+        self.zygote_var = ctk.BooleanVar(value=ZYGOTE_AUTOSTART.exists())
+        ctk.CTkSwitch(
+            startup_section,
+            text="Prelaunch apps",
+            variable=self.zygote_var,
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+            text_color=COLORS["text_primary"],
+            progress_color=COLORS["accent"],
+            command=self._toggle_zygote,
+        ).pack(anchor="w", padx=16, pady=(0, 16))
+
+        # Storage Section
+        storage_section = ctk.CTkFrame(
+            content_frame,
+            fg_color=COLORS["input_bg"],
+            corner_radius=8,
+        )
+        storage_section.pack(fill="x", pady=(0, 16))
+
+        ctk.CTkLabel(
+            storage_section,
+            text="Storage",
+            font=("Ubuntu", int(16 * self.font_multiplier), "bold"),
+            text_color=COLORS["text_primary"],
+            anchor="w",
+        ).pack(anchor="w", padx=16, pady=(16, 8))
+
+        ctk.CTkLabel(
+            storage_section,
+            text="Remove web data and caches left behind by apps that were uninstalled",
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+            text_color=COLORS["text_secondary"],
+            anchor="w",
+        ).pack(anchor="w", padx=16, pady=(0, 12))
+
+        self.orphans_btn = ctk.CTkButton(
+            storage_section,
+            text="🧹  Remove Orphaned Data",
+            height=32,
+            fg_color=COLORS["bg_secondary"],
+            hover_color=COLORS["border"],
+            text_color=COLORS["text_primary"],
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+            command=self._remove_orphaned_storage,
+        )
+        self.orphans_btn.pack(anchor="w", padx=16, pady=(0, 16))
+
         # Info note
         info_frame = ctk.CTkFrame(
             content_frame,
@@ -621,7 +898,35 @@ Categories=Network;WebBrowser;
         self.font_size_label.configure(text=f"Size: {int(value * 100)}%")
         self._save_settings()
         self._apply_font_changes()
-    
+
+    def _toggle_governor(self):
+        """Enable or disable the memory governor in the background"""
+        self.tasks.submit(enable_governor if self.governor_var.get() else disable_governor)
+
+    def _toggle_zygote(self):
+        """Enable or disable the prelauncher in the background"""
+        self.tasks.submit(enable_zygote if self.zygote_var.get() else disable_zygote)
+
+    def _remove_orphaned_storage(self):
+        """Delete storage of uninstalled apps in the background"""
+        self.orphans_btn.configure(state="disabled", text="Cleaning up...")
+
+        self.tasks.submit(
+            lambda: remove_orphans(find_orphans(installed_app_dirs())),
+            on_done=self._on_orphans_removed,
+        )
+
+    def _on_orphans_removed(self, freed: int):
+        """Called on main thread when orphaned storage was removed"""
+        if self.orphans_btn.winfo_exists():
+            self.orphans_btn.configure(state="normal", text=f"✓  Freed {freed / (1024 * 1024):.0f} MB")
+
+    def _set_monitor_interval(self, value: float):
+        """Set the resource monitor sampling interval in seconds"""
+        self.monitor_interval = value
+        self.monitor.interval = value
+        self._save_settings()
+
     def _apply_font_changes(self):
         """Apply font size changes to all tabs by rebuilding them"""
         # Remember current tab
@@ -655,31 +960,52 @@ Categories=Network;WebBrowser;
                     for line in f:
                         if line.startswith("font_multiplier="):
                             self.font_multiplier = float(line.split("=")[1].strip())
+                        elif line.startswith("monitor_interval="):
+                            self.monitor_interval = float(line.split("=")[1].strip())
         except Exception:
             pass
     
     def _save_settings(self):
-        """Save settings to config file"""
+        """Save settings to config file (written on a worker)"""
         config_dir = Path.home() / ".config" / "appnera"
-        config_dir.mkdir(parents=True, exist_ok=True)
-        config_file = config_dir / "settings.conf"
-        
-        try:
-            with open(config_file, "w") as f:
-                f.write(f"font_multiplier={self.font_multiplier}\n")
-        except Exception:
-            pass
+        content = f"font_multiplier={self.font_multiplier}\nmonitor_interval={self.monitor_interval}\n"
+
+        def write_settings():
+            try:
+                config_dir.mkdir(parents=True, exist_ok=True)
+                (config_dir / "settings.conf").write_text(content)
+            except OSError:
+                pass
+
+        self.tasks.submit(write_settings)
 
     def _refresh_apps_list(self):
-        """Refresh the list of created apps"""
+        """Refresh the list of created apps (scanned on a worker)"""
+        self.tasks.submit(self._load_apps_list, on_done=lambda result: self._show_apps_list(*result))
+
+    def _load_apps_list(self) -> tuple:
+        """Find all apps and failed builds and load the list icons (worker thread)"""
+        apps = list_apps()
+        for app in apps:
+            app["list_icon"] = load_thumbnail(app["path"] / "icon.png", 32)
+        return apps, failed_builds()
+
+    def _show_apps_list(self, apps: list, builds: list):
+        """Rebuild the apps list from a scan"""
+        if not self.apps_list_frame.winfo_exists():
+            return
         # Clear existing list
         for widget in self.apps_list_frame.winfo_children():
             widget.destroy()
 
-        # Find all apps
-        apps = self._get_created_apps()
+        self.apps = apps
+        self.app_rows = {}
+        self.apps_list_order = [app["id"] for app in apps]
 
-        if not apps:
+        if builds:
+            self._show_failed_builds(builds)
+
+        if not apps and not builds:
             empty_label = ctk.CTkLabel(
                 self.apps_list_frame,
                 text="No apps created yet\n\nGo to Create App tab\nto build your first app",
@@ -698,18 +1024,24 @@ Categories=Network;WebBrowser;
                 fg_color="transparent",
             )
             app_frame.pack(fill="x", pady=2, padx=4)
+
+            # Live memory usage column (filled in by the resource monitor)
+            usage_label = ctk.CTkLabel(
+                app_frame,
+                text="",
+                width=70,
+                anchor="e",
+                font=("Ubuntu", int(11 * self.font_multiplier)),
+                text_color=COLORS["text_secondary"],
+            )
+            usage_label.pack(side="right", padx=(4, 8))
+            self.app_rows[app["id"]] = {"frame": app_frame, "usage_label": usage_label, "app": app}
             
-            # Try to load and display the app icon
+            # Display the app icon, if it could be loaded
             icon_image = None
-            try:
-                from PIL import Image
-                icon_path = app["path"] / "icon.png"
-                if icon_path.exists():
-                    img = Image.open(icon_path)
-                    img = img.resize((32, 32), Image.Resampling.LANCZOS)
-                    icon_image = ctk.CTkImage(light_image=img, dark_image=img, size=(32, 32))
-            except Exception:
-                pass
+            if app["list_icon"] is not None:
+                img = app["list_icon"]
+                icon_image = ctk.CTkImage(light_image=img, dark_image=img, size=(32, 32))
             
             # Create button with icon and text
             app_btn = ctk.CTkButton(
@@ -731,31 +1063,184 @@ Categories=Network;WebBrowser;
             if icon_image:
                 app_btn.icon_image = icon_image
 
-    def _get_created_apps(self) -> list:
-        """Get list of created apps"""
-        apps = []
-        local_dir = Path.home() / ".local"
+        self._update_usage_column()
+
+    def _show_failed_builds(self, builds: list):
+        """List unfinished builds with resume and discard actions"""
+        ctk.CTkLabel(
+            self.apps_list_frame,
+            text="Unfinished Builds",
+            font=("Ubuntu", int(12 * self.font_multiplier), "bold"),
+            text_color=COLORS["danger"],
+            anchor="w",
+        ).pack(fill="x", padx=8, pady=(4, 2))
+
+        for build in builds:
+            build_frame = ctk.CTkFrame(self.apps_list_frame, fg_color=COLORS["input_bg"], corner_radius=8)
+            build_frame.pack(fill="x", pady=2, padx=4)
+
+            ctk.CTkLabel(
+                build_frame,
+                text=build["name"],
+                font=("Ubuntu", int(13 * self.font_multiplier)),
+                text_color=COLORS["text_primary"],
+                anchor="w",
+            ).pack(fill="x", padx=8, pady=(6, 0))
 
-        if not local_dir.exists():
-            return apps
+            stage = build.get("failed_stage")
+            ctk.CTkLabel(
+                build_frame,
+                text=f"Failed at: {stage}" if stage else "Interrupted",
+                font=("Ubuntu", int(10 * self.font_multiplier)),
+                text_color=COLORS["text_secondary"],
+                anchor="w",
+            ).pack(fill="x", padx=8)
+
+            actions = ctk.CTkFrame(build_frame, fg_color="transparent")
+            actions.pack(fill="x", padx=8, pady=(4, 8))
+            ctk.CTkButton(
+                actions,
+                text="Resume",
+                width=80,
+                height=26,
+                fg_color=COLORS["accent"],
+                hover_color="#5a7fc7",
+                text_color="white",
+                font=("Ubuntu", int(11 * self.font_multiplier)),
+                command=lambda b=build: self._resume_build(b),
+            ).pack(side="left", padx=(0, 4))
+            ctk.CTkButton(
+                actions,
+                text="Discard",
+                width=80,
+                height=26,
+                fg_color=COLORS["bg_secondary"],
+                hover_color=COLORS["danger"],
+                text_color=COLORS["text_primary"],
+                font=("Ubuntu", int(11 * self.font_multiplier)),
+                command=lambda b=build: self._discard_build(b),
+            ).pack(side="left")
 
-        for item in local_dir.iterdir():
-            if item.is_dir() and (item / "app.py").exists() and (item / "run.sh").exists():
-                apps.append({
-                    "name": item.name,
-                    "path": item,
-                    "id": item.name.lower().replace(" ", "-"),
-                })
+        if self.apps:
+            ctk.CTkLabel(
+                self.apps_list_frame,
+                text="Installed",
+                font=("Ubuntu", int(12 * self.font_multiplier), "bold"),
+                text_color=COLORS["text_secondary"],
+                anchor="w",
+            ).pack(fill="x", padx=8, pady=(8, 2))
+
+    def _on_sort_change(self, value: str):
+        """Re-sort the apps list by the selected column"""
+        self.sort_key = value
+        self._update_usage_column()
+
+    def _on_usage_sample(self, usage: dict):
+        """Apply a resource monitor sample to the UI (main thread)"""
+        self.usage = usage
+        self._update_usage_column()
+        self._update_usage_details()
+
+    def _update_usage_column(self):
+        """Show live memory usage in the apps list and apply the sort order"""
+        rows = [row for row in self.app_rows.values() if row["frame"].winfo_exists()]
+        for row in rows:
+            usage = self.usage.get(row["app"]["id"])
+            row["usage_label"].configure(text=f"{usage['pss'] / (1024 * 1024):.0f} MB" if usage else "")
+
+        if self.sort_key == "Memory":
+            rows.sort(key=lambda r: -self.usage.get(r["app"]["id"], {}).get("pss", -1))
+        elif self.sort_key == "CPU":
+            rows.sort(key=lambda r: -self.usage.get(r["app"]["id"], {}).get("cpu", -1))
+        else:
+            rows.sort(key=lambda r: r["app"]["name"])
+
+        # Only re-pack when the order actually changed
+        order = [row["app"]["id"] for row in rows]
+        if order != self.apps_list_order:
+            self.apps_list_order = order
+            for row in rows:
+                row["frame"].pack_forget()
+            for row in rows:
+                row["frame"].pack(fill="x", pady=2, padx=4)
+
+    def _update_usage_details(self):
+        """Refresh the live usage figures and sparklines of the selected app"""
+        if self.details_app is None or not self.details_usage_label.winfo_exists():
+            return
+        usage = self.usage.get(self.details_app["id"])
+        if usage is None:
+            self.details_usage_label.configure(text="Status: Not running")
+        else:
+            self.details_usage_label.configure(
+                text=(
+                    f"Status: Running ({len(usage['pids'])} processes)\n"
+                    f"Memory: {usage['pss'] / (1024 * 1024):.0f} MB PSS, "
+                    f"{usage['rss'] / (1024 * 1024):.0f} MB RSS\n"
+                    f"CPU: {usage['cpu']:.1f}%"
+                )
+            )
+        for key, (canvas, color) in self.details_sparklines.items():
+            self._draw_sparkline(canvas, usage[key] if usage else [], color)
 
-        return sorted(apps, key=lambda x: x["name"])
+    def _draw_sparkline(self, canvas, values: list, color: str):
+        """Draw a small line chart of recent values on a canvas"""
+        canvas.delete("all")
+        if len(values) < 2:
+            return
+        width = int(canvas.cget("width"))
+        height = int(canvas.cget("height"))
+        peak = max(values) or 1
+        step = width / (len(values) - 1)
+        points = []
+        for i, value in enumerate(values):
+            points.extend([i * step, height - 2 - (value / peak) * (height - 4)])
+        canvas.create_line(*points, fill=color, width=2)
 
     def _show_app_details(self, app: dict):
-        """Show details for selected app"""
+        """Show details for selected app (its files are read on a worker)"""
+        self.details_request = app
+        self.tasks.submit(self._load_app_details, app, on_done=lambda details: self._render_app_details(app, details))
+
+    def _load_app_details(self, app: dict) -> dict:
+        """Read what the details panel shows, except sizes (worker thread)"""
+        details = {"icon": load_thumbnail(app["path"] / "icon.png", 64), "config": read_app_config(app["path"])}
+
+        try:
+            with open(app["path"] / "blocked.json", "r") as f:
+                stats = json.load(f)
+            top_hosts = ", ".join(list(stats.get("top_hosts", {}))[:3])
+            details["blocked_stats"] = (
+                f"Blocked requests: {stats.get('session_blocked', 0)} last session, "
+                f"{stats.get('total_blocked', 0)} total"
+                + (f"\nMost blocked: {top_hosts}" if top_hosts else "")
+            )
+        except (OSError, ValueError, AttributeError):
+            details["blocked_stats"] = "Blocked requests: none recorded"
+
+        try:
+            allowlist = (app["path"] / "allowlist.txt").read_text()
+            details["allowlist"] = " ".join(line.strip() for line in allowlist.splitlines() if line.strip())
+        except OSError:
+            details["allowlist"] = ""
+
+        details["perf"] = summarize_perf(read_perf_log(app["path"]))
+        details["budget_mb"] = storage_budget(app["path"]) // (1024 * 1024)
+        # Probed once per session, so only the first details view waits for it
+        details["system_runtime"] = find_system_runtime()
+        return details
+
+    def _render_app_details(self, app: dict, details: dict):
+        """Build the details panel from data loaded by _load_app_details"""
+        # Another app was selected while this one was loading
+        if self.details_request is not app or not self.right_panel.winfo_exists():
+            return
+
         # Clear right panel
         for widget in self.right_panel.winfo_children():
             widget.destroy()
 
-        details_frame = ctk.CTkFrame(self.right_panel, fg_color="transparent")
+        details_frame = ctk.CTkScrollableFrame(self.right_panel, fg_color="transparent")
         details_frame.pack(fill="both", expand=True, padx=24, pady=24)
 
         # Top section with icon and name
@@ -763,23 +1248,17 @@ Categories=Network;WebBrowser;
         header_frame.pack(anchor="w", pady=(0, 16), fill="x")
         
         # App icon (larger version)
-        try:
-            from PIL import Image
-            icon_path = app["path"] / "icon.png"
-            if icon_path.exists():
-                img = Image.open(icon_path)
-                img = img.resize((64, 64), Image.Resampling.LANCZOS)
-                icon_image = ctk.CTkImage(light_image=img, dark_image=img, size=(64, 64))
-                
-                icon_label = ctk.CTkLabel(
-                    header_frame,
-                    image=icon_image,
-                    text="",
-                )
-                icon_label.pack(side="left", padx=(0, 16))
-                icon_label.icon_image = icon_image  # Keep reference
-        except Exception:
-            pass
+        if details["icon"] is not None:
+            img = details["icon"]
+            icon_image = ctk.CTkImage(light_image=img, dark_image=img, size=(64, 64))
+            
+            icon_label = ctk.CTkLabel(
+                header_frame,
+                image=icon_image,
+                text="",
+            )
+            icon_label.pack(side="left", padx=(0, 16))
+            icon_label.icon_image = icon_image  # Keep reference
         
         # App name next to icon
         name_container = ctk.CTkFrame(header_frame, fg_color="transparent")
@@ -804,18 +1283,73 @@ Categories=Network;WebBrowser;
         )
         path_label.pack(anchor="w", pady=4)
 
-        # Calculate size
-        total_size = sum(f.stat().st_size for f in app["path"].rglob("*") if f.is_file())
-        size_mb = total_size / (1024 * 1024)
+        # Size (calculated on a worker, the venv alone has thousands of files)
         size_label = ctk.CTkLabel(
             details_frame,
-            text=f"Size: {size_mb:.1f} MB",
+            text="Size: calculating...",
             font=("Ubuntu", int(12 * self.font_multiplier)),
             text_color=COLORS["text_secondary"],
             anchor="w",
         )
         size_label.pack(anchor="w", pady=4)
 
+        def show_size(total_size: int):
+            if size_label.winfo_exists():
+                size_label.configure(text=f"Size: {total_size / (1024 * 1024):.1f} MB")
+
+        self.tasks.submit(dir_size, app["path"], on_done=show_size)
+
+        # Live resource usage (updated by the resource monitor)
+        self.details_app = app
+        self.details_usage_label = ctk.CTkLabel(
+            details_frame,
+            text="",
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+            text_color=COLORS["text_secondary"],
+            anchor="w",
+            justify="left",
+        )
+        self.details_usage_label.pack(anchor="w", pady=4)
+
+        sparklines_frame = ctk.CTkFrame(details_frame, fg_color="transparent")
+        sparklines_frame.pack(anchor="w", fill="x", pady=(8, 0))
+        self.details_sparklines = {}
+        for key, title, color in [("rss_history", "Memory", COLORS["accent"]), ("cpu_history", "CPU", COLORS["success"])]:
+            column = ctk.CTkFrame(sparklines_frame, fg_color="transparent")
+            column.pack(side="left", padx=(0, 24))
+            ctk.CTkLabel(
+                column,
+                text=title,
+                font=("Ubuntu", int(11 * self.font_multiplier)),
+                text_color=COLORS["text_secondary"],
+                anchor="w",
+            ).pack(anchor="w")
+            canvas = ctk.CTkCanvas(
+                column,
+                width=240,
+                height=48,
+                bg=COLORS["input_bg"],
+                highlightthickness=0,
+            )
+            canvas.pack(anchor="w")
+            self.details_sparklines[key] = (canvas, color)
+        self._update_usage_details()
+
+        # Recorded page load times
+        self._build_perf_section(details_frame, details["perf"])
+
+        # Request blocking
+        self._build_blocking_section(details_frame, app, details)
+
+        # Web storage usage and budget
+        self._build_storage_section(details_frame, app, details["budget_mb"])
+
+        # Priority and memory limit
+        self._build_resources_section(details_frame, app, details)
+
+        # Private or system PyQt5
+        self._build_runtime_section(details_frame, app, details)
+
         # Spacer
         ctk.CTkFrame(details_frame, fg_color="transparent", height=32).pack()
 
@@ -833,6 +1367,403 @@ Categories=Network;WebBrowser;
         )
         uninstall_btn.pack(fill="x", pady=(16, 0))
 
+    def _build_perf_section(self, parent, summary: dict):
+        """Show percentiles and the trend of the app's recorded page loads"""
+        section = ctk.CTkFrame(parent, fg_color=COLORS["input_bg"], corner_radius=8)
+        section.pack(fill="x", pady=(16, 0))
+
+        ctk.CTkLabel(
+            section,
+            text=describe_perf(summary),
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+            text_color=COLORS["text_secondary"],
+            anchor="w",
+            justify="left",
+        ).pack(anchor="w", padx=16, pady=(12, 4))
+
+        if len(summary["history"]) >= 2:
+            canvas = ctk.CTkCanvas(
+                section,
+                width=240,
+                height=48,
+                bg=COLORS["bg_secondary"],
+                highlightthickness=0,
+            )
+            canvas.pack(anchor="w", padx=16, pady=(0, 12))
+            self._draw_sparkline(canvas, summary["history"], COLORS["accent"])
+
+    def _build_blocking_section(self, parent, app: dict, details: dict):
+        """Build the request blocking toggle, allowlist and counters"""
+        config = details["config"]
+
+        section = ctk.CTkFrame(parent, fg_color=COLORS["input_bg"], corner_radius=8)
+        section.pack(fill="x", pady=(16, 0))
+
+        block_var = ctk.BooleanVar(value=config.get("block_requests") == "1")
+        ctk.CTkSwitch(
+            section,
+            text="Block ads and trackers (applies on next launch)",
+            variable=block_var,
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+            text_color=COLORS["text_primary"],
+            progress_color=COLORS["accent"],
+            command=lambda: self.tasks.submit(
+                write_app_config, app["path"], {"block_requests": "1" if block_var.get() else "0"}
+            ),
+        ).pack(anchor="w", padx=16, pady=(12, 4))
+
+        ctk.CTkLabel(
+            section,
+            text=details["blocked_stats"],
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+            text_color=COLORS["text_secondary"],
+            anchor="w",
+            justify="left",
+        ).pack(anchor="w", padx=16, pady=4)
+
+        # Allowlist (hosts never blocked for this app)
+        allowlist_path = app["path"] / "allowlist.txt"
+        allow_frame = ctk.CTkFrame(section, fg_color="transparent")
+        allow_frame.pack(fill="x", padx=16, pady=(4, 12))
+        allow_entry = ctk.CTkEntry(
+            allow_frame,
+            placeholder_text="Always allow hosts, e.g. cdn.example.com",
+            fg_color=COLORS["bg_secondary"],
+            border_color=COLORS["border"],
+            text_color=COLORS["text_primary"],
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+        )
+        allow_entry.insert(0, details["allowlist"])
+        allow_entry.pack(side="left", fill="x", expand=True, padx=(0, 8))
+
+        def save_allowlist():
+            hosts = allow_entry.get().replace(",", " ").split()
+            self.tasks.submit(allowlist_path.write_text, "".join(f"{host}\n" for host in hosts))
+
+        ctk.CTkButton(
+            allow_frame,
+            text="Save",
+            width=80,
+            fg_color=COLORS["accent"],
+            hover_color="#5a7fc7",
+            text_color="white",
+            command=save_allowlist,
+        ).pack(side="right")
+
+    def _build_storage_section(self, parent, app: dict, budget_mb: int):
+        """Build the web storage usage breakdown, budget and compaction button"""
+        section = ctk.CTkFrame(parent, fg_color=COLORS["input_bg"], corner_radius=8)
+        section.pack(fill="x", pady=(16, 0))
+
+        usage_label = ctk.CTkLabel(
+            section,
+            text="Web storage: measuring...",
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+            text_color=COLORS["text_secondary"],
+            anchor="w",
+            justify="left",
+        )
+        usage_label.pack(anchor="w", padx=16, pady=(12, 4))
+
+        def show_usage(usage: dict):
+            if not usage_label.winfo_exists():
+                return
+            lines = [f"Web storage: {sum(usage.values()) / (1024 * 1024):.0f} MB"]
+            lines += [
+                f"    {category}: {size / (1024 * 1024):.1f} MB"
+                for category, size in usage.items() if size
+            ]
+            usage_label.configure(text="\n".join(lines))
+
+        # Profiles can hold many thousands of files, so size them off the UI thread
+        self.tasks.submit(storage_usage, app["path"], on_done=show_usage)
+
+        budget_frame = ctk.CTkFrame(section, fg_color="transparent")
+        budget_frame.pack(fill="x", padx=16, pady=(4, 12))
+        ctk.CTkLabel(
+            budget_frame,
+            text="Cache budget (MB):",
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+            text_color=COLORS["text_primary"],
+        ).pack(side="left", padx=(0, 8))
+        budget_entry = ctk.CTkEntry(
+            budget_frame,
+            width=90,
+            fg_color=COLORS["bg_secondary"],
+            border_color=COLORS["border"],
+            text_color=COLORS["text_primary"],
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+        )
+        budget_entry.insert(0, str(budget_mb))
+        budget_entry.pack(side="left", padx=(0, 8))
+
+        def compact():
+            try:
+                budget_mb = int(budget_entry.get())
+            except ValueError:
+                compact_btn.configure(text="Enter a number of MB")
+                return
+            compact_btn.configure(state="disabled", text="Compacting...")
+
+            def compact_task():
+                write_app_config(app["path"], {"storage_budget_mb": str(budget_mb)})
+                freed = compact_apps([app["path"]])[app["path"].name]
+                return freed, storage_usage(app["path"])
+
+            self.tasks.submit(compact_task, on_done=lambda result: on_compacted(*result))
+
+        def on_compacted(freed: Optional[int], usage: dict):
+            if not compact_btn.winfo_exists():
+                return
+            if freed is None:
+                text = "Close the app to compact"
+            else:
+                text = f"✓  Freed {freed / (1024 * 1024):.0f} MB"
+            compact_btn.configure(state="normal", text=text)
+            show_usage(usage)
+
+        compact_btn = ctk.CTkButton(
+            budget_frame,
+            text="Save & Compact",
+            width=140,
+            fg_color=COLORS["accent"],
+            hover_color="#5a7fc7",
+            text_color="white",
+            command=compact,
+        )
+        compact_btn.pack(side="right")
+
+    def _build_resources_section(self, parent, app: dict, details: dict):
+        """Build the background priority toggle and the memory limit of an app"""
+        config = details["config"]
+
+        section = ctk.CTkFrame(parent, fg_color=COLORS["input_bg"], corner_radius=8)
+        section.pack(fill="x", pady=(16, 0))
+
+        background_var = ctk.BooleanVar(value=config.get("priority") == "background")
+        ctk.CTkSwitch(
+            section,
+            text="Run at background priority (applies on next launch)",
+            variable=background_var,
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+            text_color=COLORS["text_primary"],
+            progress_color=COLORS["accent"],
+            command=lambda: self.tasks.submit(
+                write_app_config, app["path"], {"priority": "background" if background_var.get() else "normal"}
+            ),
+        ).pack(anchor="w", padx=16, pady=(12, 4))
+
+        # Settings only editable in app.conf
+        extra = [f"{key}={config[key]}" for key in ("nice", "ioprio", "cpu_affinity", "address_space_mb") if config.get(key)]
+        if extra:
+            ctk.CTkLabel(
+                section,
+                text=f"Also set in app.conf: {', '.join(extra)}",
+                font=("Ubuntu", int(12 * self.font_multiplier)),
+                text_color=COLORS["text_secondary"],
+                anchor="w",
+            ).pack(anchor="w", padx=16, pady=4)
+
+        limit_frame = ctk.CTkFrame(section, fg_color="transparent")
+        limit_frame.pack(fill="x", padx=16, pady=(4, 12))
+        ctk.CTkLabel(
+            limit_frame,
+            text="Memory limit (MB, 0 for none):",
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+            text_color=COLORS["text_primary"],
+        ).pack(side="left", padx=(0, 8))
+        limit_entry = ctk.CTkEntry(
+            limit_frame,
+            width=90,
+            fg_color=COLORS["bg_secondary"],
+            border_color=COLORS["border"],
+            text_color=COLORS["text_primary"],
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+        )
+        limit_entry.insert(0, config.get("memory_max_mb") or "0")
+        limit_entry.pack(side="left", padx=(0, 8))
+
+        def save_limit():
+            try:
+                limit_mb = int(limit_entry.get())
+            except ValueError:
+                save_btn.configure(text="Enter a number of MB")
+                return
+            self.tasks.submit(
+                write_app_config,
+                app["path"],
+                {"memory_max_mb": str(max(limit_mb, 0))},
+                on_done=lambda _: save_btn.winfo_exists() and save_btn.configure(text="✓  Saved"),
+            )
+
+        save_btn = ctk.CTkButton(
+            limit_frame,
+            text="Save",
+            width=140,
+            fg_color=COLORS["accent"],
+            hover_color="#5a7fc7",
+            text_color="white",
+            command=save_limit,
+        )
+        save_btn.pack(side="right")
+
+    def _build_runtime_section(self, parent, app: dict, details: dict):
+        """Show which PyQt5 runtime the app uses and offer to switch"""
+        config = details["config"]
+        system = details["system_runtime"]
+
+        section = ctk.CTkFrame(parent, fg_color=COLORS["input_bg"], corner_radius=8)
+        section.pack(fill="x", pady=(16, 0))
+
+        if config.get("backend") == "webkitgtk":
+            text = f"Engine: system WebKitGTK {config.get('runtime_webkit', '')} from {config.get('runtime_path', '')}"
+            switch_text, use_system = None, False
+        elif config.get("runtime") == "system":
+            text = f"Runtime: system Qt {config.get('runtime_qt', '')} from {config.get('runtime_path', '')}"
+            switch_text, use_system = "Use Private Runtime", False
+        else:
+            text = "Runtime: private copy from AppNEra's runtime cache"
+            switch_text, use_system = (f"Use System Qt {system['qt']}", True) if system else (None, False)
+
+        ctk.CTkLabel(
+            section,
+            text=text,
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+            text_color=COLORS["text_secondary"],
+            anchor="w",
+            justify="left",
+            wraplength=420,
+        ).pack(side="left", anchor="w", padx=16, pady=12)
+
+        if switch_text is None:
+            return
+
+        def switch():
+            switch_btn.configure(state="disabled", text="Switching...")
+            self.tasks.submit(
+                switch_runtime,
+                app["path"],
+                use_system,
+                on_done=lambda _: self._show_app_details(app),
+                on_error=on_switch_failed,
+            )
+
+        def on_switch_failed(error: Exception):
+            if switch_btn.winfo_exists():
+                switch_btn.configure(state="normal", text="Switch failed, retry")
+            print(f"Switching the runtime of {app['name']} failed: {error}", file=sys.stderr)
+
+        switch_btn = ctk.CTkButton(
+            section,
+            text=switch_text,
+            width=160,
+            fg_color=COLORS["bg_secondary"],
+            hover_color=COLORS["border"],
+            text_color=COLORS["text_primary"],
+            font=("Ubuntu", int(12 * self.font_multiplier)),
+            command=switch,
+        )
+        switch_btn.pack(side="right", padx=16, pady=12)
+
+    def _update_all_apps(self):
+        """Apply the current template files to all apps in the background"""
+        self.update_apps_btn.configure(state="disabled", text="Updating...")
+        app_dirs = [app["path"] for app in self.apps]
+
+        self.tasks.submit(
+            update_apps,
+            app_dirs,
+            on_done=lambda result: self._on_apps_updated(*result),
+            on_error=lambda e: self._on_task_failed(self.update_apps_btn, "Update", e),
+        )
+
+    def _on_apps_updated(self, updated: dict, errors: dict):
+        """Called on main thread when updating all apps finished"""
+        changed = sum(1 for templates in updated.values() if templates)
+        text = f"✓  {changed} updated, {len(updated) - changed} current"
+        if errors:
+            text = f"⚠  {changed} updated, {len(errors)} failed"
+        if self.update_apps_btn.winfo_exists():
+            self.update_apps_btn.configure(state="normal", text=text)
+
+    def _run_doctor(self):
+        """Check and repair all apps in the background"""
+        from doctor import check_apps
+
+        self.doctor_btn.configure(state="disabled", text="Checking...")
+        app_dirs = [app["path"] for app in self.apps]
+
+        self.tasks.submit(
+            check_apps,
+            app_dirs,
+            on_done=self._on_doctor_finished,
+            on_error=lambda e: self._on_task_failed(self.doctor_btn, "Check", e),
+        )
+
+    def _on_task_failed(self, button, action: str, error: Exception):
+        """Re-enable a button whose background task failed and show why"""
+        print(f"{action} failed: {error}", file=sys.stderr)
+        if button.winfo_exists():
+            message = str(error).splitlines()[0] if str(error) else type(error).__name__
+            button.configure(state="normal", text=f"⚠  {action} failed: {message[:40]}")
+
+    def _on_doctor_finished(self, results: dict):
+        """Called on main thread with the doctor's findings"""
+        if self.doctor_btn.winfo_exists():
+            self.doctor_btn.configure(state="normal", text="🩺  Check & Repair Apps")
+
+        for widget in self.right_panel.winfo_children():
+            widget.destroy()
+        self.details_app = None
+
+        report_frame = ctk.CTkScrollableFrame(self.right_panel, fg_color="transparent")
+        report_frame.pack(fill="both", expand=True, padx=24, pady=24)
+
+        ctk.CTkLabel(
+            report_frame,
+            text="App Health",
+            font=("Ubuntu", int(24 * self.font_multiplier), "bold"),
+            text_color=COLORS["text_primary"],
+            anchor="w",
+        ).pack(anchor="w", pady=(0, 16))
+
+        if not results:
+            ctk.CTkLabel(
+                report_frame,
+                text="No apps to check",
+                font=("Ubuntu", int(12 * self.font_multiplier)),
+                text_color=COLORS["text_secondary"],
+            ).pack(anchor="w")
+            return
+
+        status_colors = {
+            "ok": COLORS["success"],
+            "repaired": COLORS["accent"],
+            "unknown": COLORS["text_secondary"],
+        }
+        for name, findings in sorted(results.items()):
+            problems = [f for f in findings if f["status"] != "ok"]
+            ctk.CTkLabel(
+                report_frame,
+                text=f"{'✓' if not problems else '•'}  {name}",
+                font=("Ubuntu", int(14 * self.font_multiplier), "bold"),
+                text_color=COLORS["success"] if not problems else COLORS["text_primary"],
+                anchor="w",
+            ).pack(anchor="w", pady=(8, 2))
+            for finding in problems:
+                text = f"    {finding['check']}: {finding['status']}"
+                if finding["detail"]:
+                    text += f" ({finding['detail']})"
+                ctk.CTkLabel(
+                    report_frame,
+                    text=text,
+                    font=("Ubuntu", int(12 * self.font_multiplier)),
+                    text_color=status_colors.get(finding["status"], COLORS["danger"]),
+                    anchor="w",
+                    justify="left",
+                    wraplength=700,
+                ).pack(anchor="w")
+
     def _uninstall_app(self, app: dict):
         """Uninstall an app"""
         # Confirm dialog
@@ -883,49 +1814,45 @@ Categories=Network;WebBrowser;
         ).pack(side="left", padx=8)
 
     def _do_uninstall(self, app: dict):
-        """Actually perform the uninstallation"""
-        try:
-            # Remove desktop entry
-            desktop_dir = Path.home() / ".local" / "share" / "applications"
-            desktop_file = desktop_dir / f"{app['id']}.desktop"
-            if desktop_file.exists():
-                desktop_file.unlink()
-
-            # Remove icon link
-            icon_dir = Path.home() / ".local" / "share" / "icons"
-            icon_file = icon_dir / f"{app['id']}.png"
-            if icon_file.exists():
-                icon_file.unlink()
-
-            # Remove app directory
-            if app["path"].exists():
-                shutil.rmtree(app["path"])
-
-            # Refresh UI
-            self._refresh_apps_list()
-            
-            # Clear right panel
-            for widget in self.right_panel.winfo_children():
-                widget.destroy()
-            self.empty_state = ctk.CTkLabel(
-                self.right_panel,
-                text="App uninstalled successfully!",
-                font=("Ubuntu", int(14 * self.font_multiplier)),
-                text_color=COLORS["success"],
-            )
-            self.empty_state.pack(expand=True)
+        """Actually perform the uninstallation (files are removed on a worker)"""
+        def uninstall():
+            uninstall_app(app["path"], app["id"])
+            reconcile_desktop_entries(refresh=True)
+
+        self.tasks.submit(
+            uninstall,
+            on_done=lambda _: self._on_app_uninstalled(),
+            on_error=self._on_uninstall_error,
+        )
 
-        except Exception as e:
-            # Show error
-            for widget in self.right_panel.winfo_children():
-                widget.destroy()
-            error_label = ctk.CTkLabel(
-                self.right_panel,
-                text=f"Error uninstalling:\n{str(e)}",
-                font=("Ubuntu", int(14 * self.font_multiplier)),
-                text_color=COLORS["danger"],
-            )
-            error_label.pack(expand=True)
+    def _on_app_uninstalled(self):
+        """Called on main thread once an app's files are gone"""
+        # Refresh UI
+        self._refresh_apps_list()
+        
+        # Clear right panel
+        for widget in self.right_panel.winfo_children():
+            widget.destroy()
+        self.details_app = None
+        self.empty_state = ctk.CTkLabel(
+            self.right_panel,
+            text="App uninstalled successfully!",
+            font=("Ubuntu", int(14 * self.font_multiplier)),
+            text_color=COLORS["success"],
+        )
+        self.empty_state.pack(expand=True)
+
+    def _on_uninstall_error(self, error: Exception):
+        """Called on main thread when uninstalling failed"""
+        for widget in self.right_panel.winfo_children():
+            widget.destroy()
+        error_label = ctk.CTkLabel(
+            self.right_panel,
+            text=f"Error uninstalling:\n{str(error)}",
+            font=("Ubuntu", int(14 * self.font_multiplier)),
+            text_color=COLORS["danger"],
+        )
+        error_label.pack(expand=True)
 
     def _build_help_tab(self):
         """Build the Help tab with troubleshooting information"""
@@ -1397,8 +2324,313 @@ Categories=Network;WebBrowser;
             self.loading_label.configure(text=message)
 
 
+def update_apps(app_dirs: list):
+    """Apply the current templates to apps, then refresh their desktop entries once"""
+    updated, errors = sync_apps(app_dirs)
+    reconcile_desktop_entries(refresh=any("app.desktop.in" in templates for templates in updated.values()))
+    return updated, errors
+
+
+def cmd_bench(args) -> int:
+    """Benchmark launch time and page load of the app template"""
+    from bench import run_benchmark
+
+    if args.python:
+        python = Path(args.python)
+    else:
+        python = Path.home() / ".local" / args.app / "venv" / "bin" / "python"
+    if not python.exists():
+        print(f"Interpreter not found: {python}", file=sys.stderr)
+        return 1
+
+    try:
+        results = run_benchmark(
+            python,
+            runs=args.runs,
+            fixture=args.fixture,
+            script=args.script,
+            timeout=args.timeout,
+            compare_zygote=args.compare_zygote,
+        )
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+def cmd_export(args) -> int:
+    """Export apps into a portable bundle"""
+    from bundle import export_apps
+
+    names = args.apps
+    if args.all:
+        names = [app_dir.name for app_dir in installed_app_dirs()]
+    if not names:
+        print("No apps to export", file=sys.stderr)
+        return 1
+    try:
+        export_apps(names, Path(args.output), compression=args.compression, include_profile=args.with_profile)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Exported {len(names)} app(s) to {args.output}")
+    return 0
+
+
+def cmd_import(args) -> int:
+    """Import apps from a portable bundle"""
+    from bundle import import_apps
+
+    try:
+        imported = import_apps(Path(args.bundle))
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Imported {len(imported)} app(s)")
+    return 0
+
+
+def cmd_update(args) -> int:
+    """Apply the current template files to installed apps"""
+    app_dirs = installed_app_dirs() if args.all else [APPS_DIR / name for name in args.apps]
+    missing = [app_dir.name for app_dir in app_dirs if not (app_dir / "app.py").exists()]
+    if missing:
+        print(f"App(s) not found: {', '.join(missing)}", file=sys.stderr)
+        return 1
+    if not app_dirs:
+        print("No apps to update", file=sys.stderr)
+        return 1
+
+    updated, errors = update_apps(app_dirs)
+    for name, changed in sorted(updated.items()):
+        print(f"{name}: {'updated ' + ', '.join(changed) if changed else 'up to date'}")
+    for name, error in sorted(errors.items()):
+        print(f"{name}: failed ({error})", file=sys.stderr)
+    return 1 if errors else 0
+
+
+def cmd_doctor(args) -> int:
+    """Check installed apps and repair what is broken"""
+    from doctor import check_apps
+
+    app_dirs = [APPS_DIR / name for name in args.apps] if args.apps else installed_app_dirs()
+    if not app_dirs:
+        print("No apps to check", file=sys.stderr)
+        return 1
+
+    results = check_apps(app_dirs, repair=not args.check_only, deep=args.deep, download=True)
+    unhealthy = 0
+    for name, findings in sorted(results.items()):
+        if any(f["status"] in ("broken", "failed") for f in findings):
+            unhealthy += 1
+        print(name)
+        for finding in findings:
+            detail = f" ({finding['detail']})" if finding["detail"] else ""
+            print(f"  {finding['check']}: {finding['status']}{detail}")
+    return 1 if unhealthy else 0
+
+
+def cmd_storage(args) -> int:
+    """Report web storage usage and optionally compact caches or remove orphans"""
+    all_apps = installed_app_dirs()
+    app_dirs = [APPS_DIR / name for name in args.apps] if args.apps else all_apps
+    missing = [app_dir.name for app_dir in app_dirs if not (app_dir / "app.py").exists()]
+    if missing:
+        print(f"App(s) not found: {', '.join(missing)}", file=sys.stderr)
+        return 1
+
+    freed = compact_apps(app_dirs) if args.compact else {}
+    for app_dir in app_dirs:
+        usage = storage_usage(app_dir)
+        total = sum(usage.values())
+        print(
+            f"{app_dir.name}: {total / (1024 * 1024):.1f} MB, caches {cache_usage(usage) / (1024 * 1024):.1f} MB "
+            f"of {storage_budget(app_dir) / (1024 * 1024):.0f} MB"
+        )
+        for category, size in usage.items():
+            print(f"  {category}: {size / (1024 * 1024):.1f} MB")
+        if app_dir.name in freed:
+            result = freed[app_dir.name]
+            print(f"  compacted: {'skipped, app is running' if result is None else f'freed {result / (1024 * 1024):.1f} MB'}")
+
+    orphans = find_orphans(all_apps)
+    if args.remove_orphans:
+        print(f"Removed {len(orphans)} orphaned storage dir(s), freed {remove_orphans(orphans) / (1024 * 1024):.1f} MB")
+    elif orphans:
+        print("Orphaned storage (remove with --remove-orphans):")
+        for path in orphans:
+            print(f"  {path}")
+    return 0
+
+
+def cmd_runtime(args) -> int:
+    """Show which PyQt5 runtime apps use and optionally switch it"""
+    app_dirs = [APPS_DIR / name for name in args.apps] if args.apps else installed_app_dirs()
+    missing = [app_dir.name for app_dir in app_dirs if not (app_dir / "app.py").exists()]
+    if missing:
+        print(f"App(s) not found: {', '.join(missing)}", file=sys.stderr)
+        return 1
+
+    system = find_system_runtime()
+    if system:
+        print(f"System runtime: Qt {system['qt']}, PyQt {system['pyqt']} in {system['path']}")
+    else:
+        print("System runtime: none usable")
+    for app_dir in app_dirs:
+        webkit = read_app_config(app_dir).get("backend") == "webkitgtk"
+        # WebKitGTK apps have no runtime to switch; only named ones are reported as errors
+        if args.use and (args.apps or not webkit):
+            try:
+                switch_runtime(app_dir, args.use == "system")
+            except (OSError, ValueError, subprocess.SubprocessError) as e:
+                print(f"{app_dir.name}: {e}", file=sys.stderr)
+                return 1
+        config = read_app_config(app_dir)
+        print(f"{app_dir.name}: {config.get('runtime', 'private')}" + (" (WebKitGTK)" if webkit else ""))
+    return 0
+
+
+def cmd_perf(args) -> int:
+    """Report the page load times apps have recorded"""
+    app_dirs = [APPS_DIR / name for name in args.apps] if args.apps else installed_app_dirs()
+    missing = [app_dir.name for app_dir in app_dirs if not (app_dir / "app.py").exists()]
+    if missing:
+        print(f"App(s) not found: {', '.join(missing)}", file=sys.stderr)
+        return 1
+
+    summaries = {app_dir.name: summarize_perf(read_perf_log(app_dir)) for app_dir in app_dirs}
+    if args.json:
+        print(json.dumps(summaries, indent=2))
+        return 0
+    for name, summary in summaries.items():
+        print(f"{name}:")
+        for line in describe_perf(summary).splitlines():
+            print(f"  {line}")
+    return 0
+
+
+def cmd_zygote(args) -> int:
+    """Enable, disable or report the per-user zygote"""
+    if args.action == "enable":
+        enable_zygote()
+        print(f"Zygote enabled; it starts at login from {ZYGOTE_AUTOSTART}")
+    elif args.action == "disable":
+        disable_zygote()
+        print("Zygote disabled; apps launch directly")
+    else:
+        pids = zygote_pids()
+        print(f"enabled: {'yes' if ZYGOTE_AUTOSTART.exists() else 'no'}")
+        print(f"running: {', '.join(map(str, pids)) if pids else 'no'}")
+    return 0
+
+
+def cmd_governor(args) -> int:
+    """Run, enable, disable or report the memory governor"""
+    from governor import CONFIG_PATH, LOG_PATH, MemoryGovernor, log_to_file
+
+    if args.action == "enable":
+        enable_governor()
+        print(f"Memory governor enabled; it starts at login from {GOVERNOR_AUTOSTART}")
+    elif args.action == "disable":
+        disable_governor()
+        print("Memory governor disabled")
+    elif args.action == "status":
+        pids = governor_pids()
+        print(f"enabled: {'yes' if GOVERNOR_AUTOSTART.exists() else 'no'}")
+        print(f"running: {', '.join(map(str, pids)) if pids else 'no'}")
+        print(f"settings: {CONFIG_PATH}")
+        print(f"log: {LOG_PATH}")
+    else:
+        try:
+            MemoryGovernor(log=log_to_file).run()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line parser (no command starts the GUI)"""
+    parser = argparse.ArgumentParser(prog="appnera", description="A new era for web apps on Linux")
+    commands = parser.add_subparsers(dest="command")
+
+    bench_parser = commands.add_parser("bench", help="benchmark app launch time and page load")
+    runtime = bench_parser.add_mutually_exclusive_group(required=True)
+    runtime.add_argument("--app", help="name of an installed app whose venv runtime is used")
+    runtime.add_argument("--python", help="path to a Python interpreter with PyQt5 and PyQtWebEngine")
+    bench_parser.add_argument("--runs", type=int, default=10, help="number of launches (default: 10)")
+    bench_parser.add_argument("--fixture", default="default", help="fixture directory in benchmarks/fixtures")
+    bench_parser.add_argument("--script", help="app.py to measure (default: template/app.py)")
+    bench_parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for each page load")
+    bench_parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+    bench_parser.add_argument("--compare-zygote", action="store_true",
+                              help="also measure launches forked from a zygote")
+    bench_parser.set_defaults(func=cmd_bench)
+
+    export_parser = commands.add_parser("export", help="export apps into a portable bundle")
+    export_parser.add_argument("apps", nargs="*", help="names of the apps to export")
+    export_parser.add_argument("--all", action="store_true", help="export every installed app")
+    export_parser.add_argument("-o", "--output", required=True, help="bundle file to write")
+    export_parser.add_argument("--compression", choices=["zstd", "xz"], default="zstd",
+                               help="zstd is fast, xz is smaller (default: zstd)")
+    export_parser.add_argument("--with-profile", action="store_true",
+                               help="include web profiles (logins, local storage)")
+    export_parser.set_defaults(func=cmd_export)
+
+    import_parser = commands.add_parser("import", help="import apps from a portable bundle")
+    import_parser.add_argument("bundle", help="bundle file to read")
+    import_parser.set_defaults(func=cmd_import)
+
+    update_parser = commands.add_parser("update", help="apply template changes to installed apps")
+    update_parser.add_argument("apps", nargs="*", help="names of the apps to update")
+    update_parser.add_argument("--all", action="store_true", help="update every installed app")
+    update_parser.set_defaults(func=cmd_update)
+
+    doctor_parser = commands.add_parser("doctor", help="check installed apps and repair what is broken")
+    doctor_parser.add_argument("apps", nargs="*", help="names of the apps to check (default: all)")
+    doctor_parser.add_argument("--check-only", action="store_true", help="report problems without repairing")
+    doctor_parser.add_argument("--deep", action="store_true", help="hash every runtime file, not just sizes")
+    doctor_parser.set_defaults(func=cmd_doctor)
+
+    storage_parser = commands.add_parser("storage", help="report web storage usage and compact caches")
+    storage_parser.add_argument("apps", nargs="*", help="names of the apps to report (default: all)")
+    storage_parser.add_argument("--compact", action="store_true",
+                                help="prune caches of apps that are not running down to their budget")
+    storage_parser.add_argument("--remove-orphans", action="store_true",
+                                help="delete storage left behind by uninstalled apps")
+    storage_parser.set_defaults(func=cmd_storage)
+
+    runtime_parser = commands.add_parser("runtime", help="show or switch the PyQt5 runtime apps use")
+    runtime_parser.add_argument("apps", nargs="*", help="app names (default: all)")
+    runtime_parser.add_argument("--use", choices=["system", "private"], help="switch the apps to this runtime")
+    runtime_parser.set_defaults(func=cmd_runtime)
+
+    perf_parser = commands.add_parser("perf", help="show page load times recorded by apps")
+    perf_parser.add_argument("apps", nargs="*", help="app names (default: all)")
+    perf_parser.add_argument("--json", action="store_true", help="print percentiles and counts as JSON")
+    perf_parser.set_defaults(func=cmd_perf)
+
+    zygote_parser = commands.add_parser("zygote", help="keep Qt loaded so apps start faster")
+    zygote_parser.add_argument("action", choices=["enable", "disable", "status"])
+    zygote_parser.set_defaults(func=cmd_zygote)
+
+    governor_parser = commands.add_parser("governor", help="free memory of hidden apps under memory pressure")
+    governor_parser.add_argument("action", nargs="?", default="run", choices=["run", "enable", "disable", "status"])
+    governor_parser.set_defaults(func=cmd_governor)
+
+    return parser
+
+
 def main():
     """Main entry point"""
+    args = build_parser().parse_args()
+    if args.command:
+        sys.exit(args.func(args))
+
     app = AppNEraGUI()
     app.mainloop()
 
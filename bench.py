@@ -0,0 +1,247 @@
+"""
+Launch-time and page-load benchmark for generated apps
+
+Runs template/app.py with an app's venv interpreter under the offscreen Qt
+platform, pointed at a local http.server serving fixture pages, and
+records how long each startup milestone takes plus the peak RSS of the
+whole process tree. Results are summarized as percentiles in JSON so
+runtimes, Qt versions and template changes can be compared, optionally
+side by side with launches forked from a zygote (template/zygote.py).
+"""
+
+import functools
+import hashlib
+import http.server
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import runtime
+from monitor import children_map, process_tree, read_process_table, read_rss
+
+TEMPLATE_DIR = Path(__file__).parent / "template"
+FIXTURES_DIR = Path(__file__).parent / "benchmarks" / "fixtures"
+
+# Milestones printed by template/app.py on stderr, mapped to result keys
+MILESTONES = {
+    "QApplication created": "qapplication_ms",
+    "window shown": "window_shown_ms",
+    "page load finished": "load_finished_ms",
+}
+
+RSS_SAMPLE_INTERVAL = 0.05
+ZYGOTE_START_TIMEOUT = 60
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    """Static file handler that does not log every request"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fixtures(directory: Path) -> http.server.ThreadingHTTPServer:
+    """Serve a fixture directory on a free localhost port in the background"""
+    handler = functools.partial(_QuietHandler, directory=str(directory))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def percentiles(values: list) -> dict:
+    """Summarize a list of measurements"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    return {
+        "min": ordered[0],
+        "p50": pick(0.50),
+        "p90": pick(0.90),
+        "p95": pick(0.95),
+        "max": ordered[-1],
+        "mean": sum(ordered) / len(ordered),
+    }
+
+
+def runtime_versions(python: Path) -> dict:
+    """Ask the app runtime which Qt and PyQt versions it ships"""
+    result = subprocess.run(
+        [str(python), "-c", "from PyQt5.QtCore import QT_VERSION_STR, PYQT_VERSION_STR; print(QT_VERSION_STR, PYQT_VERSION_STR)"],
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    qt, _, pyqt = result.stdout.strip().partition(" ")
+    return {"qt": qt or None, "pyqt": pyqt or None}
+
+
+def is_venv_python(python: Path) -> bool:
+    """Check whether an interpreter belongs to a venv (app.py then finds its site-packages itself)"""
+    return (python.parent.parent / "pyvenv.cfg").exists()
+
+
+def run_once(python: Path, app_dir: Path, url: str, env: dict, timeout: float, zygote_pid: Optional[int] = None) -> dict:
+    """Launch the app once and measure its startup milestones.
+
+    With `zygote_pid` the app is forked by that zygote, so the apps it
+    forked count towards peak RSS as well (the zygote itself does not).
+    """
+    # Same interpreter flags as the generated launcher; other interpreters
+    # keep site processing, which is how they find their dist-packages
+    flags = ["-I", "-S"] if is_venv_python(python) else ["-I"]
+    start = time.monotonic()
+    proc = subprocess.Popen(
+        [str(python), *flags, str(app_dir / "app.py")],
+        env=dict(env, APPNERA_URL=url),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    result = {}
+    done = threading.Event()
+
+    def read_milestones():
+        # Timestamps are taken here so they include interpreter startup
+        for line in proc.stderr:
+            event = line.strip().removeprefix("[appnera] ").rpartition(":")[0]
+            if event in MILESTONES and MILESTONES[event] not in result:
+                result[MILESTONES[event]] = (time.monotonic() - start) * 1000
+                if event == "page load finished":
+                    done.set()
+        done.set()
+
+    threading.Thread(target=read_milestones, daemon=True).start()
+
+    peak_rss = 0
+    deadline = start + timeout
+    while not done.is_set() and time.monotonic() < deadline:
+        table = read_process_table()
+        children = children_map(table)
+        pids = process_tree(children, proc.pid)
+        if zygote_pid is not None:
+            pids += process_tree(children, zygote_pid)[1:]
+        rss = sum(read_rss(pid) for pid in pids if pid in table)
+        peak_rss = max(peak_rss, rss)
+        done.wait(RSS_SAMPLE_INTERVAL)
+
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+    result["peak_rss_mb"] = peak_rss / (1024 * 1024)
+    result["timed_out"] = "load_finished_ms" not in result
+    return result
+
+
+def start_zygote(python: Path, env: dict, socket_dir: Path) -> subprocess.Popen:
+    """Start the template zygote with the benchmarked runtime and wait for its socket"""
+    if is_venv_python(python):
+        site_packages = runtime.venv_site_packages(python.parent.parent)
+        command = [str(python), "-I", "-S", str(TEMPLATE_DIR / "zygote.py"), "--site-packages", str(site_packages)]
+    else:
+        # Not a venv: let site processing find PyQt5
+        command = [str(python), "-I", str(TEMPLATE_DIR / "zygote.py")]
+    proc = subprocess.Popen(command, env=env, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + ZYGOTE_START_TIMEOUT
+    while not any(socket_dir.glob("appnera-zygote-py*.sock")):
+        if proc.poll() is not None or time.monotonic() > deadline:
+            proc.kill()
+            raise ValueError("The zygote did not start (is PyQt5 installed for this Python?)")
+        time.sleep(0.05)
+    return proc
+
+
+def summarize(samples: List[dict]) -> dict:
+    """Turn the samples of one launch mode into percentiles"""
+    completed = [s for s in samples if not s["timed_out"]]
+    metrics = {}
+    for key in list(MILESTONES.values()) + ["peak_rss_mb"]:
+        metrics[key] = percentiles([s[key] for s in completed if key in s])
+    return {"timeouts": len(samples) - len(completed), "metrics": metrics}
+
+
+def run_benchmark(
+    python: Path,
+    runs: int = 10,
+    fixture: str = "default",
+    script: Optional[Path] = None,
+    timeout: float = 60.0,
+    compare_zygote: bool = False,
+) -> dict:
+    """Benchmark `runs` cold launches of the app template with a runtime.
+
+    `python` is the interpreter of an app venv, `fixture` a directory in
+    benchmarks/fixtures and `script` the app.py to measure (the current
+    template by default). With `compare_zygote` the same number of
+    launches is also made through a zygote and reported under "zygote".
+    """
+    script = Path(script or TEMPLATE_DIR / "app.py")
+    fixture_dir = FIXTURES_DIR / fixture
+    if not fixture_dir.is_dir():
+        raise ValueError(f"Fixture '{fixture}' not found in {FIXTURES_DIR}")
+
+    server = serve_fixtures(fixture_dir)
+    url = f"http://127.0.0.1:{server.server_address[1]}/index.html"
+    samples = []
+    zygote_samples = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="appnera-bench-") as tmp:
+            # Run from a throwaway app directory and HOME so no state leaks between runs
+            home = Path(tmp) / "home"
+            app_dir = Path(tmp) / "app"
+            socket_dir = Path(tmp) / "run"
+            home.mkdir()
+            app_dir.mkdir()
+            socket_dir.mkdir(mode=0o700)
+            shutil.copy(script, app_dir / "app.py")
+            env = dict(
+                os.environ,
+                HOME=str(home),
+                XDG_RUNTIME_DIR=str(socket_dir),
+                QT_QPA_PLATFORM="offscreen",
+                APPNERA_APP_NAME="Benchmark",
+                APPNERA_APP_ID="benchmark",
+            )
+            for _ in range(runs):
+                samples.append(run_once(python, app_dir, url, dict(env, APPNERA_NO_ZYGOTE="1"), timeout))
+
+            if compare_zygote:
+                zygote = start_zygote(python, env, socket_dir)
+                try:
+                    for _ in range(runs):
+                        zygote_samples.append(run_once(python, app_dir, url, env, timeout, zygote.pid))
+                finally:
+                    zygote.terminate()
+                    zygote.wait()
+    finally:
+        server.shutdown()
+
+    direct = summarize(samples)
+    result = {
+        "python": str(python),
+        "runtime": runtime_versions(python),
+        "script": str(script),
+        "script_sha256": hashlib.sha256(script.read_bytes()).hexdigest(),
+        "fixture": fixture,
+        "runs": runs,
+        "timeouts": direct["timeouts"],
+        "host_python": sys.version.split()[0],
+        "metrics": direct["metrics"],
+    }
+    if compare_zygote:
+        result["zygote"] = summarize(zygote_samples)
+    return result
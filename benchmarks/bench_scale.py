@@ -0,0 +1,54 @@
+"""
+How listing, sizing, thumbnailing and uninstalling apps scale with the number of apps
+"""
+
+import pytest
+
+import core
+
+COUNTS = [10, 100, 1000]
+
+
+@pytest.fixture(params=COUNTS, scope="module")
+def apps_dir(request, make_apps):
+    return make_apps(request.param), request.param
+
+
+@pytest.fixture
+def installed(apps_dir, monkeypatch):
+    """Point the core module at a directory of synthetic apps"""
+    path, count = apps_dir
+    monkeypatch.setattr(core, "APPS_DIR", path)
+    return count
+
+
+def test_discovery(installed, benchmark):
+    apps = benchmark(core.list_apps)
+    assert len(apps) == installed
+
+
+def test_size(installed, benchmark):
+    apps = core.list_apps()
+    sizes = benchmark(lambda: [core.dir_size(app["path"]) for app in apps])
+    assert all(size > 0 for size in sizes)
+
+
+def test_thumbnails(installed, benchmark):
+    pytest.importorskip("PIL")
+    apps = core.list_apps()
+    icons = benchmark(lambda: [core.load_thumbnail(app["path"] / "icon.png", 32) for app in apps], repeat=1)
+    assert all(icon is not None and icon.size == (32, 32) for icon in icons)
+
+
+@pytest.mark.parametrize("count", COUNTS)
+def test_uninstall(count, make_apps, monkeypatch, benchmark):
+    # Uninstalling is destructive, so it gets its own apps and a single run
+    monkeypatch.setattr(core, "APPS_DIR", make_apps(count))
+    apps = core.list_apps()
+
+    def uninstall_all():
+        for app in apps:
+            core.uninstall_app(app["path"], app["id"])
+
+    benchmark(uninstall_all, repeat=1)
+    assert core.list_apps() == []
@@ -0,0 +1,183 @@
+"""
+Scale benchmarks for the headless core (run with `python -m pytest benchmarks`)
+
+Every run happens in a throwaway HOME, set before any AppNEra module is
+imported since they resolve their paths from it. Synthetic apps are made
+with a large sparse "Qt library" and a few hundred small files in their
+venv, and every measurement is compared with benchmarks/baselines.json:
+a run slower than the baseline times the tolerance fails.
+
+Baselines are not seconds but multiples of a calibration run, a fixed mix
+of file system and CPU work timed at the start of every session, so they
+carry over between machines; each run's limit is the stored ratio times
+this session's calibration time times the tolerance.
+
+    python -m pytest benchmarks                       # compare with the baselines
+    python -m pytest benchmarks --update-baselines    # record new baselines
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+FAKE_HOME = Path(tempfile.mkdtemp(prefix="appnera-bench-home-"))
+os.environ["HOME"] = str(FAKE_HOME)
+os.environ.pop("XDG_RUNTIME_DIR", None)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+BASELINES_PATH = Path(__file__).parent / "baselines.json"
+
+# Measurements below this many seconds are too noisy to fail on
+MIN_SECONDS = 0.02
+
+# Shape of the calibration run
+CALIBRATION_FILES = 2000
+CALIBRATION_FILE_BYTES = 4096
+CALIBRATION_HASH_BYTES = 64 * 1024 * 1024
+CALIBRATION_REPEAT = 5
+
+# Shape of a synthetic app venv
+VENV_PACKAGES = 8
+VENV_FILES_PER_PACKAGE = 25
+VENV_SMALL_FILE_BYTES = 4096
+VENV_LIBRARY_BYTES = 200 * 1024 * 1024
+ICON_PIXELS = 1024
+
+
+def pytest_addoption(parser):
+    parser.addoption("--update-baselines", action="store_true", help="record the measured times as new baselines")
+    parser.addoption("--tolerance", type=float, default=2.0, help="allowed slowdown factor over the baselines")
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(FAKE_HOME, ignore_errors=True)
+
+
+def _icon_bytes() -> bytes:
+    """A large PNG icon, like the ones users pick"""
+    try:
+        from PIL import Image
+    except ImportError:
+        from core import TEMPLATE_DIR
+        return (TEMPLATE_DIR / "icon.png").read_bytes()
+    path = FAKE_HOME / "icon.png"
+    gradient = Image.linear_gradient("L").resize((ICON_PIXELS, ICON_PIXELS))
+    Image.merge("RGB", (gradient, gradient.rotate(90), gradient.rotate(180))).save(path)
+    return path.read_bytes()
+
+
+def make_app(apps_dir: Path, index: int, icon: bytes) -> Path:
+    """Create one synthetic app directory with a large fake venv"""
+    name = f"Bench App {index:04d}"
+    app_dir = apps_dir / name
+    site_packages = app_dir / "venv" / "lib" / "python3.11" / "site-packages"
+    for package in range(VENV_PACKAGES):
+        package_dir = site_packages / f"package{package}"
+        package_dir.mkdir(parents=True)
+        for module in range(VENV_FILES_PER_PACKAGE):
+            (package_dir / f"module{module}.py").write_bytes(b"#" * VENV_SMALL_FILE_BYTES)
+    library = site_packages / "PyQt5" / "Qt5" / "lib" / "libQt5WebEngineCore.so.5"
+    library.parent.mkdir(parents=True)
+    with open(library, "wb") as f:
+        f.truncate(VENV_LIBRARY_BYTES)
+    (app_dir / "venv" / "bin").mkdir()
+    (app_dir / "venv" / "bin" / "python").symlink_to(sys.executable)
+    (app_dir / "app.py").write_text("# synthetic app\n")
+    (app_dir / "run.sh").write_text("#!/bin/sh\n")
+    (app_dir / "icon.png").write_bytes(icon)
+    (app_dir / "app.conf").write_text(f"name={name}\nid=bench-app-{index:04d}\nurl=https://example.com\n")
+    return app_dir
+
+
+@pytest.fixture(scope="session")
+def make_apps():
+    """Return a function that fills a fresh apps directory with `count` synthetic apps"""
+    icon = _icon_bytes()
+    roots = iter(range(1_000_000))
+
+    def make(count: int) -> Path:
+        apps_dir = FAKE_HOME / f"apps-{next(roots)}"
+        apps_dir.mkdir()
+        for index in range(count):
+            make_app(apps_dir, index, icon)
+        return apps_dir
+
+    return make
+
+
+def _calibration_work():
+    """Write, stat and delete small files and hash a buffer, like the benchmarks do"""
+    root = FAKE_HOME / "calibration"
+    root.mkdir()
+    for index in range(CALIBRATION_FILES):
+        (root / f"file{index}").write_bytes(b"#" * CALIBRATION_FILE_BYTES)
+    for path in root.iterdir():
+        path.stat()
+    hashlib.sha256(b"#" * CALIBRATION_HASH_BYTES).digest()
+    shutil.rmtree(root)
+
+
+@pytest.fixture(scope="session")
+def calibration() -> float:
+    """Seconds the calibration work takes on this machine right now (best of a few runs)"""
+    best = None
+    for _ in range(CALIBRATION_REPEAT):
+        start = time.perf_counter()
+        _calibration_work()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+@pytest.fixture(scope="session")
+def baselines(request, calibration):
+    """Measured times by benchmark name, relative to the calibration run, written back with --update-baselines"""
+    try:
+        stored = json.loads(BASELINES_PATH.read_text())["ratios"]
+    except (OSError, ValueError, KeyError, TypeError):
+        stored = {}
+    measured = {}
+    yield {"stored": stored, "measured": measured}
+    if request.config.getoption("--update-baselines") and measured:
+        stored.update(measured)
+        BASELINES_PATH.write_text(json.dumps({
+            # The reference measurement the ratios were recorded with, for information
+            "calibration_seconds": round(calibration, 4),
+            "ratios": dict(sorted(stored.items())),
+        }, indent=2) + "\n")
+
+
+@pytest.fixture
+def benchmark(request, baselines, calibration):
+    """Time a function (best of `repeat` runs) and check it against its baseline"""
+    name = request.node.name
+
+    def run(fn, repeat: int = 3):
+        best = None
+        result = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        baselines["measured"][name] = round(best / calibration, 4)
+
+        ratio = baselines["stored"].get(name)
+        tolerance = request.config.getoption("--tolerance")
+        if ratio is not None and not request.config.getoption("--update-baselines"):
+            baseline = ratio * calibration
+            limit = max(baseline * tolerance, MIN_SECONDS)
+            assert best <= limit, (
+                f"{name} took {best:.3f} s, baseline {baseline:.3f} s ({ratio:.3f}x the calibration "
+                f"run of {calibration:.3f} s, limit {limit:.3f} s)"
+            )
+        return result
+
+    return run
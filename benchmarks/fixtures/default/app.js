@@ -0,0 +1,19 @@
+// Builds a DOM of roughly the size of a typical chat or productivity SPA
+(function () {
+  var sidebar = document.getElementById("sidebar");
+  var content = document.getElementById("content");
+  for (var i = 0; i < 200; i++) {
+    var link = document.createElement("a");
+    link.href = "#channel-" + i;
+    link.textContent = "Channel " + i;
+    sidebar.appendChild(link);
+  }
+  var fragment = document.createDocumentFragment();
+  for (var j = 0; j < 2000; j++) {
+    var card = document.createElement("div");
+    card.className = "card";
+    card.textContent = "Message " + j + ": " + "lorem ipsum dolor sit amet ".repeat(4);
+    fragment.appendChild(card);
+  }
+  content.appendChild(fragment);
+})();
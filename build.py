@@ -0,0 +1,390 @@
+"""
+Checkpointed app builds
+
+An app is built in stages. Every finished stage is recorded in the app's
+build state file, and a failed build is left on disk with the stage it
+failed in, so retrying resumes there: a working venv is reused and the
+runtime install picks up the wheels already in the wheel cache instead of
+starting over. The state file is removed once the build is complete.
+
+The runtime is the system PyQt5 with QtWebEngine when the distribution
+ships a usable one (the venv then sees the system site-packages and pip
+is skipped), or a private copy from the runtime cache otherwise. Apps on
+the WebKitGTK backend always use the system's PyGObject and WebKitGTK.
+
+The first app built on a pruned runtime cache (see runtime.py), or on
+one that changed since, is launched once offscreen against a local test
+page before it is registered; if the page does not load, the full
+runtime is installed instead.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+from urllib.parse import urlsplit
+
+import icons
+import runtime
+from desktop import refresh_desktop_database
+from bench import run_benchmark
+from core import (
+    APP_CACHE_DIR,
+    APPS_DIR,
+    BUILD_STATE,
+    DESKTOP_DIR,
+    ICON_DIR,
+    app_id_for,
+    install_template_files,
+    read_app_config,
+    register_desktop_entry,
+    write_app_config,
+)
+
+# Build stages in order, with the progress message shown for each
+STAGES = [
+    ("files", "Copying template files..."),
+    ("icon", "Setting up icon..."),
+    ("config", "Saving app settings..."),
+    ("venv", "Creating Python environment..."),
+    ("runtime", "Installing dependencies (this may take a moment)..."),
+    ("bytecode", "Optimizing startup..."),
+    ("verify", "Verifying app..."),
+    ("register", "Registering app..."),
+]
+STAGE_NAMES = [stage for stage, _ in STAGES]
+
+# Seconds the offscreen test launch may take to load its page
+VERIFY_TIMEOUT = 60
+
+# Chat apps mostly wait for messages in the background, so they get the
+# "background" priority preset of app.py unless changed in Manage Apps
+BACKGROUND_HOSTS = (
+    "web.whatsapp.com",
+    "web.telegram.org",
+    "discord.com",
+    "app.slack.com",
+    "messenger.com",
+    "teams.microsoft.com",
+    "teams.live.com",
+    "chat.google.com",
+    "app.element.io",
+    "web.skype.com",
+)
+
+# Build settings each stage depends on; changing one on retry redoes the stage
+STAGE_INPUTS = {
+    "icon": ("icon",),
+    "config": ("url", "tab_urls", "block_requests", "backend"),
+    "venv": ("private_runtime", "backend"),
+    "runtime": ("private_runtime", "backend"),
+}
+
+# Web engines an app can be built on; app.py hands webkitgtk apps to app_webkit.py
+BACKENDS = ("qtwebengine", "webkitgtk")
+
+
+def read_build_state(app_dir: Path) -> Optional[dict]:
+    """Return the checkpoint of an unfinished build, or None"""
+    try:
+        with open(app_dir / BUILD_STATE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_build_state(app_dir: Path, state: dict):
+    """Record a build checkpoint atomically"""
+    tmp_path = app_dir / f"{BUILD_STATE}.tmp"
+    tmp_path.write_text(json.dumps(state, indent=2))
+    os.replace(tmp_path, app_dir / BUILD_STATE)
+
+
+def failed_builds() -> List[dict]:
+    """Return the checkpoints of all unfinished builds, sorted by app name"""
+    if not APPS_DIR.exists():
+        return []
+    builds = []
+    for item in sorted(APPS_DIR.iterdir()):
+        state = read_build_state(item) if item.is_dir() else None
+        if state is not None:
+            builds.append({**state, "path": item})
+    return builds
+
+
+def default_priority(url: str) -> str:
+    """Pick the app's scheduling preset from the host it wraps"""
+    host = (urlsplit(url).hostname or "").lower()
+    if any(host == known or host.endswith("." + known) for known in BACKGROUND_HOSTS):
+        return "background"
+    return "normal"
+
+
+def _venv_usable(venv_dir: Path) -> bool:
+    """Check that a venv's interpreter still starts"""
+    python = venv_dir / "bin" / "python"
+    if not (venv_dir / "pyvenv.cfg").exists() or not python.exists():
+        return False
+    try:
+        return subprocess.run([str(python), "-I", "-c", "pass"], capture_output=True, timeout=30).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+def _launches(venv_dir: Path) -> bool:
+    """Launch the app template offscreen once and check that it loads a page"""
+    result = run_benchmark(venv_dir / "bin" / "python", runs=1, timeout=VERIFY_TIMEOUT)
+    return result["timeouts"] == 0
+
+
+def _verify_runtime(venv_dir: Path, on_progress: Callable[[str], None]):
+    """Fall back to the full runtime if the pruned one cannot run the app.
+
+    A cache that launched an app once is not tested again until it
+    changes. If the full runtime does not launch either, the test launch
+    cannot work on this machine; that is reported and later builds skip it.
+    """
+    if runtime.NO_VERIFY_MARKER.exists() or not runtime.runtime_pruned(venv_dir) or runtime.runtime_verified(venv_dir):
+        return
+    if _launches(venv_dir):
+        runtime.mark_runtime_verified(venv_dir)
+        return
+    on_progress("Installing the full runtime...")
+    runtime.install_full_runtime(venv_dir)
+    if not _launches(venv_dir):
+        # Pruning was not the problem (e.g. no graphics libraries), so keep pruning later runtimes
+        runtime.FULL_RUNTIME_MARKER.unlink(missing_ok=True)
+        runtime.NO_VERIFY_MARKER.touch()
+        on_progress("The app could not be test-launched here; skipping this check from now on")
+
+
+def _stage_valid(app_dir: Path, stage: str, state: dict) -> bool:
+    """Check that the output of a completed stage is still in place"""
+    if stage == "files":
+        return all((app_dir / name).exists() for name in ("app.py", "run.sh", f"{state['id']}.desktop"))
+    if stage == "icon":
+        return (app_dir / "icon.png").exists()
+    if stage == "config":
+        return (app_dir / "app.conf").exists()
+    if stage == "venv":
+        return _venv_usable(app_dir / "venv")
+    if stage == "runtime":
+        system = state.get("system_runtime")
+        if system:
+            return (Path(system["path"]) / ("gi" if "webkit" in system else "PyQt5")).is_dir()
+        try:
+            return (runtime.venv_site_packages(app_dir / "venv") / "PyQt5").is_dir()
+        except ValueError:
+            return False
+    return True
+
+
+def _valid_checkpoints(app_dir: Path, state: dict) -> List[str]:
+    """Return the completed stages that can be kept, stopping at the first invalid one"""
+    completed = set(state.get("completed", []))
+    valid = []
+    for stage in STAGE_NAMES:
+        if stage not in completed or not _stage_valid(app_dir, stage, state):
+            break
+        valid.append(stage)
+    return valid
+
+
+def _run_stage(stage: str, app_dir: Path, state: dict, on_progress: Callable[[str], None]):
+    """Run one build stage"""
+    venv_dir = app_dir / "venv"
+    if stage == "files":
+        # Template files, launcher script and .desktop entry (which calls
+        # the interpreter directly)
+        install_template_files(app_dir, state["name"], state["id"])
+    elif stage == "icon":
+        if not Path(state["icon"]).exists():
+            raise ValueError("Selected icon file not found")
+        # Decoded once into every hicolor size (cached by the file's hash)
+        icons.install_app_icon(app_dir, state["id"], Path(state["icon"]))
+    elif stage == "config":
+        write_app_config(app_dir, {
+            "name": state["name"],
+            "id": state["id"],
+            "url": state["url"],
+            "tabs": " ".join(state.get("tab_urls", [])),
+            "block_requests": "1" if state["block_requests"] else "0",
+            "priority": default_priority(state["url"]),
+            "backend": state.get("backend", "qtwebengine"),
+        })
+    elif stage == "venv":
+        if state.get("backend") == "webkitgtk":
+            system = runtime.find_webkit_runtime()
+            if system is None:
+                raise ValueError("No system WebKitGTK with PyGObject was found")
+        else:
+            system = None if state.get("private_runtime") else runtime.find_system_runtime()
+        state["system_runtime"] = system
+        # A half-created venv from an interrupted attempt is not reused
+        if not _venv_usable(venv_dir):
+            shutil.rmtree(venv_dir, ignore_errors=True)
+            # No pip in the app: the runtime is installed by the shared installer
+            runtime.create_venv(venv_dir, system_site_packages=system is not None)
+        else:
+            runtime.set_system_site_packages(venv_dir, system is not None)
+    elif stage == "runtime":
+        system = state.get("system_runtime")
+        if system:
+            _use_system_runtime(app_dir, system)
+        else:
+            # A private copy linked from the local runtime cache; only the first
+            # app downloads anything, and wheels fetched before a failure are kept
+            runtime.install_runtime(venv_dir)
+            write_app_config(app_dir, {"runtime": "private"})
+    elif stage == "bytecode":
+        # Precompile bytecode for the app and its runtime (all CPUs) so the
+        # first launch does not pay for compiling PyQt5 and friends
+        result = subprocess.run(
+            [str(venv_dir / "bin" / "python"), "-m", "compileall", "-q", "-j", "0",
+             str(app_dir / "app.py"), str(app_dir / "app_webkit.py"), str(venv_dir / "lib")],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            errors = [line for line in result.stdout.splitlines() if line.startswith("***")]
+            raise ValueError(f"Bytecode compilation failed: {errors[0] if errors else result.stderr.strip()}")
+    elif stage == "verify":
+        # Only private runtimes are pruned; the test launch cannot see system packages
+        if not state.get("system_runtime") and state.get("backend") != "webkitgtk":
+            _verify_runtime(venv_dir, on_progress)
+    elif stage == "register":
+        register_desktop_entry(app_dir, state["id"])
+        refresh_desktop_database()
+
+
+def _use_system_runtime(app_dir: Path, system: dict):
+    """Point an app at the system PyQt5 or PyGObject (app.py adds its directory when started with -S)"""
+    settings = {"runtime": "system", "runtime_path": system["path"]}
+    if "webkit" in system:
+        settings["runtime_webkit"] = system["webkit"]
+    else:
+        settings["runtime_qt"] = system["qt"]
+    write_app_config(app_dir, settings)
+
+
+def switch_runtime(app_dir: Path, use_system: bool):
+    """Move an installed app to the system runtime, or back to a private one"""
+    if read_app_config(app_dir).get("backend") == "webkitgtk":
+        raise ValueError("Apps on WebKitGTK always use the system runtime")
+    venv_dir = app_dir / "venv"
+    if use_system:
+        system = runtime.find_system_runtime()
+        if system is None:
+            raise ValueError("No usable system PyQt5 with QtWebEngine was found")
+        runtime.set_system_site_packages(venv_dir, True)
+        _use_system_runtime(app_dir, system)
+        runtime.remove_private_runtime(venv_dir)
+    else:
+        runtime.set_system_site_packages(venv_dir, False)
+        runtime.install_runtime(venv_dir)
+        _verify_runtime(venv_dir, lambda message: None)
+        write_app_config(app_dir, {"runtime": "private"})
+
+
+def _stage_error(error: Exception) -> str:
+    """Describe a failed stage, including the output of a failed command"""
+    if isinstance(error, subprocess.CalledProcessError):
+        output = (error.stderr or error.stdout or b"").decode(errors="replace").strip().splitlines()
+        if output:
+            return f"{str(error).rstrip('.')}: {output[-1]}"
+    return str(error)
+
+
+def run_build(app_dir: Path, state: dict, on_progress: Callable[[str], None] = print):
+    """Run the stages of a build that are not checkpointed yet"""
+    state["completed"] = _valid_checkpoints(app_dir, state)
+    for stage, message in STAGES:
+        if stage in state["completed"]:
+            continue
+        on_progress(message)
+        try:
+            _run_stage(stage, app_dir, state, on_progress)
+        except Exception as e:
+            state.update(failed_stage=stage, error=_stage_error(e), failed_at=time.time())
+            write_build_state(app_dir, state)
+            raise
+        state["completed"].append(stage)
+        state.pop("failed_stage", None)
+        state.pop("error", None)
+        write_build_state(app_dir, state)
+    (app_dir / BUILD_STATE).unlink()
+
+
+def build_app(
+    name: str,
+    url: str,
+    icon_path: str,
+    block_requests: bool = False,
+    on_progress: Callable[[str], None] = print,
+    private_runtime: bool = False,
+    backend: str = "qtwebengine",
+    tab_urls: Optional[List[str]] = None,
+) -> Path:
+    """Build an app, resuming a failed build of the same name.
+
+    Settings that differ from the failed attempt redo only the stages
+    that depend on them. With `private_runtime` a usable system PyQt5 is
+    ignored. `backend` is one of BACKENDS. `tab_urls` are related sites
+    shown as further tabs next to `url`. Returns the app directory.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown web engine '{backend}'")
+    if tab_urls and backend != "qtwebengine":
+        raise ValueError("Apps with several URLs need the QtWebEngine engine")
+    app_dir = APPS_DIR / name
+    settings = {
+        "url": url,
+        "tab_urls": list(tab_urls or []),
+        "icon": str(icon_path),
+        "block_requests": bool(block_requests),
+        "private_runtime": bool(private_runtime),
+        "backend": backend,
+    }
+
+    state = read_build_state(app_dir)
+    if state is None:
+        if app_dir.exists():
+            raise ValueError(f"App '{name}' already exists")
+        on_progress("Creating app directory...")
+        app_dir.mkdir(parents=True)
+        state = {"name": name, "id": app_id_for(name), "completed": [], "started_at": time.time()}
+    else:
+        changed = {key for key, value in settings.items() if state.get(key) != value}
+        state["completed"] = [
+            stage for stage in state.get("completed", [])
+            if not changed.intersection(STAGE_INPUTS.get(stage, ()))
+        ]
+    state.update(settings)
+    write_build_state(app_dir, state)
+    run_build(app_dir, state, on_progress)
+    return app_dir
+
+
+def resume_build(app_dir: Path, on_progress: Callable[[str], None] = print) -> Path:
+    """Retry a failed build from its last checkpoint"""
+    state = read_build_state(app_dir)
+    if state is None:
+        raise ValueError(f"No unfinished build in {app_dir}")
+    run_build(app_dir, state, on_progress)
+    return app_dir
+
+
+def discard_build(app_dir: Path):
+    """Delete a failed build and anything it registered"""
+    state = read_build_state(app_dir)
+    if state is None:
+        raise ValueError(f"No unfinished build in {app_dir}")
+    for link in (DESKTOP_DIR / f"{state['id']}.desktop", ICON_DIR / f"{state['id']}.png"):
+        if link.is_symlink() and Path(os.readlink(link)).parent == app_dir:
+            link.unlink()
+    icons.remove_app_icons(state["id"])
+    shutil.rmtree(app_dir, ignore_errors=True)
+    shutil.rmtree(APP_CACHE_DIR / state["id"], ignore_errors=True)
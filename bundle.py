@@ -0,0 +1,293 @@
+"""
+Portable app bundles
+
+Streams one or more apps into a single compressed tar archive and
+recreates them from it. The archive holds each app's settings, icon and
+template files (optionally its web profile) but never the venv, which is
+rebuilt on import from the system PyQt5 or the local runtime cache.
+"""
+
+import io
+import json
+import shutil
+import subprocess
+import tarfile
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Set
+
+import icons
+import runtime
+from core import (
+    APPS_DIR,
+    app_id_for,
+    migrate_legacy_launcher,
+    read_app_config,
+    write_app_config,
+    write_launchers,
+)
+from desktop import reconcile_desktop_entries
+
+BUNDLE_MANIFEST = "appnera-bundle.json"
+BUNDLE_VERSION = 1
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+XZ_MAGIC = b"\xfd7zXZ\x00"
+
+# Standard directories of ~/.local, which apps share as their parent directory
+RESERVED_NAMES = {"bin", "etc", "include", "lib", "lib64", "libexec", "man", "opt", "sbin", "share", "src", "state"}
+
+# Regenerated on import because they contain absolute paths
+EXCLUDED_NAMES = {"venv", "run.sh", "__pycache__"}
+EXCLUDED_SUFFIXES = (".desktop", ".tmp")
+
+
+class _ZstdWriter:
+    """Write-only file object that compresses with zstandard or the zstd tool"""
+
+    def __init__(self, path: Path):
+        self.file = None
+        self.proc = None
+        try:
+            import zstandard
+            self.file = open(path, "wb")
+            self.stream = zstandard.ZstdCompressor(level=10, threads=-1).stream_writer(self.file)
+        except ImportError:
+            if shutil.which("zstd") is None:
+                raise ValueError("zstd compression needs the 'zstandard' module or the zstd tool")
+            self.proc = subprocess.Popen(["zstd", "-q", "-10", "-T0", "-f", "-o", str(path)], stdin=subprocess.PIPE)
+            self.stream = self.proc.stdin
+
+    def write(self, data):
+        return self.stream.write(data)
+
+    def close(self):
+        self.stream.close()
+        if self.file is not None:
+            self.file.close()
+        if self.proc is not None and self.proc.wait() != 0:
+            raise ValueError("zstd failed to write the archive")
+
+
+class _ZstdReader:
+    """Read-only file object that decompresses with zstandard or the zstd tool"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.proc = None
+        try:
+            import zstandard
+            self.stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        except ImportError:
+            if shutil.which("zstd") is None:
+                raise ValueError("zstd archives need the 'zstandard' module or the zstd tool")
+            self.proc = subprocess.Popen(
+                ["zstd", "-q", "-d", "-c", str(self.path)], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+            )
+            self.stream = self.proc.stdout
+
+    def read(self, size=-1):
+        return self.stream.read(size)
+
+    def close(self):
+        """Close the stream, raising if the archive could not be decompressed"""
+        if self.proc is not None:
+            # Let zstd finish writing so its exit status reflects the whole archive
+            while self.stream.read(1024 * 1024):
+                pass
+        self.stream.close()
+        if self.proc is not None and self.proc.wait() != 0:
+            raise ValueError(f"{self.path} could not be decompressed; the archive is corrupt or truncated")
+
+
+def _exclude(include_profile: bool):
+    """Build a tarfile filter that skips files rebuilt on import"""
+    def tar_filter(info: tarfile.TarInfo) -> Optional[tarfile.TarInfo]:
+        parts = Path(info.name).parts
+        if len(parts) > 1 and (parts[1] in EXCLUDED_NAMES or parts[-1].endswith(EXCLUDED_SUFFIXES)):
+            return None
+        if len(parts) > 1 and parts[1] == "profile" and not include_profile:
+            return None
+        return info
+    return tar_filter
+
+
+def export_apps(names: List[str], output: Path, compression: str = "zstd", include_profile: bool = False):
+    """Stream apps into a compressed archive.
+
+    `compression` is "zstd" (fast) or "xz" (smaller, slower).
+    """
+    app_dirs = [APPS_DIR / name for name in names]
+    for app_dir in app_dirs:
+        if not (app_dir / "app.py").exists():
+            raise ValueError(f"App '{app_dir.name}' not found")
+        # run.sh is not exported, so settings it still carries must be in app.conf
+        migrate_legacy_launcher(app_dir)
+
+    manifest = json.dumps({
+        "version": BUNDLE_VERSION,
+        "created": int(time.time()),
+        "apps": names,
+        "profile": include_profile,
+    }, indent=2).encode()
+
+    if compression == "zstd":
+        fileobj = _ZstdWriter(output)
+        tar = tarfile.open(fileobj=fileobj, mode="w|")
+    elif compression == "xz":
+        fileobj = None
+        tar = tarfile.open(output, mode="w|xz")
+    else:
+        raise ValueError(f"Unknown compression '{compression}'")
+
+    try:
+        info = tarfile.TarInfo(BUNDLE_MANIFEST)
+        info.size = len(manifest)
+        info.mtime = int(time.time())
+        tar.addfile(info, io.BytesIO(manifest))
+        for app_dir in app_dirs:
+            tar.add(app_dir, arcname=app_dir.name, filter=_exclude(include_profile))
+    finally:
+        tar.close()
+        if fileobj is not None:
+            fileobj.close()
+
+
+@contextmanager
+def _open_archive(path: Path) -> Iterator[tarfile.TarFile]:
+    """Open a bundle for streaming reads, detecting the compression"""
+    with open(path, "rb") as f:
+        magic = f.read(6)
+    if magic.startswith(ZSTD_MAGIC):
+        fileobj = _ZstdReader(path)
+        try:
+            with tarfile.open(fileobj=fileobj, mode="r|") as tar:
+                yield tar
+        finally:
+            fileobj.close()
+    elif magic.startswith(XZ_MAGIC):
+        with tarfile.open(path, mode="r|xz") as tar:
+            yield tar
+    else:
+        raise ValueError(f"{path} is not an AppNEra bundle")
+
+
+def _is_safe_member(member: tarfile.TarInfo) -> bool:
+    """Reject absolute paths, parent references and links in an archive"""
+    path = Path(member.name)
+    return not path.is_absolute() and ".." not in path.parts and (member.isfile() or member.isdir())
+
+
+def _bundle_app_names(
+    tar: tarfile.TarFile, member: Optional[tarfile.TarInfo], on_progress: Callable[[str], None]
+) -> Set[str]:
+    """Read the manifest, which leads every bundle, and return the app names it lists that are safe to use"""
+    if member is None or member.name != BUNDLE_MANIFEST or not member.isfile():
+        raise ValueError("The archive has no AppNEra bundle manifest")
+    try:
+        names = json.loads(tar.extractfile(member).read())["apps"]
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("The bundle manifest is damaged")
+
+    valid = set()
+    for name in names:
+        name = str(name)
+        if not name or name.startswith(".") or Path(name).name != name or name in RESERVED_NAMES:
+            on_progress(f"Skipped {name}: not a valid app name")
+        else:
+            valid.add(name)
+    return valid
+
+
+def _finish_import(app_dir: Path):
+    """Recreate the venv, runtime, launchers and icons of an extracted app"""
+    config = read_app_config(app_dir)
+    name = app_dir.name
+    app_id = config.get("id") or app_id_for(name)
+    if config.get("backend") == "webkitgtk":
+        # WebKitGTK apps run on this machine's PyGObject and WebKitGTK
+        webkit = runtime.find_webkit_runtime()
+        if webkit is None:
+            raise ValueError("it needs the system WebKitGTK with PyGObject")
+        runtime.create_venv(app_dir / "venv", system_site_packages=True)
+        write_app_config(app_dir, {
+            "runtime": "system",
+            "runtime_path": webkit["path"],
+            "runtime_webkit": webkit["webkit"],
+        })
+    else:
+        # The source machine's runtime settings do not apply here; pick one like a new build does
+        system = runtime.find_system_runtime()
+        runtime.create_venv(app_dir / "venv", system_site_packages=system is not None)
+        if system:
+            write_app_config(app_dir, {"runtime": "system", "runtime_path": system["path"], "runtime_qt": system["qt"]})
+        else:
+            runtime.install_runtime(app_dir / "venv")
+            write_app_config(app_dir, {"runtime": "private"})
+    write_launchers(app_dir, name, app_id)
+    if (app_dir / "icon.png").exists():
+        icons.install_app_icon(app_dir, app_id, app_dir / "icon.png")
+
+
+def import_apps(archive: Path, on_progress: Callable[[str], None] = print) -> List[str]:
+    """Recreate the apps stored in a bundle and return their names.
+
+    Only the apps the bundle's manifest lists are imported, and apps
+    that already exist are skipped. Files are extracted in one streaming
+    pass into a staging directory next to the apps, then each app is
+    moved into place and set up in parallel.
+    """
+    APPS_DIR.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=".appnera-import-", dir=APPS_DIR))
+    skipped = set()
+    try:
+        with _open_archive(archive) as tar:
+            members = iter(tar)
+            names = _bundle_app_names(tar, next(members, None), on_progress)
+            for member in members:
+                if not _is_safe_member(member):
+                    continue
+                name = Path(member.name).parts[0]
+                if name not in names:
+                    continue
+                if (APPS_DIR / name).exists():
+                    if name not in skipped:
+                        skipped.add(name)
+                        on_progress(f"Skipped {name}: already installed")
+                    continue
+                if hasattr(tarfile, "data_filter"):
+                    tar.extract(member, staging, filter="data")
+                else:
+                    tar.extract(member, staging)
+
+        imported = []
+        for extracted in sorted(staging.iterdir()):
+            if extracted.name in names and (extracted / "app.py").exists():
+                extracted.rename(APPS_DIR / extracted.name)
+                imported.append(extracted.name)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    def finish(name: str) -> bool:
+        try:
+            _finish_import(APPS_DIR / name)
+            on_progress(f"Imported {name}")
+            return True
+        except (OSError, ValueError, subprocess.CalledProcessError) as e:
+            shutil.rmtree(APPS_DIR / name, ignore_errors=True)
+            on_progress(f"Failed to import {name}: {e}")
+            return False
+
+    if not imported:
+        return []
+    # The first app builds the shared runtime cache; the rest only link it
+    on_progress("Preparing runtime...")
+    results = [finish(imported[0])]
+    with ThreadPoolExecutor() as pool:
+        results.extend(pool.map(finish, imported[1:]))
+    # Desktop entries of all imported apps in one pass
+    reconcile_desktop_entries()
+    return [name for name, ok in zip(imported, results) if ok]
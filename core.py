@@ -0,0 +1,400 @@
+"""
+AppNEra core helpers shared by the GUI and the command line
+
+Nothing in here depends on a display, so it can be used from headless
+commands such as export and import, and from the benchmark suite in
+benchmarks/. App discovery, sizes, icon thumbnails and uninstalling live
+here; building is in build.py.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from monitor import read_process_table
+
+TEMPLATE_DIR = Path(__file__).parent / "template"
+APPS_DIR = Path.home() / ".local"
+DESKTOP_DIR = Path.home() / ".local" / "share" / "applications"
+ICON_DIR = Path.home() / ".local" / "share" / "icons"
+# Per-app HTTP cache used by app.py (web storage itself lives in <app>/profile)
+APP_CACHE_DIR = Path.home() / ".cache" / "appnera" / "apps"
+
+# Template files installed into every app, mapped to their file name in the app
+TEMPLATE_FILES = {
+    "app.py": "app.py",
+    "app_webkit.py": "app_webkit.py",
+    "uninstall.sh.in": "uninstall.sh",
+    "run.sh.in": "run.sh",
+    "app.desktop.in": "{app_id}.desktop",
+}
+EXECUTABLE_FILES = {"run.sh", "uninstall.sh"}
+
+# Content hashes of the template files each app was last written from
+TEMPLATE_RECORD = ".template-hashes.json"
+
+# Checkpoint of a build that has not finished (see build.py)
+BUILD_STATE = ".build-state.json"
+
+# Background services started at login through XDG autostart entries
+AUTOSTART_DIR = Path.home() / ".config" / "autostart"
+
+# Per-user zygote that keeps Qt imported for all apps
+ZYGOTE_PATH = Path.home() / ".local" / "share" / "appnera" / "zygote.py"
+ZYGOTE_AUTOSTART = AUTOSTART_DIR / "appnera-zygote.desktop"
+
+# Memory governor that discards hidden apps under memory pressure
+GOVERNOR_AUTOSTART = AUTOSTART_DIR / "appnera-governor.desktop"
+
+
+def app_id_for(name: str) -> str:
+    """Derive the app id used for .desktop and icon file names"""
+    return name.lower().replace(" ", "-")
+
+
+def render_template(template_name: str, app_dir: Path, name: str, app_id: str) -> str:
+    """Fill in the @APP_NAME@, @APP_ID@ and @APP_DIR@ placeholders of a template file"""
+    content = (TEMPLATE_DIR / template_name).read_text()
+    for placeholder, value in (("@APP_NAME@", name), ("@APP_ID@", app_id), ("@APP_DIR@", str(app_dir))):
+        content = content.replace(placeholder, value)
+    return content
+
+
+def installed_app_dirs() -> List[Path]:
+    """Return the directories of all apps created by AppNEra, sorted by name"""
+    if not APPS_DIR.exists():
+        return []
+    return sorted(
+        item for item in APPS_DIR.iterdir()
+        if item.is_dir() and (item / "app.py").exists() and (item / "run.sh").exists()
+        and not (item / BUILD_STATE).exists()
+    )
+
+
+def list_apps() -> List[dict]:
+    """Return the name, directory and id of every installed app, sorted by name"""
+    return [{"name": app_dir.name, "path": app_dir, "id": app_id_for(app_dir.name)} for app_dir in installed_app_dirs()]
+
+
+def dir_size(path: Path) -> int:
+    """Total size of the files below a directory (symlinks are not followed)"""
+    total = 0
+    pending = [str(path)]
+    while pending:
+        try:
+            entries = os.scandir(pending.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    else:
+                        total += entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    pass
+    return total
+
+
+def load_thumbnail(path: Path, size: int):
+    """Decode an image scaled to size x size pixels, or None if Pillow or the file is missing"""
+    try:
+        from PIL import Image
+        with Image.open(path) as img:
+            # Let JPEG decode at a reduced scale and shrink in cheap steps first
+            img.draft("RGB", (size, size))
+            return img.resize((size, size), Image.Resampling.LANCZOS, reducing_gap=3.0)
+    except Exception:
+        return None
+
+
+def uninstall_app(app_dir: Path, app_id: str):
+    """Remove an app's desktop entry, icons, directory and HTTP cache"""
+    for link in (DESKTOP_DIR / f"{app_id}.desktop", ICON_DIR / f"{app_id}.png"):
+        if link.is_symlink() or link.exists():
+            link.unlink()
+    for icon in ICON_DIR.glob(f"hicolor/*/apps/{app_id}.png"):
+        icon.unlink()
+    if app_dir.exists():
+        shutil.rmtree(app_dir)
+    shutil.rmtree(APP_CACHE_DIR / app_id, ignore_errors=True)
+
+
+def read_app_config(app_dir: Path) -> dict:
+    """Read per-app settings from the app's app.conf"""
+    config = {}
+    try:
+        with open(app_dir / "app.conf", "r") as f:
+            for line in f:
+                key, sep, value = line.strip().partition("=")
+                if sep:
+                    config[key.strip()] = value.strip()
+    except OSError:
+        pass
+    return config
+
+
+def write_app_config(app_dir: Path, updates: dict):
+    """Update per-app settings in the app's app.conf"""
+    config = read_app_config(app_dir)
+    config.update(updates)
+    tmp_path = app_dir / "app.conf.tmp"
+    with open(tmp_path, "w") as f:
+        for key, value in config.items():
+            f.write(f"{key}={value}\n")
+    os.replace(tmp_path, app_dir / "app.conf")
+
+
+def template_hashes() -> Dict[str, str]:
+    """Hash the current template files"""
+    return {
+        name: hashlib.sha256((TEMPLATE_DIR / name).read_bytes()).hexdigest()
+        for name in TEMPLATE_FILES
+    }
+
+
+def read_template_record(app_dir: Path) -> Dict[str, str]:
+    """Return the template hashes an app was last written from"""
+    try:
+        with open(app_dir / TEMPLATE_RECORD, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def install_template_files(
+    app_dir: Path,
+    name: str,
+    app_id: str,
+    templates: Iterable[str] = tuple(TEMPLATE_FILES),
+    hashes: Optional[Dict[str, str]] = None,
+):
+    """Write template files into an app atomically and record their hashes.
+
+    `.in` templates are rendered with the app's name, id and directory;
+    everything else is copied as is.
+    """
+    hashes = hashes or template_hashes()
+    record = read_template_record(app_dir)
+    for template in templates:
+        target = app_dir / TEMPLATE_FILES[template].format(app_id=app_id)
+        if template.endswith(".in"):
+            content = render_template(template, app_dir, name, app_id).encode()
+        else:
+            content = (TEMPLATE_DIR / template).read_bytes()
+        tmp_path = target.with_name(f".{target.name}.tmp")
+        tmp_path.write_bytes(content)
+        if target.name in EXECUTABLE_FILES:
+            os.chmod(tmp_path, 0o755)
+        os.replace(tmp_path, target)
+        record[template] = hashes[template]
+
+    tmp_path = app_dir / f"{TEMPLATE_RECORD}.tmp"
+    tmp_path.write_text(json.dumps(record, indent=2))
+    os.replace(tmp_path, app_dir / TEMPLATE_RECORD)
+
+
+def write_launchers(app_dir: Path, name: str, app_id: str):
+    """Write run.sh and the .desktop entry for an app from the templates"""
+    install_template_files(app_dir, name, app_id, templates=("run.sh.in", "app.desktop.in"))
+
+
+def migrate_legacy_launcher(app_dir: Path):
+    """Move settings exported by an old-style run.sh into app.conf"""
+    legacy_keys = {"APPNERA_APP_NAME": "name", "APPNERA_APP_ID": "id", "APPNERA_URL": "url"}
+    config = read_app_config(app_dir)
+    updates = {}
+    try:
+        for line in (app_dir / "run.sh").read_text().splitlines():
+            if line.startswith("export "):
+                var, _, value = line[len("export "):].partition("=")
+                key = legacy_keys.get(var.strip())
+                if key and key not in config:
+                    updates[key] = value.strip().strip('"')
+    except OSError:
+        return
+    if updates:
+        write_app_config(app_dir, updates)
+
+
+def sync_app(app_dir: Path, hashes: Dict[str, str]) -> List[str]:
+    """Rewrite the template files of an app that differ from the current templates"""
+    record = read_template_record(app_dir)
+    changed = [template for template, digest in hashes.items() if record.get(template) != digest]
+    if changed:
+        if "run.sh.in" in changed:
+            migrate_legacy_launcher(app_dir)
+        config = read_app_config(app_dir)
+        install_template_files(
+            app_dir,
+            config.get("name") or app_dir.name,
+            config.get("id") or app_id_for(app_dir.name),
+            templates=changed,
+            hashes=hashes,
+        )
+    return changed
+
+
+def sync_apps(app_dirs: List[Path]) -> Tuple[Dict[str, List[str]], Dict[str, str]]:
+    """Bring the template files of many apps up to date in parallel.
+
+    Returns the updated templates per app name (apps that were already
+    current cost one small JSON read and map to an empty list) and the
+    error message for every app that could not be updated.
+    """
+    hashes = template_hashes()
+    updated = {}
+    errors = {}
+
+    def sync(app_dir: Path):
+        try:
+            updated[app_dir.name] = sync_app(app_dir, hashes)
+        except OSError as e:
+            errors[app_dir.name] = str(e)
+
+    with ThreadPoolExecutor() as pool:
+        list(pool.map(sync, app_dirs))
+    return updated, errors
+
+
+def link_atomically(link: Path, target: Path):
+    """Point `link` at `target`, replacing whatever is there in one step"""
+    link.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = link.with_name(f".{link.name}.tmp")
+    if tmp_path.is_symlink() or tmp_path.exists():
+        tmp_path.unlink()
+    tmp_path.symlink_to(target)
+    os.replace(tmp_path, link)
+
+
+def register_desktop_entry(app_dir: Path, app_id: str):
+    """Link the app's .desktop entry and icon into the user's standard locations"""
+    link_atomically(DESKTOP_DIR / f"{app_id}.desktop", app_dir / f"{app_id}.desktop")
+    link_atomically(ICON_DIR / f"{app_id}.png", app_dir / "icon.png")
+
+
+def write_autostart_entry(path: Path, name: str, comment: str, command: List[str]):
+    """Start a command at every login"""
+    exec_line = " ".join(f'"{arg}"' for arg in command)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        "[Desktop Entry]\n"
+        "Type=Application\n"
+        f"Name={name}\n"
+        f"Comment={comment}\n"
+        f"Exec={exec_line}\n"
+        "NoDisplay=true\n"
+        "Terminal=false\n"
+    )
+
+
+def start_detached(command: List[str]):
+    """Start a background process that outlives the caller"""
+    subprocess.Popen(
+        command,
+        cwd=str(Path.home()),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def stop_processes(pids: List[int]):
+    """Ask processes to terminate"""
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+
+def zygote_command() -> List[str]:
+    """Command line that runs the installed zygote with the Python apps use"""
+    return [shutil.which("python3") or "python3", "-I", "-S", str(ZYGOTE_PATH)]
+
+
+def zygote_pids() -> List[int]:
+    """Return the pids of running zygotes (not the apps forked from them)"""
+    table = read_process_table()
+    zygotes = {pid for pid, proc in table.items() if str(ZYGOTE_PATH) in proc["cmdline"]}
+    return sorted(pid for pid in zygotes if table[pid]["ppid"] not in zygotes)
+
+
+def enable_zygote():
+    """Install the zygote, start it at every login and start it now"""
+    ZYGOTE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = ZYGOTE_PATH.with_name(f".{ZYGOTE_PATH.name}.tmp")
+    shutil.copy(TEMPLATE_DIR / "zygote.py", tmp_path)
+    os.replace(tmp_path, ZYGOTE_PATH)
+    write_autostart_entry(
+        ZYGOTE_AUTOSTART,
+        "AppNEra Prelauncher",
+        "Keeps Qt loaded so AppNEra apps start faster",
+        zygote_command(),
+    )
+    # Restart so an updated zygote.py takes effect (forked apps keep running)
+    stop_processes(zygote_pids())
+    start_detached(zygote_command())
+
+
+def disable_zygote():
+    """Stop the zygote and stop starting it at login"""
+    ZYGOTE_AUTOSTART.unlink(missing_ok=True)
+    stop_processes(zygote_pids())
+    ZYGOTE_PATH.unlink(missing_ok=True)
+
+
+def governor_command() -> List[str]:
+    """Command line that runs the memory governor"""
+    return [sys.executable, str(Path(__file__).resolve().parent / "appnera.py"), "governor"]
+
+
+def _runs_governor(pid: int, cmdline: List[str], script: Path) -> bool:
+    """Check whether a command line runs `script` with the governor command (`governor` or `governor run`)"""
+    position = next((index for index, arg in enumerate(cmdline) if Path(arg).name == script.name), None)
+    if position is None:
+        return False
+    try:
+        # Relative script paths are resolved against the process's own working directory
+        if (Path(os.readlink(f"/proc/{pid}/cwd")) / cmdline[position]).resolve() != script:
+            return False
+    except OSError:
+        return False
+    command = [arg for arg in cmdline[position + 1:] if not arg.startswith("-")]
+    return command[:1] == ["governor"] and command[1:2] in ([], ["run"])
+
+
+def governor_pids() -> List[int]:
+    """Return the pids of running memory governors, however they were started"""
+    script = Path(__file__).resolve().parent / "appnera.py"
+    return sorted(
+        pid for pid, proc in read_process_table().items()
+        if pid != os.getpid() and _runs_governor(pid, proc["cmdline"], script)
+    )
+
+
+def enable_governor():
+    """Start the memory governor at every login and start it now"""
+    write_autostart_entry(
+        GOVERNOR_AUTOSTART,
+        "AppNEra Memory Governor",
+        "Frees memory of hidden AppNEra apps when the system runs low",
+        governor_command(),
+    )
+    if not governor_pids():
+        start_detached(governor_command())
+
+
+def disable_governor():
+    """Stop the memory governor and stop starting it at login"""
+    GOVERNOR_AUTOSTART.unlink(missing_ok=True)
+    stop_processes(governor_pids())
@@ -0,0 +1,141 @@
+"""
+Desktop integration reconciler
+
+Every installed app has two links in the user's standard locations:
+~/.local/share/applications/<id>.desktop and ~/.local/share/icons/<id>.png,
+both pointing into the app directory. Interrupted builds, apps deleted by
+hand and old uninstall scripts leave dangling or stale links behind, which
+the desktop keeps indexing. The reconciler compares the installed apps
+with both directories in one pass, replaces or removes the links that
+differ (each one atomically) and refreshes the desktop database once at
+the end, so batch operations call it once instead of once per app.
+"""
+
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import icons
+from core import (
+    APPS_DIR,
+    BUILD_STATE,
+    DESKTOP_DIR,
+    ICON_DIR,
+    app_id_for,
+    installed_app_dirs,
+    link_atomically,
+    read_app_config,
+)
+
+REFRESH_TIMEOUT = 30
+
+
+def _app_links(directory: Path, suffix: str, target_name: str) -> Dict[Path, Path]:
+    """Map the links in a directory that look like an app's links to their targets.
+
+    `target_name` is the file name they point to, with {stem} for the link's own stem.
+    """
+    links = {}
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        return links
+    with entries:
+        for entry in entries:
+            if not entry.name.endswith(suffix) or not entry.is_symlink():
+                continue
+            try:
+                target = Path(os.readlink(entry.path))
+            except OSError:
+                continue
+            link = Path(entry.path)
+            if target.parent.parent == APPS_DIR and target.name == target_name.format(stem=link.stem):
+                links[link] = target
+    return links
+
+
+def _stale_app_dir(app_dir: Path) -> bool:
+    """Check that a link target's directory is a deleted or broken app, not a build in progress"""
+    if not app_dir.exists():
+        return True
+    is_app = (app_dir / "app.py").exists() or (app_dir / "app.conf").exists()
+    return is_app and not (app_dir / BUILD_STATE).exists()
+
+
+def expected_links(app_dirs: List[Path]) -> Dict[Path, Path]:
+    """Return the link every installed app should have, mapped to its target"""
+    expected = {}
+    for app_dir in app_dirs:
+        app_id = read_app_config(app_dir).get("id") or app_id_for(app_dir.name)
+        for link, target in (
+            (DESKTOP_DIR / f"{app_id}.desktop", app_dir / f"{app_id}.desktop"),
+            (ICON_DIR / f"{app_id}.png", app_dir / "icon.png"),
+        ):
+            # Apps missing the file itself are left to the doctor
+            if target.exists():
+                expected[link] = target
+    return expected
+
+
+def plan_links() -> Tuple[Dict[Path, Path], List[Path]]:
+    """Compare the installed apps with the desktop and icon directories.
+
+    Returns the links to create or replace, mapped to their targets, and
+    the links to remove. Links into unfinished builds are left alone.
+    """
+    expected = expected_links(installed_app_dirs())
+    existing = {
+        **_app_links(DESKTOP_DIR, ".desktop", "{stem}.desktop"),
+        **_app_links(ICON_DIR, ".png", "icon.png"),
+    }
+
+    to_link = {}
+    for link, target in expected.items():
+        if existing.get(link) != target:
+            to_link[link] = target
+    to_remove = [
+        link for link, target in existing.items()
+        if link not in expected and _stale_app_dir(target.parent)
+    ]
+    return to_link, sorted(to_remove)
+
+
+def refresh_desktop_database():
+    """Rebuild the desktop's MIME and menu cache for the user's applications, if the tool is installed"""
+    if shutil.which("update-desktop-database") is None or not DESKTOP_DIR.is_dir():
+        return
+    try:
+        subprocess.run(
+            ["update-desktop-database", "-q", str(DESKTOP_DIR)],
+            capture_output=True,
+            timeout=REFRESH_TIMEOUT,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+
+
+def reconcile_desktop_entries(refresh: bool = False) -> dict:
+    """Fix every desktop and icon link that differs from the installed apps.
+
+    The desktop database is refreshed once if anything changed (or always
+    with `refresh`, e.g. after .desktop files were rewritten). Returns the
+    names of the links that were (re)created and removed.
+    """
+    to_link, to_remove = plan_links()
+    for link, target in to_link.items():
+        link_atomically(link, target)
+    for link in to_remove:
+        try:
+            app_gone = not Path(os.readlink(link)).parent.exists()
+            link.unlink()
+        except FileNotFoundError:
+            continue
+        if app_gone:
+            # Rendered icon sizes of a deleted app
+            icons.remove_app_icons(link.stem)
+
+    if to_link or to_remove or refresh:
+        refresh_desktop_database()
+    return {"linked": [link.name for link in to_link], "removed": [link.name for link in to_remove]}
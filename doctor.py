@@ -0,0 +1,318 @@
+"""
+Integrity check and self-repair for installed apps
+
+Checks every app in parallel and repairs only what is broken: template
+files, the venv interpreter, runtime files (against the runtime cache
+manifest for private runtimes, the system PyQt5 or PyGObject for apps
+using them, or pip's RECORD for apps built before runtimes were shared),
+the imports of the app's web engine, and the desktop entry and icon
+links. Repairs end with one pass of the desktop reconciler, which also
+drops links left behind by deleted apps. Nothing is downloaded unless
+the caller allows it.
+"""
+
+import base64
+import csv
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+import runtime
+from core import (
+    DESKTOP_DIR,
+    ICON_DIR,
+    TEMPLATE_FILES,
+    app_id_for,
+    install_template_files,
+    read_app_config,
+    register_desktop_entry,
+    write_app_config,
+)
+from desktop import reconcile_desktop_entries
+
+PROBE_TIMEOUT = 60
+
+# Imports app.py needs, run the same way the launcher runs it (-I -S)
+IMPORT_PROBE = (
+    "import sys; sys.path.extend(sys.argv[1:]); "
+    "from PyQt5 import QtCore, QtGui, QtNetwork, QtWidgets, QtWebEngineCore, QtWebEngineWidgets"
+)
+
+# The same for apps on the WebKitGTK backend
+WEBKIT_IMPORT_PROBE = "import sys; sys.path.extend(sys.argv[1:])\n" + runtime.WEBKIT_PROBE
+
+
+def _finding(check: str, status: str, detail: str = "") -> dict:
+    """Describe the outcome of one check (ok, repaired, broken, failed or unknown)"""
+    return {"check": check, "status": status, "detail": detail}
+
+
+def _probe(args: List[str]) -> subprocess.CompletedProcess:
+    """Run a probe command without a display"""
+    return subprocess.run(
+        args,
+        capture_output=True,
+        text=True,
+        timeout=PROBE_TIMEOUT,
+        env=dict(os.environ, QT_QPA_PLATFORM="offscreen"),
+    )
+
+
+def _check_interpreter(venv_dir: Path, config: dict, repair: bool) -> dict:
+    """Make sure the venv's python starts, re-linking it to the system python if not"""
+    python = venv_dir / "bin" / "python"
+    try:
+        if _probe([str(python), "-I", "-S", "-c", "pass"]).returncode == 0:
+            return _finding("interpreter", "ok")
+    except OSError:
+        pass
+    if not repair:
+        return _finding("interpreter", "broken", f"{python} does not start")
+    # Re-point the venv at the current system Python (e.g. after an upgrade)
+    runtime.create_venv(venv_dir, system_site_packages=config.get("runtime") == "system")
+    if _probe([str(python), "-I", "-S", "-c", "pass"]).returncode == 0:
+        return _finding("interpreter", "repaired", "re-linked the venv to the system Python")
+    return _finding("interpreter", "failed", "venv could not be upgraded")
+
+
+def _damaged_runtime_files(cache: Path, site_packages: Path, manifest: dict, deep: bool) -> List[str]:
+    """List runtime files in a venv that are missing or differ from the manifest.
+
+    Files hard-linked to the cache share its inode and are trusted unless
+    `deep` is set; everything else is compared by size (and hash if deep).
+    """
+    damaged = []
+    for relative, (size, digest) in manifest.items():
+        try:
+            stat = os.stat(site_packages / relative)
+        except OSError:
+            damaged.append(relative)
+            continue
+        if stat.st_size != size:
+            damaged.append(relative)
+            continue
+        try:
+            shared = stat.st_ino == os.stat(cache / relative).st_ino
+        except OSError:
+            shared = False
+        if deep or not shared:
+            if runtime.file_sha256(site_packages / relative) != digest:
+                damaged.append(relative)
+    return damaged
+
+
+def _check_runtime(venv_dir: Path, repair: bool, deep: bool, download: bool) -> dict:
+    """Compare the venv's private runtime with the cache manifest and restore damaged files"""
+    try:
+        site_packages = runtime.venv_site_packages(venv_dir)
+    except ValueError as e:
+        return _finding("runtime files", "failed", str(e))
+    cache = runtime.RUNTIME_CACHE_DIR / site_packages.parent.name
+    if not (cache / runtime.COMPLETE_MARKER).exists():
+        if not repair:
+            return _finding("runtime files", "unknown", "no runtime cache to compare against")
+        try:
+            runtime.prepare_runtime_cache(venv_dir, download)
+        except OSError as e:
+            return _finding("runtime files", "unknown", f"no runtime cache to compare against: {e}")
+
+    manifest = runtime.read_manifest(cache)
+    damaged = _damaged_runtime_files(cache, site_packages, manifest, deep)
+    if not damaged:
+        return _finding("runtime files", "ok", f"{len(manifest)} files verified")
+    if not repair:
+        return _finding("runtime files", "broken", f"{len(damaged)} files missing or damaged")
+
+    # Rebuild the cache first if the damage is in the shared copy itself
+    cache_damaged = any(
+        not (cache / relative).exists() or runtime.file_sha256(cache / relative) != manifest[relative][1]
+        for relative in damaged
+    )
+    if cache_damaged:
+        (cache / runtime.COMPLETE_MARKER).unlink(missing_ok=True)
+        cache = runtime.prepare_runtime_cache(venv_dir, download)
+    for relative in damaged:
+        runtime.link_file(cache, site_packages, relative)
+    return _finding("runtime files", "repaired", f"restored {len(damaged)} files")
+
+
+def _damaged_record_files(site_packages: Path, record: Path, deep: bool) -> List[str]:
+    """List files of one installed distribution that are missing or differ from its RECORD"""
+    damaged = []
+    with open(record, newline="") as f:
+        for row in csv.reader(f):
+            if len(row) < 3 or not row[1] or row[0].startswith(".."):
+                continue
+            relative, digest, size = row[:3]
+            path = site_packages / relative
+            try:
+                if size and path.stat().st_size != int(size):
+                    damaged.append(relative)
+                    continue
+            except OSError:
+                damaged.append(relative)
+                continue
+            algorithm, _, expected = digest.partition("=")
+            if deep and algorithm == "sha256":
+                actual = base64.urlsafe_b64encode(bytes.fromhex(runtime.file_sha256(path))).rstrip(b"=")
+                if actual.decode() != expected:
+                    damaged.append(relative)
+    return damaged
+
+
+def _check_installed_runtime(venv_dir: Path, deep: bool) -> dict:
+    """Check a runtime pip installed into the venv against its own RECORD files.
+
+    Apps built before runtimes were shared have no runtime setting; their
+    PyQt5 may be a different build from the cache's, so it is only
+    checked, and rebuilding the app is the repair.
+    """
+    try:
+        site_packages = runtime.venv_site_packages(venv_dir)
+    except ValueError as e:
+        return _finding("runtime files", "failed", str(e))
+    records = [
+        dist_info / "RECORD"
+        for package in runtime.RUNTIME_PACKAGES
+        for dist_info in site_packages.glob(f"{package}[-_]*.dist-info")
+        if (dist_info / "RECORD").is_file()
+    ]
+    if not records:
+        return _finding("runtime files", "unknown", "runtime not installed from the cache and has no RECORD")
+    damaged = [relative for record in records for relative in _damaged_record_files(site_packages, record, deep)]
+    if damaged:
+        return _finding("runtime files", "broken", f"{len(damaged)} files missing or damaged, rebuild the app")
+    return _finding("runtime files", "ok", f"verified against {len(records)} RECORD files")
+
+
+def _check_system_runtime(app_dir: Path, config: dict, repair: bool, download: bool) -> dict:
+    """Make sure the system PyQt5 an app uses is still installed, else give it a private one"""
+    path = Path(config.get("runtime_path", ""))
+    if (path / "PyQt5").is_dir():
+        return _finding("runtime files", "ok", f"system PyQt5 in {path}")
+    if not repair:
+        return _finding("runtime files", "broken", f"system PyQt5 is gone from {path}")
+    venv_dir = app_dir / "venv"
+    try:
+        runtime.install_runtime(venv_dir, download)
+    except OSError as e:
+        return _finding("runtime files", "failed", f"system PyQt5 is gone from {path}: {e}")
+    runtime.set_system_site_packages(venv_dir, False)
+    write_app_config(app_dir, {"runtime": "private"})
+    return _finding("runtime files", "repaired", "system PyQt5 is gone, installed a private runtime")
+
+
+def _check_webkit_runtime(app_dir: Path, config: dict, repair: bool) -> dict:
+    """Make sure the system PyGObject and WebKitGTK a WebKitGTK app uses are still installed"""
+    path = Path(config.get("runtime_path", ""))
+    if (path / "gi").is_dir():
+        return _finding("runtime files", "ok", f"system PyGObject in {path}")
+    if not repair:
+        return _finding("runtime files", "broken", f"system PyGObject is gone from {path}")
+    webkit = runtime.find_webkit_runtime()
+    if webkit is None:
+        return _finding("runtime files", "failed", "the system WebKitGTK with PyGObject is no longer installed")
+    write_app_config(app_dir, {"runtime_path": webkit["path"], "runtime_webkit": webkit["webkit"]})
+    return _finding("runtime files", "repaired", f"system PyGObject moved to {webkit['path']}")
+
+
+def _check_imports(venv_dir: Path, config: dict) -> dict:
+    """Import the modules app.py needs with the app's interpreter"""
+    probe = WEBKIT_IMPORT_PROBE if config.get("backend") == "webkitgtk" else IMPORT_PROBE
+    try:
+        paths = [str(runtime.venv_site_packages(venv_dir))]
+        if config.get("runtime") == "system" and config.get("runtime_path"):
+            paths.append(config["runtime_path"])
+        result = _probe([str(venv_dir / "bin" / "python"), "-I", "-S", "-c", probe, *paths])
+    except (OSError, ValueError, subprocess.TimeoutExpired) as e:
+        return _finding("imports", "failed", str(e))
+    if result.returncode == 0:
+        return _finding("imports", "ok")
+    return _finding("imports", "failed", result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "")
+
+
+def _check_template_files(app_dir: Path, name: str, app_id: str, repair: bool) -> dict:
+    """Restore missing app.py, uninstall.sh, run.sh or .desktop files"""
+    missing = [
+        template for template, target in TEMPLATE_FILES.items()
+        if not (app_dir / target.format(app_id=app_id)).exists()
+    ]
+    if not missing:
+        return _finding("app files", "ok")
+    if not repair:
+        return _finding("app files", "broken", f"missing {', '.join(missing)}")
+    install_template_files(app_dir, name, app_id, templates=missing)
+    return _finding("app files", "repaired", f"restored {', '.join(missing)}")
+
+
+def _check_desktop_links(app_dir: Path, app_id: str, repair: bool) -> dict:
+    """Make sure the .desktop and icon links point into the app directory"""
+    expected = {
+        DESKTOP_DIR / f"{app_id}.desktop": app_dir / f"{app_id}.desktop",
+        ICON_DIR / f"{app_id}.png": app_dir / "icon.png",
+    }
+    broken = [
+        link.name for link, target in expected.items()
+        if not link.is_symlink() or Path(os.readlink(link)) != target or not link.exists()
+    ]
+    if not broken:
+        return _finding("desktop links", "ok")
+    if not repair:
+        return _finding("desktop links", "broken", f"{', '.join(broken)} missing or dangling")
+    if not (app_dir / "icon.png").exists():
+        return _finding("desktop links", "failed", "icon.png is missing from the app")
+    register_desktop_entry(app_dir, app_id)
+    return _finding("desktop links", "repaired", f"re-linked {', '.join(broken)}")
+
+
+def check_app(app_dir: Path, repair: bool = True, deep: bool = False, download: bool = False) -> List[dict]:
+    """Check one app and repair what is broken (unless `repair` is False).
+
+    Repairs use only local caches unless `download` is set.
+    """
+    config = read_app_config(app_dir)
+    name = config.get("name") or app_dir.name
+    app_id = config.get("id") or app_id_for(app_dir.name)
+    venv_dir = app_dir / "venv"
+
+    findings = []
+    for check in (
+        lambda: _check_template_files(app_dir, name, app_id, repair),
+        lambda: _check_interpreter(venv_dir, config, repair),
+        lambda: (
+            _check_webkit_runtime(app_dir, config, repair) if config.get("backend") == "webkitgtk"
+            else _check_system_runtime(app_dir, config, repair, download) if config.get("runtime") == "system"
+            else _check_runtime(venv_dir, repair, deep, download) if config.get("runtime") == "private"
+            else _check_installed_runtime(venv_dir, deep)
+        ),
+        lambda: _check_desktop_links(app_dir, app_id, repair),
+    ):
+        try:
+            findings.append(check())
+        except (OSError, ValueError, subprocess.SubprocessError) as e:
+            findings.append(_finding("error", "failed", str(e)))
+
+    # The import probe is the end-to-end check, so run it after the repairs
+    if all(f["status"] != "failed" for f in findings):
+        findings.append(_check_imports(venv_dir, read_app_config(app_dir)))
+    return findings
+
+
+def check_apps(
+    app_dirs: List[Path], repair: bool = True, deep: bool = False, download: bool = False
+) -> Dict[str, List[dict]]:
+    """Check many apps in parallel"""
+    with ThreadPoolExecutor() as pool:
+        results = dict(zip(
+            (app_dir.name for app_dir in app_dirs),
+            pool.map(lambda app_dir: check_app(app_dir, repair, deep, download), app_dirs),
+        ))
+    if repair:
+        relinked = any(
+            f["check"] == "desktop links" and f["status"] == "repaired"
+            for findings in results.values() for f in findings
+        )
+        reconcile_desktop_entries(refresh=relinked)
+    return results
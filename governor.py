@@ -0,0 +1,194 @@
+"""
+Memory-pressure governor for running AppNEra apps
+
+Watches Linux pressure stall information (/proc/pressure/memory) and the
+memory of every running app. When the system is under memory pressure it
+asks the least recently used hidden apps to discard their page, through
+the control socket each app.py listens on, and logs every decision.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from core import installed_app_dirs
+from monitor import find_app_processes, read_process_table, read_rss
+
+PSI_PATH = Path("/proc/pressure/memory")
+CONFIG_PATH = Path.home() / ".config" / "appnera" / "governor.conf"
+LOG_PATH = Path.home() / ".cache" / "appnera" / "governor.log"
+LOG_MAX_BYTES = 1024 * 1024
+CONTROL_TIMEOUT = 2.0
+
+# Thresholds and timings, overridable in governor.conf (key=value lines)
+DEFAULTS = {
+    # avg10 "some" pressure (%) at which the least recently used hidden app is discarded
+    "some_threshold": 10.0,
+    # avg10 "full" pressure (%) at which every eligible hidden app is discarded
+    "full_threshold": 5.0,
+    # Seconds an app must have been unused before it can be discarded
+    "min_idle": 300.0,
+    # Apps using less memory than this (MB) are not worth discarding
+    "min_rss_mb": 150.0,
+    # Seconds between pressure checks
+    "interval": 5.0,
+    # Seconds to wait after discarding before acting again
+    "cooldown": 30.0,
+}
+
+
+def load_config() -> Dict[str, float]:
+    """Read governor settings, falling back to the defaults"""
+    config = dict(DEFAULTS)
+    try:
+        with open(CONFIG_PATH, "r") as f:
+            for line in f:
+                key, sep, value = line.strip().partition("=")
+                if sep and key.strip() in DEFAULTS:
+                    try:
+                        config[key.strip()] = float(value)
+                    except ValueError:
+                        pass
+    except OSError:
+        pass
+    return config
+
+
+def read_pressure() -> Optional[Dict[str, float]]:
+    """Return the avg10 memory pressure of the "some" and "full" lines, or None without PSI"""
+    try:
+        with open(PSI_PATH, "r") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    pressure = {}
+    for line in lines:
+        kind, *fields = line.split()
+        values = dict(field.split("=") for field in fields)
+        pressure[kind] = float(values["avg10"])
+    return pressure
+
+
+def control_socket_dir() -> Path:
+    """Directory of the per-process control sockets (CONTROL_DIR in app.py)"""
+    return Path(os.environ.get("XDG_RUNTIME_DIR") or f"/tmp/appnera-{os.getuid()}") / "appnera-control"
+
+
+def send_command(pid: int, command: str) -> Optional[dict]:
+    """Send a command to the app process `pid` and return its reply"""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CONTROL_TIMEOUT)
+            sock.connect(str(control_socket_dir() / f"{pid}.sock"))
+            sock.sendall(json.dumps({"command": command}).encode() + b"\n")
+            with sock.makefile("r") as replies:
+                return json.loads(replies.readline())
+    except (OSError, ValueError):
+        return None
+
+
+def running_apps() -> List[dict]:
+    """Find running apps with their memory, control pid and window state"""
+    apps = [{"name": app_dir.name, "path": app_dir, "id": app_dir.name} for app_dir in installed_app_dirs()]
+    processes = find_app_processes(read_process_table(), apps)
+    sockets = control_socket_dir()
+    result = []
+    for app in apps:
+        pids = processes.get(app["id"])
+        if not pids:
+            continue
+        control_pid = next((pid for pid in pids if (sockets / f"{pid}.sock").exists()), None)
+        status = send_command(control_pid, "status") if control_pid else None
+        if status is None:
+            continue
+        result.append({
+            "name": app["name"],
+            "pid": control_pid,
+            "rss": sum(read_rss(pid) for pid in pids),
+            **status,
+        })
+    return result
+
+
+class MemoryGovernor(threading.Thread):
+    """Worker thread that discards hidden apps while memory is under pressure.
+
+    `log` receives one line per decision.
+    """
+
+    def __init__(self, config: Optional[Dict[str, float]] = None, log: Callable[[str], None] = print):
+        super().__init__(daemon=True)
+        self.config = config or load_config()
+        self.log = log
+        self.last_action = 0.0
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        if read_pressure() is None:
+            self.log(f"{PSI_PATH} is not available (Linux 4.20+ with PSI enabled is required)")
+            return
+        self.log(f"Watching memory pressure: {json.dumps(self.config)}")
+        while not self._stop_event.wait(self.config["interval"]):
+            try:
+                self.step()
+            except OSError as e:
+                self.log(f"Check failed: {e}")
+
+    def step(self) -> List[str]:
+        """Check pressure once and discard apps if needed; returns the names discarded"""
+        pressure = read_pressure() or {}
+        some, full = pressure.get("some", 0.0), pressure.get("full", 0.0)
+        if some < self.config["some_threshold"] and full < self.config["full_threshold"]:
+            return []
+        if time.monotonic() - self.last_action < self.config["cooldown"]:
+            return []
+
+        candidates = [
+            app for app in running_apps()
+            if app["hidden"] and not app["discarded"]
+            and app["idle"] >= self.config["min_idle"]
+            and app["rss"] >= self.config["min_rss_mb"] * 1024 * 1024
+        ]
+        if not candidates:
+            self.log(f"Pressure some={some:.1f}% full={full:.1f}%: no hidden idle app to discard")
+            self.last_action = time.monotonic()
+            return []
+
+        # Least recently used first; everything eligible under full pressure
+        candidates.sort(key=lambda app: -app["idle"])
+        if full < self.config["full_threshold"]:
+            candidates = candidates[:1]
+
+        discarded = []
+        for app in candidates:
+            reply = send_command(app["pid"], "discard") or {}
+            outcome = "discarded" if reply.get("ok") else "could not discard"
+            self.log(
+                f"Pressure some={some:.1f}% full={full:.1f}%: {outcome} {app['name']} "
+                f"({app['rss'] / (1024 * 1024):.0f} MB, idle {app['idle'] / 60:.0f} min)"
+            )
+            if reply.get("ok"):
+                discarded.append(app["name"])
+        self.last_action = time.monotonic()
+        return discarded
+
+
+def log_to_file(line: str):
+    """Append a timestamped line to the governor log, keeping it small"""
+    line = f"{time.strftime('%Y-%m-%d %H:%M:%S')} {line}"
+    print(line, flush=True)
+    try:
+        LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+        if LOG_PATH.exists() and LOG_PATH.stat().st_size > LOG_MAX_BYTES:
+            LOG_PATH.replace(LOG_PATH.with_suffix(".log.1"))
+        with open(LOG_PATH, "a") as f:
+            f.write(line + "\n")
+    except OSError:
+        pass
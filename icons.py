@@ -0,0 +1,140 @@
+"""
+App icon pipeline
+
+Decodes the icon the user picked once (PNG, JPEG, ICO or SVG), renders
+the standard hicolor sizes in parallel and installs them under
+~/.local/share/icons/hicolor, so launchers and docks load a file of the
+right size instead of rescaling the original on every render. Rendered
+sets are cached by the hash of the source file and reused.
+"""
+
+import hashlib
+import io
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict
+
+from core import ICON_DIR
+
+# Sizes of the hicolor theme's apps directories
+ICON_SIZES = (16, 22, 24, 32, 48, 64, 128, 256, 512)
+
+HICOLOR_DIR = ICON_DIR / "hicolor"
+ICON_CACHE_DIR = Path.home() / ".cache" / "appnera" / "icons"
+
+# Size the app's own icon.png is stored at
+APP_ICON_SIZE = 512
+
+SVG_TIMEOUT = 30
+
+
+def _source_hash(source: Path) -> str:
+    digest = hashlib.sha256()
+    with open(source, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _render_svg(source: Path, size: int) -> bytes:
+    """Rasterize an SVG with cairosvg or the rsvg-convert tool"""
+    try:
+        import cairosvg
+        return cairosvg.svg2png(url=str(source), output_width=size, output_height=size)
+    except ImportError:
+        if shutil.which("rsvg-convert") is None:
+            raise ValueError("SVG icons need the 'cairosvg' module or the rsvg-convert tool")
+        result = subprocess.run(
+            ["rsvg-convert", "-w", str(size), "-h", str(size), "-a", str(source)],
+            capture_output=True,
+            check=True,
+            timeout=SVG_TIMEOUT,
+        )
+        return result.stdout
+
+
+def decode_icon(source: Path):
+    """Decode an icon into a square RGBA image (SVGs are rendered at the largest size)"""
+    from PIL import Image
+
+    if source.suffix.lower() == ".svg":
+        img = Image.open(io.BytesIO(_render_svg(source, max(ICON_SIZES))))
+    else:
+        img = Image.open(source)
+        if img.format == "ICO":
+            # ICO files hold several images; use the largest
+            img.size = max(img.info.get("sizes") or [img.size])
+        img.draft("RGB", (max(ICON_SIZES), max(ICON_SIZES)))
+    # Everything is rendered from at most the largest size, so shrink huge sources first
+    img.thumbnail((max(ICON_SIZES), max(ICON_SIZES)), Image.Resampling.LANCZOS, reducing_gap=3.0)
+    img = img.convert("RGBA")
+
+    # Center non-square images on a transparent square
+    side = max(img.size)
+    if img.size != (side, side):
+        square = Image.new("RGBA", (side, side))
+        square.paste(img, ((side - img.width) // 2, (side - img.height) // 2))
+        img = square
+    return img
+
+
+def render_icon_set(source: Path) -> Dict[int, Path]:
+    """Render every hicolor size of an icon, reusing a cached set of the same file"""
+    from PIL import Image
+
+    cache = ICON_CACHE_DIR / _source_hash(source)
+    paths = {size: cache / f"{size}.png" for size in ICON_SIZES}
+    if all(path.exists() for path in paths.values()):
+        return paths
+
+    img = decode_icon(source)
+    cache.mkdir(parents=True, exist_ok=True)
+
+    def render(size: int):
+        tmp_path = paths[size].with_name(f".{size}.png.tmp.{os.getpid()}")
+        img.resize((size, size), Image.Resampling.LANCZOS, reducing_gap=3.0).save(tmp_path, "PNG", optimize=True)
+        os.replace(tmp_path, paths[size])
+
+    # Pillow releases the GIL while resizing and encoding
+    with ThreadPoolExecutor() as pool:
+        list(pool.map(render, ICON_SIZES))
+    return paths
+
+
+def _install_file(source: Path, target: Path):
+    """Hard-link a rendered icon into place, copying across file systems"""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(f".{target.name}.tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copy2(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
+def install_app_icon(app_dir: Path, app_id: str, source: Path):
+    """Store an app's icon as a PNG of APP_ICON_SIZE and install its hicolor set.
+
+    Without Pillow the source is copied as it is, as before.
+    """
+    try:
+        paths = render_icon_set(source)
+    except ImportError:
+        if source != app_dir / "icon.png":
+            shutil.copy(source, app_dir / "icon.png")
+        return
+    shutil.copyfile(paths[APP_ICON_SIZE], app_dir / ".icon.png.tmp")
+    os.replace(app_dir / ".icon.png.tmp", app_dir / "icon.png")
+    for size, path in paths.items():
+        _install_file(path, HICOLOR_DIR / f"{size}x{size}" / "apps" / f"{app_id}.png")
+
+
+def remove_app_icons(app_id: str):
+    """Delete an app's hicolor icons"""
+    for size in ICON_SIZES:
+        (HICOLOR_DIR / f"{size}x{size}" / "apps" / f"{app_id}.png").unlink(missing_ok=True)
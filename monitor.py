@@ -0,0 +1,193 @@
+"""
+Low-overhead resource sampler for running AppNEra apps
+
+Reads /proc once per sample, finds every process started from an app's
+run.sh or app.py (or forked for it by the zygote), and adds up memory
+and CPU across it and all of its descendants (including the
+QtWebEngineProcess renderers).
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+# Number of samples kept for sparklines
+HISTORY_LENGTH = 60
+
+
+def read_process_table() -> Dict[int, dict]:
+    """Read pid, parent pid, command line and CPU ticks of all processes"""
+    table = {}
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        pid = int(entry.name)
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                stat = f.read()
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                cmdline = f.read().split(b"\0")
+        except OSError:
+            continue
+        # The command name may contain spaces, so split after its closing paren
+        fields = stat[stat.rfind(b")") + 2:].split()
+        table[pid] = {
+            "ppid": int(fields[1]),
+            "cmdline": [arg.decode(errors="replace") for arg in cmdline if arg],
+            "cpu_ticks": int(fields[11]) + int(fields[12]),
+        }
+    return table
+
+
+def read_memory(pid: int) -> tuple:
+    """Return (rss, pss) in bytes for a process"""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "rb") as f:
+            rss = pss = 0
+            for line in f:
+                if line.startswith(b"Rss:"):
+                    rss = int(line.split()[1]) * 1024
+                elif line.startswith(b"Pss:"):
+                    pss = int(line.split()[1]) * 1024
+            return rss, pss
+    except OSError:
+        pass
+    # Kernels without smaps_rollup only give us RSS
+    rss = read_rss(pid)
+    return rss, rss
+
+
+def read_rss(pid: int) -> int:
+    """Return the resident set size of a process in bytes (cheap, no PSS)"""
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def children_map(table: Dict[int, dict]) -> Dict[int, List[int]]:
+    """Map each pid to the pids of its direct children"""
+    children = {}
+    for pid, proc in table.items():
+        children.setdefault(proc["ppid"], []).append(pid)
+    return children
+
+
+def process_tree(children: Dict[int, List[int]], root: int) -> List[int]:
+    """Return a pid and all of its descendants"""
+    tree = []
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(children.get(current, []))
+    return tree
+
+
+def find_app_processes(table: Dict[int, dict], apps: List[dict]) -> Dict[str, List[int]]:
+    """Map app ids to the pids of their process trees"""
+    children = children_map(table)
+
+    launchers = {}
+    for app in apps:
+        for script in ("run.sh", "app.py"):
+            launchers[str(app["path"] / script)] = app["id"]
+
+    app_dirs = {str(app["path"]): app["id"] for app in apps}
+
+    result = {}
+    for pid, proc in table.items():
+        app_id = next((launchers[arg] for arg in proc["cmdline"] if arg in launchers), None)
+        if app_id is None and any(arg.endswith("zygote.py") for arg in proc["cmdline"]):
+            # Apps forked by the zygote keep its command line but run in their app directory
+            try:
+                app_id = app_dirs.get(os.readlink(f"/proc/{pid}/cwd"))
+            except OSError:
+                pass
+        if app_id is None:
+            continue
+        # Skip processes whose parent is already counted (e.g. run.sh -> python)
+        parent = table.get(proc["ppid"])
+        if parent and any(arg in launchers for arg in parent["cmdline"]):
+            continue
+        result.setdefault(app_id, []).extend(process_tree(children, pid))
+    return result
+
+
+class ResourceSampler(threading.Thread):
+    """Worker thread that periodically samples usage of running apps.
+
+    `get_apps` returns the current app list and `on_sample` receives a
+    dict of app id -> usage after every sample. It is called on the
+    worker thread, so GUI callers must hand the result to their own loop.
+    """
+
+    def __init__(self, get_apps: Callable[[], List[dict]], on_sample: Callable[[dict], None], interval: float = 2.0):
+        super().__init__(daemon=True)
+        self.get_apps = get_apps
+        self.on_sample = on_sample
+        self.interval = interval
+        self.history = {}
+        self._last_ticks = {}
+        self._last_time = None
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        """Stop sampling after the current iteration"""
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.on_sample(self.sample())
+            except Exception:
+                pass
+            self._stop_event.wait(self.interval)
+
+    def sample(self) -> dict:
+        """Take one sample of all running apps"""
+        now = time.monotonic()
+        table = read_process_table()
+        elapsed = now - self._last_time if self._last_time else None
+        self._last_time = now
+
+        usage = {}
+        ticks_by_pid = {}
+        for app_id, pids in find_app_processes(table, self.get_apps()).items():
+            rss = pss = cpu = 0.0
+            for pid in pids:
+                pid_rss, pid_pss = read_memory(pid)
+                rss += pid_rss
+                pss += pid_pss
+                ticks = table[pid]["cpu_ticks"]
+                ticks_by_pid[pid] = ticks
+                if elapsed and pid in self._last_ticks:
+                    cpu += (ticks - self._last_ticks[pid]) / CLOCK_TICKS / elapsed * 100
+
+            history = self.history.setdefault(app_id, {
+                "rss": deque(maxlen=HISTORY_LENGTH),
+                "cpu": deque(maxlen=HISTORY_LENGTH),
+            })
+            history["rss"].append(rss)
+            history["cpu"].append(cpu)
+            usage[app_id] = {
+                "pids": pids,
+                "rss": int(rss),
+                "pss": int(pss),
+                "cpu": cpu,
+                "rss_history": list(history["rss"]),
+                "cpu_history": list(history["cpu"]),
+            }
+
+        # Forget apps that stopped so a restart begins a fresh history
+        for app_id in list(self.history):
+            if app_id not in usage:
+                del self.history[app_id]
+        self._last_ticks = ticks_by_pid
+        return usage
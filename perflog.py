@@ -0,0 +1,93 @@
+"""
+Page-load history of generated apps
+
+Every app records its navigations (loadStarted to loadFinished), the time
+to first paint of each page and renderer crashes and restarts in perf.json
+in its own directory. template/app.py keeps the newest entries only and
+writes them in batches; this module reads them back for the Manage tab and
+the `perf` command. Nothing here leaves the machine.
+"""
+
+import json
+from pathlib import Path
+from typing import List, Optional
+
+from bench import percentiles
+
+PERF_LOG = "perf.json"
+
+# The trend compares the median of the newest loads with the loads before them
+TREND_WINDOW = 20
+MIN_TREND_LOADS = 5
+
+# Number of recent loads drawn in the Manage tab
+HISTORY_POINTS = 60
+
+
+def read_perf_log(app_dir: Path) -> List[dict]:
+    """Return an app's recorded performance events, oldest first"""
+    try:
+        with open(app_dir / PERF_LOG, "r") as f:
+            records = json.load(f).get("records", [])
+    except (OSError, ValueError, AttributeError):
+        return []
+    return [record for record in records if isinstance(record, dict)]
+
+
+def load_trend(load_ms: List[float]) -> Optional[float]:
+    """Relative change of the median load time between the two newest windows of loads.
+
+    Negative values mean pages load faster than before; None without enough loads.
+    """
+    window = min(TREND_WINDOW, len(load_ms) // 2)
+    if window < MIN_TREND_LOADS:
+        return None
+    recent = percentiles(load_ms[-window:])["p50"]
+    previous = percentiles(load_ms[-2 * window:-window])["p50"]
+    if not previous:
+        return None
+    return recent / previous - 1
+
+
+def summarize_perf(records: List[dict]) -> dict:
+    """Summarize recorded events as percentiles, a trend and crash counts"""
+    loads = [record for record in records if record.get("event") == "load"]
+    load_ms = [record["load_ms"] for record in loads if record.get("ok") and isinstance(record.get("load_ms"), (int, float))]
+    paint_ms = [record["paint_ms"] for record in loads if record.get("ok") and isinstance(record.get("paint_ms"), (int, float))]
+    return {
+        "loads": len(loads),
+        "failed": sum(1 for record in loads if not record.get("ok")),
+        "load": percentiles(load_ms),
+        "paint": percentiles(paint_ms),
+        "trend": load_trend(load_ms),
+        "crashes": sum(1 for record in records if record.get("event") == "crash"),
+        "restarts": sum(1 for record in records if record.get("event") == "restart"),
+        "history": load_ms[-HISTORY_POINTS:],
+    }
+
+
+def _format_ms(ms: float) -> str:
+    return f"{ms / 1000:.1f} s" if ms >= 1000 else f"{ms:.0f} ms"
+
+
+def describe_perf(summary: dict) -> str:
+    """Describe a summary in a few lines for people"""
+    if not summary["loads"]:
+        return "Page loads: none recorded yet"
+    lines = [f"Page loads: {summary['loads']} recorded" + (f", {summary['failed']} failed" if summary["failed"] else "")]
+    for key, title in (("load", "Load time"), ("paint", "First paint")):
+        stats = summary[key]
+        if stats:
+            lines.append(
+                f"{title}: median {_format_ms(stats['p50'])}, "
+                f"p90 {_format_ms(stats['p90'])}, p95 {_format_ms(stats['p95'])}"
+            )
+    trend = summary["trend"]
+    if trend is not None:
+        if abs(trend) < 0.05:
+            lines.append("Trend: about as fast as before")
+        else:
+            lines.append(f"Trend: {abs(trend) * 100:.0f}% {'slower' if trend > 0 else 'faster'} than before")
+    if summary["crashes"]:
+        lines.append(f"Renderer crashes: {summary['crashes']} ({summary['restarts']} restarted)")
+    return "\n".join(lines)
@@ -0,0 +1,153 @@
+"""
+Disposable previews of a URL
+
+The Create tab's Preview button shows a site the way an app would,
+without building one. A single preview environment (a venv with the
+runtime and a copy of template/app.py) is kept in the cache and shared by
+every preview, so opening one costs an interpreter start and Qt's startup
+only. Previews run with preview=1 in that environment's app.conf, which
+gives them an off-the-record profile and turns off everything app.py
+writes (session, splash, performance log). Qt's own caches go to a
+scratch directory in the user's runtime directory that is removed when
+the preview window closes.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import runtime
+from core import TEMPLATE_DIR, write_app_config
+
+PREVIEW_DIR = runtime.CACHE_DIR / "preview"
+PREVIEW_ID = "appnera-preview"
+
+# Scratch directories of running previews, on a memory-backed file system where there is one
+SCRATCH_PARENT = Path(os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir())
+SCRATCH_PREFIX = "appnera-preview-"
+SCRATCH_PID = "pid"
+
+# Age after which a scratch directory without a recorded preview is considered abandoned
+SCRATCH_GRACE_SECONDS = 60
+
+_prepare_lock = threading.Lock()
+
+
+def preview_runtime_available() -> bool:
+    """Check that the preview environment can be set up without downloading anything"""
+    if runtime.find_system_runtime() is not None:
+        return True
+    try:
+        version = runtime.host_python()[1]
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return False
+    major, minor = version.split(".")[:2]
+    return (runtime.RUNTIME_CACHE_DIR / f"python{major}.{minor}" / runtime.COMPLETE_MARKER).exists()
+
+
+def _install_app_script():
+    """Copy the current template app.py into the preview environment if it changed"""
+    source = (TEMPLATE_DIR / "app.py").read_bytes()
+    target = PREVIEW_DIR / "app.py"
+    try:
+        if target.read_bytes() == source:
+            return
+    except OSError:
+        pass
+    tmp_path = target.with_name("app.py.tmp")
+    tmp_path.write_bytes(source)
+    os.replace(tmp_path, target)
+
+
+def prepare_preview_environment() -> Path:
+    """Set up the cached preview environment once and return its interpreter.
+
+    Uses the system PyQt5 when there is a usable one, like new apps do,
+    and the shared runtime cache otherwise.
+    """
+    venv_dir = PREVIEW_DIR / "venv"
+    with _prepare_lock:
+        if not (PREVIEW_DIR / runtime.COMPLETE_MARKER).exists():
+            shutil.rmtree(PREVIEW_DIR, ignore_errors=True)
+            PREVIEW_DIR.mkdir(parents=True)
+            system = runtime.find_system_runtime()
+            runtime.create_venv(venv_dir, system_site_packages=system is not None)
+            settings = {"name": "Preview", "id": PREVIEW_ID, "preview": "1"}
+            if system:
+                settings.update(runtime="system", runtime_path=system["path"], runtime_qt=system["qt"])
+            else:
+                runtime.install_runtime(venv_dir)
+                settings["runtime"] = "private"
+            write_app_config(PREVIEW_DIR, settings)
+            (PREVIEW_DIR / runtime.COMPLETE_MARKER).touch()
+        _install_app_script()
+    return venv_dir / "bin" / "python"
+
+
+def _scratch_in_use(scratch: Path) -> bool:
+    try:
+        pid = int((scratch / SCRATCH_PID).read_text())
+    except (OSError, ValueError):
+        # Not recorded yet, or the manager went away while starting the preview
+        try:
+            return time.time() - scratch.stat().st_mtime < SCRATCH_GRACE_SECONDS
+        except OSError:
+            return False
+    return os.path.exists(f"/proc/{pid}")
+
+
+def remove_stale_scratch():
+    """Remove scratch directories of previews that are no longer running"""
+    for scratch in SCRATCH_PARENT.glob(f"{SCRATCH_PREFIX}*"):
+        if scratch.is_dir() and not _scratch_in_use(scratch):
+            shutil.rmtree(scratch, ignore_errors=True)
+
+
+def _discard_when_closed(process: subprocess.Popen, scratch: Path):
+    process.wait()
+    shutil.rmtree(scratch, ignore_errors=True)
+
+
+def start_preview(url: str) -> subprocess.Popen:
+    """Open a URL in a disposable preview window and return its process"""
+    if not url.startswith(("http://", "https://")):
+        raise ValueError("URL must start with http:// or https://")
+    python = prepare_preview_environment()
+    remove_stale_scratch()
+
+    scratch = Path(tempfile.mkdtemp(prefix=SCRATCH_PREFIX, dir=SCRATCH_PARENT))
+    env = dict(
+        os.environ,
+        APPNERA_URL=url,
+        APPNERA_APP_NAME=f"Preview: {urlsplit(url).hostname or url}",
+        XDG_CACHE_HOME=str(scratch),
+    )
+    try:
+        process = subprocess.Popen(
+            [str(python), "-I", "-S", str(PREVIEW_DIR / "app.py")],
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    except OSError:
+        shutil.rmtree(scratch, ignore_errors=True)
+        raise
+    (scratch / SCRATCH_PID).write_text(str(process.pid))
+    threading.Thread(target=_discard_when_closed, args=(process, scratch), daemon=True).start()
+    return process
+
+
+def keep_preview_ready() -> bool:
+    """Set up the preview environment ahead of time, unless that needs a download"""
+    if not preview_runtime_available():
+        return False
+    prepare_preview_environment()
+    remove_stale_scratch()
+    return True
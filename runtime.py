@@ -0,0 +1,608 @@
+"""
+Shared runtime installation for app venvs
+
+PyQt5 and PyQtWebEngine are downloaded once into a local wheel cache and
+installed once per Python version into a runtime cache. Each app venv
+then gets its own copy of that tree as hard links (or plain copies across
+file systems), so creating or importing apps costs disk operations
+instead of a pip install per app.
+
+App venvs have no pip of their own: create_venv writes the venv layout
+(pyvenv.cfg, interpreter symlinks, site-packages) directly, and the one
+installer environment per Python version that does have pip fills the
+runtime cache for all of them.
+
+On distributions that ship PyQt5 with QtWebEngine, apps can use that
+system runtime instead (see find_system_runtime), which skips pip. Apps
+on the WebKitGTK backend use the system's PyGObject and WebKitGTK (see
+find_webkit_runtime) and need no runtime from here at all.
+
+The runtime cache is pruned to what a web app needs: Qt modules, plugins
+and libraries outside a keep-list, and translations and Chromium locales
+other than the user's language, are removed once when the cache is built.
+"""
+
+import glob
+import hashlib
+import json
+import locale
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Tuple
+
+RUNTIME_PACKAGES = ["PyQt5", "PyQtWebEngine"]
+
+CACHE_DIR = Path.home() / ".cache" / "appnera"
+WHEEL_DIR = CACHE_DIR / "wheels"
+RUNTIME_CACHE_DIR = CACHE_DIR / "runtime"
+
+# Environments with pip, one per Python version, that install runtimes for all apps
+INSTALLER_DIR = CACHE_DIR / "installer"
+
+# Interpreter app venvs are created for
+HOST_PYTHON = "python3"
+HOST_PROBE_TIMEOUT = 30
+
+# The real interpreter behind a command (which may be a wrapper such as a pyenv shim) and its version
+HOST_PYTHON_PROBE = (
+    "import json, sys; "
+    "print(json.dumps([getattr(sys, '_base_executable', '') or sys.executable, '%d.%d.%d' % sys.version_info[:3]]))"
+)
+
+# Marker written once a runtime cache is fully installed
+COMPLETE_MARKER = ".complete"
+
+# Sizes and hashes of every runtime file, used to verify app venvs
+MANIFEST_NAME = ".manifest.json"
+
+# What pruning removed from a runtime cache
+PRUNE_RECORD = ".pruned.json"
+
+# Hash of the manifest of a cache whose runtime launched a test app
+VERIFIED_MARKER = ".verified"
+
+# Bookkeeping files of a runtime cache that are not part of the runtime
+CACHE_METADATA = (COMPLETE_MARKER, MANIFEST_NAME, PRUNE_RECORD, VERIFIED_MARKER)
+
+# Present once a pruned runtime failed to launch an app; caches are then kept whole
+FULL_RUNTIME_MARKER = RUNTIME_CACHE_DIR / ".no-prune"
+
+# Present once apps failed to launch offscreen even with the full runtime (no
+# graphics libraries, sandboxes); builds then skip the test launch
+NO_VERIFY_MARKER = RUNTIME_CACHE_DIR / ".no-verify"
+
+# PyQt5 extension modules app.py, the zygote and their imports need
+KEEP_MODULES = {
+    "QtCore", "QtGui", "QtWidgets", "QtNetwork", "QtPrintSupport",
+    "QtWebChannel", "QtWebEngineCore", "QtWebEngineWidgets",
+}
+
+# Qt plugin directories a web view can load (display, input, images, geolocation, printing)
+KEEP_PLUGINS = {
+    "platforms", "platformthemes", "platforminputcontexts", "xcbglconfigs",
+    "egldeviceintegrations", "generic", "imageformats", "iconengines", "bearer",
+    "position", "printsupport", "wayland-decoration-client",
+    "wayland-graphics-integration-client", "wayland-shell-integration",
+}
+
+# Development and debugging files removed regardless of the keep-lists
+PRUNED_PATHS = [
+    "PyQt5/bindings",
+    "PyQt5/uic",
+    "PyQt5/pyrcc*",
+    "PyQt5/pylupdate*",
+    "PyQt5/*.pyi",
+    "PyQt5/Qt5/qml",
+    "PyQt5/Qt5/resources/qtwebengine_devtools_resources.pak",
+]
+
+# Chromium's fallback locale, always kept
+DEFAULT_LOCALE = "en-US"
+
+# Oldest system Qt app.py works with (page lifecycle states need 5.14)
+MIN_QT_VERSION = (5, 14)
+SYSTEM_PROBE_TIMEOUT = 30
+
+# Imports app.py needs; prints the versions and where PyQt5 was found
+SYSTEM_PROBE = (
+    "import os, PyQt5; "
+    "from PyQt5 import QtNetwork, QtWebEngineCore, QtWebEngineWidgets; "
+    "from PyQt5.QtCore import PYQT_VERSION_STR, QT_VERSION_STR; "
+    "print(QT_VERSION_STR, PYQT_VERSION_STR, os.path.dirname(os.path.dirname(PyQt5.__file__)))"
+)
+
+# Imports the WebKitGTK backend (template/app_webkit.py) needs; prints the
+# WebKit2 API and library versions and where PyGObject was found
+WEBKIT_PROBE = (
+    "import os, gi\n"
+    "for api in ('4.1', '4.0'):\n"
+    "    try:\n"
+    "        gi.require_version('WebKit2', api); break\n"
+    "    except ValueError:\n"
+    "        pass\n"
+    "gi.require_version('Gtk', '3.0')\n"
+    "from gi.repository import Gtk, WebKit2\n"
+    "version = '%d.%d.%d' % (WebKit2.get_major_version(), WebKit2.get_minor_version(), WebKit2.get_micro_version())\n"
+    "print(api, version, os.path.dirname(os.path.dirname(gi.__file__)))"
+)
+
+_cache_lock = threading.Lock()
+
+
+def file_sha256(path: Path) -> str:
+    """Hash a file without reading it into memory at once"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_manifest(cache: Path) -> dict:
+    """Record the size and hash of every file in a runtime cache.
+
+    Bytecode is left out since it is regenerated on demand.
+    """
+    manifest = {}
+    for root, dirs, files in os.walk(cache):
+        dirs[:] = [d for d in dirs if d != "__pycache__"]
+        for filename in files:
+            if filename in CACHE_METADATA:
+                continue
+            path = Path(root) / filename
+            manifest[str(path.relative_to(cache))] = [path.stat().st_size, file_sha256(path)]
+    tmp_path = cache / f"{MANIFEST_NAME}.tmp"
+    tmp_path.write_text(json.dumps(manifest))
+    os.replace(tmp_path, cache / MANIFEST_NAME)
+    return manifest
+
+
+def read_manifest(cache: Path) -> dict:
+    """Load a runtime cache's manifest, creating it for caches built without one"""
+    try:
+        with open(cache / MANIFEST_NAME, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return write_manifest(cache)
+
+
+def venv_site_packages(venv_dir: Path) -> Path:
+    """Return the site-packages directory of a venv"""
+    matches = sorted((venv_dir / "lib").glob("python3*/site-packages"))
+    if not matches:
+        raise ValueError(f"No site-packages found in {venv_dir}")
+    return matches[-1]
+
+
+@lru_cache(maxsize=None)
+def find_system_runtime(python: str = "python3") -> Optional[dict]:
+    """Look for a usable PyQt5 with QtWebEngine installed for the system Python.
+
+    The imports are tried in a subprocess (a broken Qt can crash or hang),
+    without user site-packages. Returns the Qt and PyQt versions and the
+    directory holding PyQt5, or None.
+    """
+    try:
+        result = subprocess.run(
+            [python, "-I", "-c", SYSTEM_PROBE],
+            capture_output=True,
+            text=True,
+            timeout=SYSTEM_PROBE_TIMEOUT,
+            env=dict(os.environ, QT_QPA_PLATFORM="offscreen"),
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    fields = result.stdout.strip().split(" ", 2)
+    if result.returncode != 0 or len(fields) != 3:
+        return None
+    qt, pyqt, path = fields
+    try:
+        if tuple(int(part) for part in qt.split(".")[:2]) < MIN_QT_VERSION:
+            return None
+    except ValueError:
+        return None
+    return {"qt": qt, "pyqt": pyqt, "path": path}
+
+
+@lru_cache(maxsize=None)
+def find_webkit_runtime(python: str = "python3") -> Optional[dict]:
+    """Look for the system WebKitGTK with PyGObject bindings for the system Python.
+
+    Returns the WebKit2 API and WebKitGTK versions and the directory
+    holding gi, or None.
+    """
+    try:
+        result = subprocess.run(
+            [python, "-I", "-c", WEBKIT_PROBE],
+            capture_output=True,
+            text=True,
+            timeout=SYSTEM_PROBE_TIMEOUT,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    fields = result.stdout.strip().split(" ", 2)
+    if result.returncode != 0 or len(fields) != 3:
+        return None
+    api, version, path = fields
+    return {"api": api, "webkit": version, "path": path}
+
+
+@lru_cache(maxsize=None)
+def host_python(python: str = HOST_PYTHON) -> Tuple[str, str]:
+    """Return the path and version of the interpreter a Python command runs"""
+    result = subprocess.run(
+        [python, "-I", "-c", HOST_PYTHON_PROBE],
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=HOST_PROBE_TIMEOUT,
+    )
+    executable, version = json.loads(result.stdout)
+    return executable, version
+
+
+def _symlink(link: Path, target: str):
+    """Point a symlink at `target`, replacing whatever is there in one step"""
+    tmp_path = link.with_name(f".{link.name}.tmp")
+    if tmp_path.is_symlink() or tmp_path.exists():
+        tmp_path.unlink()
+    tmp_path.symlink_to(target)
+    os.replace(tmp_path, link)
+
+
+def create_venv(venv_dir: Path, system_site_packages: bool = False, python: str = HOST_PYTHON):
+    """Create a venv without pip, or re-point an existing one at the current interpreter.
+
+    Writes what `python -m venv --without-pip` would (pyvenv.cfg, the
+    interpreter symlinks and an empty site-packages) without starting
+    Python for it, so only the first venv of a session pays for probing
+    the interpreter. Packages already in the venv are kept.
+    """
+    executable, version = host_python(python)
+    short_name = "python" + ".".join(version.split(".")[:2])
+    (venv_dir / "lib" / short_name / "site-packages").mkdir(parents=True, exist_ok=True)
+    if sys.maxsize > 2 ** 32 and not (venv_dir / "lib64").is_symlink() and not (venv_dir / "lib64").exists():
+        (venv_dir / "lib64").symlink_to("lib")
+
+    bin_dir = venv_dir / "bin"
+    bin_dir.mkdir(exist_ok=True)
+    _symlink(bin_dir / "python", executable)
+    for name in ("python3", short_name):
+        _symlink(bin_dir / name, "python")
+
+    config = (
+        f"home = {os.path.dirname(executable)}\n"
+        f"include-system-site-packages = {'true' if system_site_packages else 'false'}\n"
+        f"version = {version}\n"
+        f"executable = {executable}\n"
+        f"command = {executable} -m venv --without-pip {venv_dir}\n"
+    )
+    tmp_path = venv_dir / "pyvenv.cfg.tmp"
+    tmp_path.write_text(config)
+    os.replace(tmp_path, venv_dir / "pyvenv.cfg")
+
+
+def installer_pip(venv_dir: Path) -> List[str]:
+    """Return the pip command of the shared installer for a venv's Python version.
+
+    The installer is a regular venv with pip, created once in the cache.
+    Without ensurepip (e.g. Debian without python3-venv) the interpreter's
+    own pip module is used if it has one.
+    """
+    installer = INSTALLER_DIR / venv_site_packages(venv_dir).parent.name
+    python = venv_dir / "bin" / "python"
+    if not (installer / COMPLETE_MARKER).exists():
+        shutil.rmtree(installer, ignore_errors=True)
+        result = subprocess.run([str(python), "-m", "venv", str(installer)], capture_output=True)
+        if result.returncode != 0:
+            shutil.rmtree(installer, ignore_errors=True)
+            if subprocess.run([str(python), "-m", "pip", "--version"], capture_output=True).returncode == 0:
+                return [str(python), "-m", "pip"]
+            raise subprocess.CalledProcessError(result.returncode, result.args, result.stdout, result.stderr)
+        (installer / COMPLETE_MARKER).touch()
+    return [str(installer / "bin" / "python"), "-m", "pip"]
+
+
+def set_system_site_packages(venv_dir: Path, enabled: bool):
+    """Switch whether a venv sees the system site-packages"""
+    config_path = venv_dir / "pyvenv.cfg"
+    lines = [
+        line for line in config_path.read_text().splitlines()
+        if line.partition("=")[0].strip() != "include-system-site-packages"
+    ]
+    lines.append(f"include-system-site-packages = {'true' if enabled else 'false'}")
+    tmp_path = config_path.with_name("pyvenv.cfg.tmp")
+    tmp_path.write_text("\n".join(lines) + "\n")
+    os.replace(tmp_path, config_path)
+
+
+def remove_private_runtime(venv_dir: Path):
+    """Delete the runtime packages linked into a venv"""
+    site_packages = venv_site_packages(venv_dir)
+    for package in site_packages.glob("PyQt*"):
+        if package.is_dir():
+            shutil.rmtree(package)
+    (site_packages / PRUNE_RECORD).unlink(missing_ok=True)
+
+
+def user_languages() -> List[str]:
+    """Return the user's UI languages as Chromium locale names (e.g. "pt-BR", "pt")"""
+    names = os.environ.get("LANGUAGE", "").split(":")
+    names += [os.environ.get(var, "") for var in ("LC_ALL", "LC_MESSAGES", "LANG")]
+    try:
+        names.append(locale.getlocale()[0] or "")
+    except ValueError:
+        pass
+    languages = []
+    for name in names:
+        name = name.split(".")[0].split("@")[0].replace("_", "-")
+        if not name or name in ("C", "POSIX"):
+            continue
+        for language in (name, name.split("-")[0]):
+            if language not in languages:
+                languages.append(language)
+    return languages
+
+
+def elf_needed(path: Path) -> List[str]:
+    """Return the shared libraries an ELF file links against (DT_NEEDED)"""
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return []
+    if data[:4] != b"\x7fELF":
+        return []
+    wide = data[4] == 2
+    order = "<" if data[5] == 1 else ">"
+    if wide:
+        shoff, = struct.unpack_from(order + "Q", data, 0x28)
+        shentsize, shnum = struct.unpack_from(order + "HH", data, 0x3A)
+        section = order + "IIQQQQIIQQ"
+        entry = order + "qQ"
+    else:
+        shoff, = struct.unpack_from(order + "I", data, 0x20)
+        shentsize, shnum = struct.unpack_from(order + "HH", data, 0x2E)
+        section = order + "IIIIIIIIII"
+        entry = order + "iI"
+    sections = [struct.unpack_from(section, data, shoff + i * shentsize) for i in range(shnum)]
+
+    needed = []
+    for _, kind, _, _, offset, size, link, _, _, _ in sections:
+        if kind != 6:  # SHT_DYNAMIC
+            continue
+        strtab_offset = sections[link][4]
+        for position in range(offset, offset + size, struct.calcsize(entry)):
+            tag, value = struct.unpack_from(entry, data, position)
+            if tag == 0:  # DT_NULL
+                break
+            if tag == 1:  # DT_NEEDED
+                start = strtab_offset + value
+                needed.append(data[start:data.index(b"\0", start)].decode())
+    return needed
+
+
+def _needed_libraries(roots: Iterable[Path], lib_dir: Path) -> Set[str]:
+    """Find the libraries in `lib_dir` that `roots` load, directly or indirectly"""
+    needed = set()
+    pending = list(roots)
+    while pending:
+        for name in elf_needed(pending.pop()):
+            if name not in needed and (lib_dir / name).exists():
+                needed.add(name)
+                pending.append(lib_dir / name)
+    return needed
+
+
+def _language_kept(language: str, languages: List[str]) -> bool:
+    """Check a translation's language (e.g. "pt_BR" or "pt-BR") against the user's"""
+    language = language.replace("_", "-")
+    return language in languages or language.split("-")[0] in languages
+
+
+def prune_runtime(tree: Path, languages: List[str]) -> dict:
+    """Remove everything a web app does not need from an installed runtime.
+
+    Keeps the Qt modules and plugins in the keep-lists, the Qt libraries
+    they link against, and translations and locales of `languages` plus
+    en-US. Returns a record of what was removed.
+    """
+    package = tree / "PyQt5"
+    qt = package / "Qt5"
+    if not package.is_dir():
+        return {"pruned": False, "freed": 0, "files": 0}
+
+    doomed = [Path(path) for pattern in PRUNED_PATHS for path in glob.glob(str(tree / pattern))]
+    doomed += [
+        path for path in package.glob("Qt*")
+        if path.is_file() and path.name.split(".")[0] not in KEEP_MODULES
+    ]
+    if (qt / "plugins").is_dir():
+        doomed += [path for path in (qt / "plugins").iterdir() if path.name not in KEEP_PLUGINS]
+    translations = qt / "translations"
+    doomed += [
+        path for path in translations.glob("*.qm")
+        if not _language_kept(path.stem.partition("_")[2], languages)
+    ]
+    doomed += [
+        path for path in (translations / "qtwebengine_locales").glob("*.pak")
+        if path.stem != DEFAULT_LOCALE and not _language_kept(path.stem, languages)
+    ]
+
+    freed = 0
+    files = 0
+
+    def remove(path: Path):
+        nonlocal freed, files
+        if path.is_dir() and not path.is_symlink():
+            for root, _, names in os.walk(path):
+                for name in names:
+                    freed += os.lstat(os.path.join(root, name)).st_size
+                    files += 1
+            shutil.rmtree(path)
+        elif path.exists() or path.is_symlink():
+            freed += path.lstat().st_size
+            files += 1
+            path.unlink()
+
+    for path in doomed:
+        remove(path)
+
+    # Qt libraries nothing that is left links against
+    lib_dir = qt / "lib"
+    if lib_dir.is_dir():
+        roots = [
+            path for path in package.rglob("*")
+            if path.is_file() and path.parent != lib_dir and (".so" in path.name or path.parent.name == "libexec")
+        ]
+        needed = _needed_libraries(roots, lib_dir)
+        for path in lib_dir.glob("*.so*"):
+            if path.name not in needed:
+                remove(path)
+
+    return {"pruned": True, "languages": languages, "freed": freed, "files": files}
+
+
+def _write_prune_record(cache: Path, record: dict):
+    (cache / PRUNE_RECORD).write_text(json.dumps(record, indent=2))
+
+
+def read_prune_record(cache: Path) -> dict:
+    """Return what pruning removed from a runtime cache (empty if it was not pruned)"""
+    try:
+        with open(cache / PRUNE_RECORD, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def runtime_pruned(venv_dir: Path) -> bool:
+    """Check whether a venv has a private runtime that was linked from a pruned cache"""
+    try:
+        site_packages = venv_site_packages(venv_dir)
+    except ValueError:
+        return False
+    if not (site_packages / "PyQt5").is_dir():
+        return False
+    return read_prune_record(site_packages).get("pruned", False)
+
+
+def _venv_cache(venv_dir: Path) -> Path:
+    return RUNTIME_CACHE_DIR / venv_site_packages(venv_dir).parent.name
+
+
+def runtime_verified(venv_dir: Path) -> bool:
+    """Check whether the cache a venv's runtime came from already launched an app as it is now"""
+    cache = _venv_cache(venv_dir)
+    try:
+        return (cache / VERIFIED_MARKER).read_text() == file_sha256(cache / MANIFEST_NAME)
+    except OSError:
+        return False
+
+
+def mark_runtime_verified(venv_dir: Path):
+    """Record that the current runtime cache launched an app"""
+    cache = _venv_cache(venv_dir)
+    (cache / VERIFIED_MARKER).write_text(file_sha256(cache / MANIFEST_NAME))
+
+
+def prepare_runtime_cache(venv_dir: Path, download: bool = True) -> Path:
+    """Install the runtime packages once for the venv's Python version.
+
+    Wheels are installed offline from the wheel cache when possible and
+    only downloaded when something is missing (an OSError is raised
+    instead when `download` is False). A cache built before pruning
+    existed is pruned in place.
+    """
+    cache = _venv_cache(venv_dir)
+
+    with _cache_lock:
+        if (cache / COMPLETE_MARKER).exists():
+            if not (cache / PRUNE_RECORD).exists() and not FULL_RUNTIME_MARKER.exists():
+                _write_prune_record(cache, prune_runtime(cache, user_languages()))
+                write_manifest(cache)
+            return cache
+
+        pip = installer_pip(venv_dir)
+        tmp = cache.with_name(f"{cache.name}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        WHEEL_DIR.mkdir(parents=True, exist_ok=True)
+        install = [*pip, "install", "--no-index", "--find-links", str(WHEEL_DIR), "--target", str(tmp), *RUNTIME_PACKAGES]
+
+        if subprocess.run(install, capture_output=True).returncode != 0:
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not download:
+                raise OSError("The runtime wheels are not in the local wheel cache")
+            subprocess.run(
+                [*pip, "download", "--dest", str(WHEEL_DIR), *RUNTIME_PACKAGES],
+                check=True,
+                capture_output=True,
+            )
+            subprocess.run(install, check=True, capture_output=True)
+
+        # Console scripts carry the shebang of the venv that built the cache
+        shutil.rmtree(tmp / "bin", ignore_errors=True)
+        if not FULL_RUNTIME_MARKER.exists():
+            _write_prune_record(tmp, prune_runtime(tmp, user_languages()))
+        subprocess.run(
+            [str(venv_dir / "bin" / "python"), "-m", "compileall", "-q", "-j", "0", str(tmp)],
+            capture_output=True,
+        )
+        write_manifest(tmp)
+        (tmp / COMPLETE_MARKER).touch()
+        shutil.rmtree(cache, ignore_errors=True)
+        os.replace(tmp, cache)
+        return cache
+
+
+def link_tree(source: Path, destination: Path):
+    """Recreate a directory tree using hard links, copying across file systems"""
+    for root, dirs, files in os.walk(source):
+        target_dir = destination / Path(root).relative_to(source)
+        target_dir.mkdir(parents=True, exist_ok=True)
+        for filename in files:
+            if filename in CACHE_METADATA:
+                continue
+            target = target_dir / filename
+            if target.exists():
+                target.unlink()
+            try:
+                os.link(os.path.join(root, filename), target)
+            except OSError:
+                shutil.copy2(os.path.join(root, filename), target)
+
+
+def link_file(cache: Path, site_packages: Path, relative: str):
+    """Restore one runtime file in a venv from the cache"""
+    target = site_packages / relative
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if target.exists() or target.is_symlink():
+        target.unlink()
+    try:
+        os.link(cache / relative, target)
+    except OSError:
+        shutil.copy2(cache / relative, target)
+
+
+def install_runtime(venv_dir: Path, download: bool = True):
+    """Install PyQt5 and PyQtWebEngine into a venv from the local runtime cache"""
+    cache = prepare_runtime_cache(venv_dir, download)
+    site_packages = venv_site_packages(venv_dir)
+    link_tree(cache, site_packages)
+    # The venv keeps its own copy, so later pruning of the cache does not change what it reports
+    _write_prune_record(site_packages, read_prune_record(cache))
+
+
+def install_full_runtime(venv_dir: Path):
+    """Stop pruning and reinstall a venv's runtime with everything the wheels ship"""
+    RUNTIME_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    FULL_RUNTIME_MARKER.touch()
+    with _cache_lock:
+        (_venv_cache(venv_dir) / COMPLETE_MARKER).unlink(missing_ok=True)
+    remove_private_runtime(venv_dir)
+    install_runtime(venv_dir)
@@ -0,0 +1,185 @@
+"""
+Per-app web storage usage and cache compaction
+
+Reports how much each app's QtWebEngine storage uses by category, prunes
+the HTTP and code caches of apps that are not running down to their
+cache budget, and finds storage left behind by uninstalled apps. Running
+apps keep their HTTP cache within the same budget themselves (app.py).
+"""
+
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from core import APP_CACHE_DIR, app_id_for, dir_size, read_app_config
+from monitor import find_app_processes, read_process_table
+
+# Budget for apps that do not set storage_budget_mb in app.conf
+DEFAULT_BUDGET_MB = 512
+
+# Profile subdirectories by category; everything else counts as "other"
+PROFILE_CATEGORIES = {
+    "code cache": ("Code Cache", "GPUCache"),
+    "service workers": ("Service Worker",),
+    "indexeddb": ("IndexedDB",),
+    "local storage": ("Local Storage", "Session Storage"),
+}
+
+# Categories that only hold caches and are safe to prune
+PRUNABLE_CATEGORIES = ("http cache", "code cache")
+
+# Chromium rebuilds a stale index, but a missing one costs a full rescan
+INDEX_FILES = {"index", "the-real-index"}
+
+# Present in caches using Chromium's blockfile format, whose entries live
+# inside shared block files and cannot be deleted one at a time
+BLOCKFILE_MARKER = "data_0"
+
+# Shared profile used before every app got its own (see app.py)
+LEGACY_STORAGE_DIRS = [
+    Path.home() / ".local" / "share" / "app" / "QtWebEngine",
+    Path.home() / ".cache" / "app" / "QtWebEngine",
+]
+
+
+def _app_id(app_dir: Path) -> str:
+    """Return the app id recorded in app.conf, or the one derived from its name"""
+    return read_app_config(app_dir).get("id") or app_id_for(app_dir.name)
+
+
+def category_dirs(app_dir: Path) -> Dict[str, List[Path]]:
+    """Map each storage category of an app to its directories"""
+    profile = app_dir / "profile"
+    dirs = {"http cache": [APP_CACHE_DIR / _app_id(app_dir)]}
+    for category, names in PROFILE_CATEGORIES.items():
+        dirs[category] = [profile / name for name in names]
+    return dirs
+
+
+def storage_usage(app_dir: Path) -> Dict[str, int]:
+    """Return the bytes used by an app's web storage per category"""
+    usage = {
+        category: sum(dir_size(path) for path in paths)
+        for category, paths in category_dirs(app_dir).items()
+    }
+    categorized = sum(size for category, size in usage.items() if category != "http cache")
+    usage["other"] = max(dir_size(app_dir / "profile") - categorized, 0)
+    return usage
+
+
+def storage_budget(app_dir: Path) -> int:
+    """Return the budget of an app's HTTP and code caches in bytes"""
+    try:
+        budget_mb = int(read_app_config(app_dir).get("storage_budget_mb", DEFAULT_BUDGET_MB))
+    except ValueError:
+        budget_mb = DEFAULT_BUDGET_MB
+    return budget_mb * 1024 * 1024
+
+
+def cache_usage(usage: Dict[str, int]) -> int:
+    """Return the bytes of a storage usage report that count against the budget"""
+    return sum(usage.get(category, 0) for category in PRUNABLE_CATEGORIES)
+
+
+def _cache_entries(path: Path) -> List[tuple]:
+    """List the deletable entries of a cache directory as (mtime, size, path).
+
+    Entries are single files, except that a blockfile-format cache is one
+    entry as a whole.
+    """
+    entries = []
+    for root, dirs, files in os.walk(path):
+        if BLOCKFILE_MARKER in files:
+            dirs[:] = []
+            try:
+                mtime = max(os.lstat(os.path.join(root, filename)).st_mtime for filename in files)
+            except OSError:
+                continue
+            entries.append((mtime, dir_size(Path(root)), root))
+            continue
+        for filename in files:
+            if filename in INDEX_FILES:
+                continue
+            file_path = os.path.join(root, filename)
+            try:
+                stat = os.lstat(file_path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, file_path))
+    return entries
+
+
+def compact_app(app_dir: Path, budget: Optional[int] = None) -> int:
+    """Prune an app's caches, oldest entries first, until they fit its budget.
+
+    Only the HTTP and code caches are touched and counted; cookies, local
+    storage, IndexedDB and service workers are site data and are never
+    deleted. The app must not be running. Returns the number of bytes
+    freed.
+    """
+    budget = storage_budget(app_dir) if budget is None else budget
+    excess = cache_usage(storage_usage(app_dir)) - budget
+    if excess <= 0:
+        return 0
+
+    dirs = category_dirs(app_dir)
+    entries = [entry for category in PRUNABLE_CATEGORIES for path in dirs[category] for entry in _cache_entries(path)]
+
+    freed = 0
+    for _, size, entry_path in sorted(entries):
+        if freed >= excess:
+            break
+        try:
+            if os.path.isdir(entry_path):
+                shutil.rmtree(entry_path)
+            else:
+                os.unlink(entry_path)
+            freed += size
+        except OSError:
+            pass
+    return freed
+
+
+def running_app_dirs(app_dirs: List[Path]) -> List[Path]:
+    """Return the apps in `app_dirs` that currently have a process running"""
+    apps = [{"path": app_dir, "id": app_dir.name} for app_dir in app_dirs]
+    running = find_app_processes(read_process_table(), apps)
+    return [app_dir for app_dir in app_dirs if app_dir.name in running]
+
+
+def compact_apps(app_dirs: List[Path]) -> Dict[str, Optional[int]]:
+    """Compact every app that is not running.
+
+    Returns the bytes freed per app name, or None for apps that were
+    skipped because they are running.
+    """
+    running = set(running_app_dirs(app_dirs))
+    return {
+        app_dir.name: None if app_dir in running else compact_app(app_dir)
+        for app_dir in app_dirs
+    }
+
+
+def find_orphans(app_dirs: List[Path]) -> List[Path]:
+    """Find web storage that no installed app uses any more.
+
+    The legacy shared profile only counts once every app has its own
+    profile, since apps copy their logins from it on first start.
+    """
+    orphans = []
+    if APP_CACHE_DIR.is_dir():
+        app_ids = {_app_id(app_dir) for app_dir in app_dirs}
+        orphans.extend(sorted(path for path in APP_CACHE_DIR.iterdir() if path.name not in app_ids))
+    if all((app_dir / "profile").is_dir() for app_dir in app_dirs):
+        orphans.extend(path for path in LEGACY_STORAGE_DIRS if path.is_dir())
+    return orphans
+
+
+def remove_orphans(orphans: List[Path]) -> int:
+    """Delete orphaned storage and return the number of bytes freed"""
+    freed = 0
+    for path in orphans:
+        freed += dir_size(path)
+        shutil.rmtree(path, ignore_errors=True)
+    return freed
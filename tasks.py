@@ -0,0 +1,88 @@
+"""
+Background work for the GUI
+
+Blocking work (file system, subprocesses) runs on a thread pool and
+returns futures. Results and progress updates come back through one
+thread-safe queue that the UI thread drains at a fixed frame rate, so
+the UI thread never waits on I/O and never gets flooded with updates.
+"""
+
+import queue
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Hashable, Optional
+
+
+class TaskRunner:
+    """Thread pool plus an event queue drained by the UI thread.
+
+    Worker code never touches widgets: it calls `post()` (or `progress()`
+    for updates where only the latest one matters), and the UI loop calls
+    `drain()` every frame to run the queued callbacks.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="appnera-worker")
+        self.events = queue.SimpleQueue()
+
+    def submit(
+        self,
+        fn: Callable,
+        *args,
+        on_done: Optional[Callable[[Any], None]] = None,
+        on_error: Optional[Callable[[Exception], None]] = None,
+        **kwargs,
+    ) -> Future:
+        """Run `fn` on the pool; `on_done` or `on_error` then run on the UI thread.
+
+        Errors of tasks without `on_error` are printed with their traceback.
+        """
+        future = self.pool.submit(fn, *args, **kwargs)
+
+        def deliver(done: Future):
+            error = done.exception()
+            if error is None:
+                if on_done is not None:
+                    self.post(on_done, done.result())
+            elif on_error is not None:
+                self.post(on_error, error)
+            else:
+                traceback.print_exception(type(error), error, error.__traceback__)
+
+        future.add_done_callback(deliver)
+        return future
+
+    def post(self, callback: Callable, *args):
+        """Queue `callback(*args)` for the UI thread (safe from any thread)"""
+        self.events.put((None, callback, args))
+
+    def progress(self, key: Hashable, callback: Callable, *args):
+        """Queue an update of which only the latest per `key` and frame is run"""
+        self.events.put((key, callback, args))
+
+    def drain(self):
+        """Run the queued callbacks on the calling (UI) thread"""
+        events = []
+        latest = {}
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if event[0] is not None:
+                latest[event[0]] = len(events)
+            events.append(event)
+
+        for index, (key, callback, args) in enumerate(events):
+            # Merged progress: skip updates superseded within this frame
+            if key is not None and latest[key] != index:
+                continue
+            try:
+                callback(*args)
+            except Exception:
+                # One failing callback must not stop the loop or drop the rest
+                traceback.print_exc()
+
+    def shutdown(self):
+        """Stop accepting work; running tasks finish in the background"""
+        self.pool.shutdown(wait=False, cancel_futures=True)
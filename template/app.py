@@ -1,54 +1,940 @@
 #!/usr/bin/env python3
 
+import json
+import marshal
 import os
+import shutil
+import signal
+import socket
 import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
 
-from PyQt5.QtCore import QUrl
-from PyQt5.QtWidgets import QApplication, QMainWindow
-from PyQt5.QtWebEngineWidgets import QWebEngineView
+# Reference point for startup timings, taken before the expensive Qt imports
+# (apps forked by the zygote get the time their launcher started)
+START_TIME = float(os.environ.pop("APPNERA_START_TIME", "") or time.monotonic())
+
+APP_DIR = Path(__file__).resolve().parent
+
+# Cached screenshot of the last rendered page, shown until the page has loaded
+SPLASH_PATH = APP_DIR / "splash.jpg"
+SPLASH_MAX_WIDTH = 1280
+SPLASH_TIMEOUT_MS = 15000
+
+# Per-app settings written by AppNEra (key=value lines)
+CONFIG_PATH = APP_DIR / "app.conf"
+
+# Host blocklists shared by all apps, compiled once into a cached hash set
+BLOCKLIST_DIR = Path.home() / ".config" / "appnera" / "blocklists"
+BLOCKLIST_CACHE = Path.home() / ".cache" / "appnera" / f"blocklist-py{sys.version_info[0]}{sys.version_info[1]}.marshal"
+ALLOWLIST_PATH = APP_DIR / "allowlist.txt"
+BLOCKED_STATS_PATH = APP_DIR / "blocked.json"
+
+# Last page, window geometry and zoom, restored on the next start
+SESSION_PATH = APP_DIR / "session.json"
+ZOOM_STEP = 0.1
+
+# Recent page loads, first paints and renderer crashes, kept as a ring buffer and
+# written in batches; only read by the AppNEra manager, never sent anywhere
+PERF_LOG_PATH = APP_DIR / "perf.json"
+PERF_LOG_SIZE = 500
+PERF_FLUSH_MS = 60000
+
+# A crashed renderer is reloaded after this delay, unless it crashed again this soon after a restart
+CRASH_RELOAD_MS = 1000
+CRASH_LOOP_SECONDS = 10
+
+# Paint timing of the current document, read in an isolated world the page's scripts cannot see
+FIRST_PAINT_SCRIPT = """
+(() => {
+    const paint = performance.getEntriesByName("first-contentful-paint")[0]
+        || performance.getEntriesByName("first-paint")[0];
+    return paint ? paint.startTime : null;
+})()
+"""
+
+# Scheduling presets for the `priority` setting, applied to the whole process tree
+# (QtWebEngineProcess children inherit them). Background apps, such as chat apps
+# that mostly wait for messages, yield CPU time and disk bandwidth to the app in focus.
+PRIORITY_PRESETS = {
+    "normal": {},
+    "background": {"nice": "10", "ioprio": "best-effort:7"},
+}
+RESOURCE_KEYS = ("nice", "ioprio", "cpu_affinity", "address_space_mb", "memory_max_mb")
+IOPRIO_CLASSES = {"realtime": 1, "best-effort": 2, "idle": 3}
+# ioprio_set(2) has no wrapper in Python or glibc
+IOPRIO_SET_SYSCALLS = {
+    "x86_64": 251, "i386": 289, "i686": 289, "armv7l": 314, "aarch64": 30,
+    "riscv64": 30, "loongarch64": 30, "ppc64le": 273, "s390x": 282,
+}
+MEMORY_CHECK_MS = 5000
+
+# Web storage (cookies, local storage, IndexedDB) lives with the app; the HTTP cache does not
+PROFILE_DIR = APP_DIR / "profile"
+CACHE_ROOT = Path.home() / ".cache" / "appnera" / "apps"
+# Cap of the HTTP cache while running, from storage_budget_mb (the manager's default, see storage.py)
+DEFAULT_CACHE_BUDGET_MB = 512
+
+# Where older versions stored data: Qt's default profile, named after app.py
+LEGACY_PROFILE_DIR = Path.home() / ".local" / "share" / "app" / "QtWebEngine" / "Default"
+
+RUNTIME_DIR = Path(os.environ.get("XDG_RUNTIME_DIR") or f"/tmp/appnera-{os.getuid()}")
+
+# Per-user prelauncher with Qt already imported (`appnera zygote enable`)
+ZYGOTE_SOCKET = RUNTIME_DIR / f"appnera-zygote-py{sys.version_info[0]}{sys.version_info[1]}.sock"
+
+# One socket per app process, used by the memory governor (`appnera governor`)
+CONTROL_DIR = RUNTIME_DIR / "appnera-control"
+
+
+def log_timing(event: str):
+    """Report milliseconds elapsed since startup for an event"""
+    elapsed = (time.monotonic() - START_TIME) * 1000
+    print(f"[appnera] {event}: {elapsed:.0f} ms", file=sys.stderr, flush=True)
+
+
+def load_config() -> dict:
+    """Load per-app settings from app.conf"""
+    config = {}
+    try:
+        with open(CONFIG_PATH, "r") as f:
+            for line in f:
+                key, sep, value = line.strip().partition("=")
+                if sep and not key.startswith("#"):
+                    config[key.strip()] = value.strip()
+    except OSError:
+        pass
+    return config
+
+
+def parse_host_list(path: Path) -> set:
+    """Extract plain host rules from an EasyList-style or hosts-file list"""
+    hosts = set()
+    with open(path, "r", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith(("!", "#", "[")):
+                continue
+            if line.startswith("||") and line.endswith("^"):
+                # Adblock host rule: ||ads.example.com^
+                host = line[2:-1]
+            elif " " in line or "\t" in line:
+                # Hosts file entry: 0.0.0.0 ads.example.com
+                host = line.split()[-1]
+            else:
+                host = line
+            host = host.lower().rstrip(".")
+            # Skip anything that is not a bare host name (paths, options, wildcards)
+            if host and "." in host and not any(c in host for c in "/*$^|@:"):
+                hosts.add(host)
+    return hosts
+
+
+def load_blocklist() -> frozenset:
+    """Load the compiled blocklist, rebuilding the cache if a source changed"""
+    try:
+        sources = sorted(BLOCKLIST_DIR.glob("*.txt"))
+    except OSError:
+        return frozenset()
+    if not sources:
+        return frozenset()
+    signature = [(str(p), p.stat().st_mtime_ns, p.stat().st_size) for p in sources]
+
+    try:
+        with open(BLOCKLIST_CACHE, "rb") as f:
+            cached_signature, hosts = marshal.load(f)
+        if cached_signature == signature:
+            return hosts
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    hosts = set()
+    for path in sources:
+        hosts |= parse_host_list(path)
+    hosts = frozenset(hosts)
+    try:
+        BLOCKLIST_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = BLOCKLIST_CACHE.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            marshal.dump((signature, hosts), f)
+        os.replace(tmp_path, BLOCKLIST_CACHE)
+    except OSError:
+        pass
+    return hosts
+
+
+def load_allowlist() -> frozenset:
+    """Load the hosts this app must never block"""
+    try:
+        with open(ALLOWLIST_PATH, "r") as f:
+            return frozenset(line.strip().lower() for line in f if line.strip() and not line.startswith("#"))
+    except OSError:
+        return frozenset()
+
+
+def load_session() -> dict:
+    """Load the state saved when the app was last closed"""
+    try:
+        with open(SESSION_PATH, "r") as f:
+            session = json.load(f)
+        return session if isinstance(session, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def append_perf_log(records: list):
+    """Add records to the app's performance log, keeping only the newest PERF_LOG_SIZE"""
+    try:
+        with open(PERF_LOG_PATH, "r") as f:
+            history = json.load(f).get("records", [])
+    except (OSError, ValueError, AttributeError):
+        history = []
+    history = (history + records)[-PERF_LOG_SIZE:]
+    tmp_path = PERF_LOG_PATH.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({"records": history}, f, separators=(",", ":"))
+    os.replace(tmp_path, PERF_LOG_PATH)
+
+
+def same_origin(url: str, other: str) -> bool:
+    """Check whether two URLs share scheme, host and port"""
+    try:
+        a, b = urlsplit(url), urlsplit(other)
+        return (a.scheme, a.hostname, a.port) == (b.scheme, b.hostname, b.port) and bool(a.hostname)
+    except ValueError:
+        return False
+
+
+def tab_label(url: str) -> str:
+    """Name a tab after its site, e.g. calendar.google.com"""
+    try:
+        host = urlsplit(url).hostname or ""
+    except ValueError:
+        host = ""
+    return host.removeprefix("www.") or url
+
+
+def match_host(host: str, hosts: frozenset) -> bool:
+    """Check a host and all of its parent domains against a host set"""
+    while host:
+        if host in hosts:
+            return True
+        _, _, host = host.partition(".")
+    return False
+
+
+def app_setting(config: dict, key: str, env_var: str, default: str) -> str:
+    """Look up an app setting, letting the environment (run.sh) override app.conf"""
+    return os.environ.get(env_var) or config.get(key) or default
+
+
+def resource_settings(config: dict) -> dict:
+    """Resource settings of the app: its priority preset, overridden by explicit keys"""
+    settings = dict(PRIORITY_PRESETS.get(config.get("priority", "normal"), {}))
+    settings.update({key: config[key] for key in RESOURCE_KEYS if config.get(key)})
+    return settings
+
+
+def parse_cpu_list(text: str) -> set:
+    """Parse a CPU list such as "0-3,6" """
+    cpus = set()
+    for part in text.split(","):
+        first, _, last = part.strip().partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def set_io_priority(spec: str):
+    """Set the IO priority of this process from "class[:level]", e.g. "best-effort:7" or "idle" """
+    name, _, level = spec.partition(":")
+    if name not in IOPRIO_CLASSES:
+        raise ValueError(f"unknown class '{name}'")
+    io_class = IOPRIO_CLASSES[name]
+    level = 0 if io_class == IOPRIO_CLASSES["idle"] else int(level or 4)
+    number = IOPRIO_SET_SYSCALLS.get(os.uname().machine)
+    if number is None:
+        import subprocess
+        if shutil.which("ionice") is None:
+            raise OSError("no ioprio_set syscall number for this machine and no ionice tool")
+        subprocess.run(["ionice", "-c", str(io_class), "-n", str(level), "-p", str(os.getpid())], check=True)
+        return
+    import ctypes
+    libc = ctypes.CDLL(None, use_errno=True)
+    # IOPRIO_WHO_PROCESS, this thread, class in the top bits
+    if libc.syscall(number, 1, 0, io_class << 13 | level) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+
+def set_address_space_limit(mb: str):
+    """Cap the virtual memory of every process (Chromium reserves several GB up front)"""
+    import resource
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    resource.setrlimit(resource.RLIMIT_AS, (int(mb) * 1024 * 1024, hard))
+
+
+def apply_process_limits(settings: dict):
+    """Apply niceness, IO priority, CPU affinity and the address-space limit.
+
+    Runs before any thread or child process is started, so Qt's threads and
+    the QtWebEngineProcess renderers inherit everything. Only what an
+    unprivileged user may set works (raising niceness, best-effort and idle
+    IO, lowering limits); anything else is reported and skipped.
+    """
+    setters = {
+        # Niceness can only be raised without privileges
+        "nice": lambda value: os.setpriority(
+            os.PRIO_PROCESS, 0, max(int(value), os.getpriority(os.PRIO_PROCESS, 0))
+        ),
+        "ioprio": set_io_priority,
+        "cpu_affinity": lambda value: os.sched_setaffinity(0, parse_cpu_list(value)),
+        "address_space_mb": set_address_space_limit,
+    }
+    for key, setter in setters.items():
+        if key in settings:
+            try:
+                setter(settings[key])
+            except (OSError, ValueError) as e:
+                print(f"[appnera] ignoring {key}={settings[key]}: {e}", file=sys.stderr)
+
+
+def process_tree_rss(root: int) -> dict:
+    """Map a process and all of its descendants to their resident set size in bytes"""
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    rss = {}
+    pending = [root]
+    while pending:
+        pid = pending.pop()
+        try:
+            with open(f"/proc/{pid}/statm", "rb") as f:
+                rss[pid] = int(f.read().split()[1]) * page_size
+            for task in os.listdir(f"/proc/{pid}/task"):
+                with open(f"/proc/{pid}/task/{task}/children", "rb") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (OSError, IndexError, ValueError):
+            continue
+    return rss
+
+
+def is_renderer(pid: int) -> bool:
+    """Check whether a process is a QtWebEngineProcess renderer"""
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return b"--type=renderer" in f.read().split(b"\0")
+    except OSError:
+        return False
+
+
+def launch_via_zygote(config: dict):
+    """Hand this launch to a running zygote; returns only if there is none.
+
+    The zygote forks a child that runs this file with our arguments,
+    environment and standard streams. This process stays as a small
+    launcher that forwards signals and exits with the app's status.
+    Apps using the system PyQt5 are not prelaunched, since the zygote
+    has the runtime cache's Qt loaded.
+    """
+    if os.environ.get("APPNERA_NO_ZYGOTE") or not hasattr(socket, "send_fds"):
+        return
+    if config.get("runtime") == "system":
+        return
+    try:
+        if ZYGOTE_SOCKET.stat().st_uid != os.getuid():
+            return
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(str(ZYGOTE_SOCKET))
+        request = {"script": str(APP_DIR / "app.py"), "argv": sys.argv[1:], "env": dict(os.environ), "start_time": START_TIME}
+        socket.send_fds(sock, [json.dumps(request).encode() + b"\n"], [0, 1, 2])
+        replies = sock.makefile("r")
+        reply = replies.readline()
+    except OSError:
+        return
+    if not reply:
+        return
+
+    pid = json.loads(reply)["pid"]
+
+    def forward(signum, frame):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(signum, forward)
+    status = replies.readline()
+    if not status:
+        # The zygote went away; the app keeps running on its own
+        while os.path.exists(f"/proc/{pid}"):
+            time.sleep(1)
+        sys.exit(0)
+    code = json.loads(status)["status"]
+    sys.exit(code if code >= 0 else 128 - code)
+
+
+def setup_site_packages(config: dict):
+    """Add the venv's site-packages when started with -S (site processing skipped).
+
+    The launcher runs `python -I -S app.py` to avoid the cost of site.py,
+    .pth files and user site directories, so the paths we need are added
+    explicitly here: the venv's site-packages and, for apps using the
+    system PyQt5, the directory it was found in at build time.
+    """
+    if not sys.flags.no_site:
+        return
+    venv_dir = Path(sys.executable).parent.parent
+    version = f"python{sys.version_info[0]}.{sys.version_info[1]}"
+    paths = [venv_dir / lib / version / "site-packages" for lib in ("lib", "lib64")]
+    runtime_path = app_setting(config, "runtime_path", "APPNERA_RUNTIME_PATH", "")
+    # An empty setting would be Path("") (the working directory), which -I keeps off the path
+    if config.get("runtime") == "system" and runtime_path:
+        paths.append(Path(runtime_path))
+    for site_packages in paths:
+        if site_packages.is_dir() and str(site_packages) not in sys.path:
+            sys.path.append(str(site_packages))
+
+
+def preconnect(url: str):
+    """Resolve and connect to the app origin in the background.
+
+    Runs while Qt WebEngine is still loading so DNS and the TCP/TLS path
+    to the server are warm by the time the first request is made.
+    """
+    parts = urlsplit(url)
+    if not parts.hostname:
+        return
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+
+    def run():
+        try:
+            socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+            with socket.create_connection((parts.hostname, port), timeout=5) as sock:
+                if parts.scheme == "https":
+                    import ssl
+                    context = ssl.create_default_context()
+                    with context.wrap_socket(sock, server_hostname=parts.hostname):
+                        pass
+        except (OSError, ValueError):
+            pass
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+CONFIG = load_config()
+# Disposable previews (preview.py): an off-the-record profile and nothing written to disk
+PREVIEW = CONFIG.get("preview") == "1"
+launch_via_zygote(CONFIG)
+RESOURCES = resource_settings(CONFIG)
+apply_process_limits(RESOURCES)
+
+APP_URL = app_setting(CONFIG, "url", "APPNERA_URL", "https://example.com")
+APP_NAME = app_setting(CONFIG, "name", "APPNERA_APP_NAME", "WebApp")
+APP_ID = app_setting(CONFIG, "id", "APPNERA_APP_ID", "webapp")
+# Related sites shown as further tabs of the same window, on the same profile (tabs=<url> <url> ...)
+APP_URLS = list(dict.fromkeys([APP_URL, *CONFIG.get("tabs", "").split()]))
+
+# Start warming the connection before Qt WebEngine is imported and initialized
+preconnect(APP_URL)
+setup_site_packages(CONFIG)
+
+if CONFIG.get("backend") == "webkitgtk" and __name__ == "__main__":
+    # Rendered by the system WebKitGTK instead (app_webkit.py, next to this file)
+    sys.path.insert(0, str(APP_DIR))
+    from app_webkit import main as webkit_main
+    sys.exit(webkit_main(sys.modules[__name__]))
+
+from PyQt5.QtCore import QByteArray, QEvent, Qt, QTimer, QUrl
+from PyQt5.QtGui import QKeySequence, QPixmap
+from PyQt5.QtWidgets import QApplication, QLabel, QMainWindow, QShortcut, QStackedLayout, QTabWidget, QWidget
+from PyQt5.QtWebEngineCore import QWebEngineUrlRequestInfo, QWebEngineUrlRequestInterceptor
+from PyQt5.QtNetwork import QLocalServer
+from PyQt5.QtWebEngineWidgets import QWebEnginePage, QWebEngineProfile, QWebEngineScript, QWebEngineView
+
+
+def create_profile(app_id: str) -> QWebEngineProfile:
+    """Create the app's own persistent web profile.
+
+    Apps created before profiles were per-app get a copy of the old shared
+    default profile on first start so existing logins survive. Previews
+    get an off-the-record profile, which keeps everything in memory.
+    """
+    if PREVIEW:
+        return QWebEngineProfile(QApplication.instance())
+    if not PROFILE_DIR.exists() and LEGACY_PROFILE_DIR.is_dir():
+        try:
+            shutil.copytree(
+                LEGACY_PROFILE_DIR,
+                PROFILE_DIR,
+                ignore=shutil.ignore_patterns("Cache", "Code Cache", "GPUCache"),
+            )
+        except OSError:
+            pass
+    profile = QWebEngineProfile(app_id, QApplication.instance())
+    profile.setPersistentStoragePath(str(PROFILE_DIR))
+    profile.setCachePath(str(CACHE_ROOT / app_id))
+    try:
+        budget_mb = int(CONFIG.get("storage_budget_mb", DEFAULT_CACHE_BUDGET_MB))
+    except ValueError:
+        budget_mb = DEFAULT_CACHE_BUDGET_MB
+    profile.setHttpCacheMaximumSize(min(budget_mb * 1024 * 1024, 2**31 - 1))
+    profile.setPersistentCookiesPolicy(QWebEngineProfile.ForcePersistentCookies)
+    return profile
+
+
+class BlocklistInterceptor(QWebEngineUrlRequestInterceptor):
+    """Block subresource requests to blocklisted hosts at the network level"""
+
+    def __init__(self, blocklist: frozenset, allowlist: frozenset):
+        super().__init__()
+        self.blocklist = blocklist
+        self.allowlist = allowlist
+        self.blocked = 0
+        self.saved_blocked = 0
+        self.blocked_hosts = {}
+
+    def interceptRequest(self, info):
+        # Never block the page the user actually navigates to
+        if info.resourceType() == QWebEngineUrlRequestInfo.ResourceTypeMainFrame:
+            return
+        host = info.requestUrl().host().lower()
+        if match_host(host, self.blocklist) and not match_host(host, self.allowlist):
+            info.block(True)
+            self.blocked += 1
+            self.blocked_hosts[host] = self.blocked_hosts.get(host, 0) + 1
+
+    def save_stats(self):
+        """Write blocked-request counters for the AppNEra manager"""
+        try:
+            with open(BLOCKED_STATS_PATH, "r") as f:
+                total = json.load(f).get("total_blocked", 0)
+        except (OSError, ValueError, AttributeError):
+            total = 0
+        top_hosts = sorted(self.blocked_hosts.items(), key=lambda item: -item[1])[:20]
+        stats = {
+            "session_blocked": self.blocked,
+            "total_blocked": total + self.blocked - self.saved_blocked,
+            "top_hosts": dict(top_hosts),
+        }
+        self.saved_blocked = self.blocked
+        tmp_path = BLOCKED_STATS_PATH.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(stats, f)
+        os.replace(tmp_path, BLOCKED_STATS_PATH)
 
 
 class WebAppWindow(QMainWindow):
-    def __init__(self, url: str, title: str):
+    def __init__(self, urls: list, title: str, config: dict, profile: QWebEngineProfile, resources: dict):
         super().__init__()
-        
-        # Set window size based on screen dimensions (85% of screen)
-        screen = QApplication.primaryScreen().geometry()
-        width = int(screen.width() * 0.85)
-        height = int(screen.height() * 0.85)
-        self.setGeometry(100, 100, width, height)
+        # Tracked for the memory governor (set first, window events may arrive during setup)
+        self.last_active = time.monotonic()
+        self.discarded = False
+        session = {} if PREVIEW else load_session()
+
+        # Restore the last window geometry, or use 85% of the screen
+        if not self.restoreGeometry(QByteArray.fromBase64(str(session.get("geometry", "")).encode())):
+            screen = QApplication.primaryScreen().geometry()
+            width = int(screen.width() * 0.85)
+            height = int(screen.height() * 0.85)
+            self.setGeometry(100, 100, width, height)
         self.setWindowTitle(title)
 
-        # Set up the web engine view
-        self.browser = QWebEngineView()
-        
+        # Reopen the last page to skip login and landing redirects, but only on the app's origin
+        self.home_url = urls[0]
+        last_url = str(session.get("url", ""))
+        self.restoring = last_url != self.home_url and same_origin(last_url, self.home_url)
+
+        # Navigation timings and renderer crashes, flushed to the performance log in batches
+        self.perf_records = []
+        self.load_started = {}
+        self.last_restart = None
+
+        # One view per URL, all on the app's profile; the first is the app's main page
+        self.urls = urls
+        self.views = [self._create_view(profile) for _ in urls]
+        self.browser = self.views[0]
+        self.opened_views = set()
+        self.page_loaded = False
+        self.shown_once = False
+        self.perf_timer = QTimer(self)
+        self.perf_timer.timeout.connect(self._save_perf_log)
+        if not PREVIEW:
+            self.perf_timer.start(PERF_FLUSH_MS)
+
         # Set user agent to identify as Chrome on Linux (required for WhatsApp and other sites)
-        profile = self.browser.page().profile()
         user_agent = (
             "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
             "(KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
         )
         profile.setHttpUserAgent(user_agent)
-        
-        self.browser.setUrl(QUrl(url))
+
+        # Optional network-level request blocking (no JavaScript is injected)
+        self.interceptor = None
+        if config.get("block_requests") == "1":
+            blocklist = load_blocklist()
+            if blocklist:
+                self.interceptor = BlocklistInterceptor(blocklist, load_allowlist())
+                profile.setUrlRequestInterceptor(self.interceptor)
+                self.stats_timer = QTimer(self)
+                self.stats_timer.timeout.connect(self._save_blocked_stats)
+                self.stats_timer.start(30000)
+
+        try:
+            self.zoom = min(max(float(session.get("zoom", 1.0)), 0.25), 5.0)
+        except (TypeError, ValueError):
+            self.zoom = 1.0
+        for keys, step in ((QKeySequence.ZoomIn, ZOOM_STEP), (QKeySequence.ZoomOut, -ZOOM_STEP), ("Ctrl+0", None)):
+            QShortcut(QKeySequence(keys), self, lambda step=step: self._zoom(step))
+
+        self._open_view(self.browser, last_url if self.restoring else self.home_url)
+
+        # Further URLs are tabs that load when they are first shown (Ctrl+1 to Ctrl+9 switch)
+        self.tabs = None
+        content = self.browser
+        if len(self.views) > 1:
+            self.tabs = QTabWidget()
+            self.tabs.setDocumentMode(True)
+            for view, tab_url in zip(self.views, urls):
+                self.tabs.addTab(view, tab_label(tab_url))
+                view.titleChanged.connect(lambda text, view=view: self._on_title_changed(view, text))
+            self.tabs.currentChanged.connect(self._on_tab_changed)
+            for index in range(min(len(self.views), 9)):
+                QShortcut(QKeySequence(f"Ctrl+{index + 1}"), self, lambda index=index: self.tabs.setCurrentIndex(index))
+            content = self.tabs
+
+        # Stack the cached splash on top of the (already rendering) browser
+        container = QWidget()
+        self.stack = QStackedLayout(container)
+        self.stack.setStackingMode(QStackedLayout.StackAll)
+        self.stack.addWidget(content)
+        self.splash = None if PREVIEW else self._create_splash()
+        if self.splash is not None:
+            self.stack.addWidget(self.splash)
+            self.stack.setCurrentWidget(self.splash)
+            QTimer.singleShot(SPLASH_TIMEOUT_MS, self._hide_splash)
+
+        self.setCentralWidget(container)
+
+        # Memory governor control channel
+        self.control_server = self._start_control_server()
+
+        # Memory ceiling for the whole process tree
+        try:
+            self.memory_max = int(resources.get("memory_max_mb", 0)) * 1024 * 1024
+        except ValueError:
+            self.memory_max = 0
+        if self.memory_max > 0:
+            self.memory_timer = QTimer(self)
+            self.memory_timer.timeout.connect(self._check_memory)
+            self.memory_timer.start(MEMORY_CHECK_MS)
+
+    def _create_view(self, profile: QWebEngineProfile) -> QWebEngineView:
+        """Create a view on the app's profile that reports its loads and renderer crashes"""
+        view = QWebEngineView()
+        view.setPage(QWebEnginePage(profile, view))
+        view.loadStarted.connect(lambda view=view: self._on_load_started(view))
+        view.loadFinished.connect(lambda ok, view=view: self._on_load_finished(view, ok))
+        view.page().renderProcessTerminated.connect(
+            lambda status, exit_code, view=view: self._on_renderer_terminated(view, status, exit_code)
+        )
 
         # Enable persistent storage (cookies, cache, etc.)
-        self.browser.settings().setAttribute(self.browser.settings().LocalStorageEnabled, True)
-        self.browser.settings().setAttribute(self.browser.settings().LocalContentCanAccessFileUrls, True)
-        self.browser.settings().setAttribute(self.browser.settings().LocalContentCanAccessRemoteUrls, True)
+        view.settings().setAttribute(view.settings().LocalStorageEnabled, True)
+        view.settings().setAttribute(view.settings().LocalContentCanAccessFileUrls, True)
+        view.settings().setAttribute(view.settings().LocalContentCanAccessRemoteUrls, True)
+        return view
+
+    def _open_view(self, view: QWebEngineView, url: str):
+        """Start loading a view at the app's zoom"""
+        self.opened_views.add(view)
+        view.setZoomFactor(self.zoom)
+        view.setUrl(QUrl(url))
+
+    def _current_view(self) -> QWebEngineView:
+        return self.browser if self.tabs is None else self.tabs.currentWidget()
+
+    def _on_tab_changed(self, index: int):
+        """Load a tab the first time it is shown"""
+        view = self.views[index]
+        if view not in self.opened_views:
+            self._open_view(view, self.urls[index])
+
+    def _on_title_changed(self, view: QWebEngineView, text: str):
+        self.tabs.setTabToolTip(self.tabs.indexOf(view), text)
+
+    def _create_splash(self):
+        """Create a label showing the last rendered frame, if one was cached"""
+        if not SPLASH_PATH.exists():
+            return None
+        pixmap = QPixmap(str(SPLASH_PATH))
+        if pixmap.isNull():
+            return None
+        label = QLabel()
+        label.setPixmap(pixmap)
+        label.setScaledContents(True)
+        return label
+
+    def _hide_splash(self):
+        """Remove the splash so the live page is visible"""
+        if self.splash is None:
+            return
+        self.stack.removeWidget(self.splash)
+        self.splash.deleteLater()
+        self.splash = None
+
+    def _zoom(self, step):
+        """Zoom the page in or out by `step`, or back to 100% for None"""
+        factor = 1.0 if step is None else self._current_view().zoomFactor() + step
+        self.zoom = min(max(factor, 0.25), 5.0)
+        for view in self.opened_views:
+            view.setZoomFactor(self.zoom)
+
+    def _save_session(self):
+        """Remember the current page, window geometry and zoom for the next start"""
+        session = {
+            "geometry": bytes(self.saveGeometry().toBase64()).decode(),
+            "zoom": self.browser.zoomFactor(),
+        }
+        url = self.browser.url().toString()
+        if same_origin(url, self.home_url):
+            session["url"] = url
+        tmp_path = SESSION_PATH.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(session, f)
+        os.replace(tmp_path, SESSION_PATH)
+
+    def _on_load_started(self, view: QWebEngineView):
+        self.load_started[view] = time.monotonic()
+
+    def _on_load_finished(self, view: QWebEngineView, ok: bool):
+        """Swap the splash for the live page once it has loaded"""
+        self._record_load(view, ok)
+        if view is not self.browser:
+            # Chromium may reset the zoom when a page commits
+            view.setZoomFactor(self.zoom)
+            return
+        if self.restoring:
+            self.restoring = False
+            if not ok:
+                # The last page is gone; start over from the configured URL
+                self.browser.setUrl(QUrl(self.home_url))
+                return
+        if not self.page_loaded:
+            log_timing("page load finished")
+            # Chromium may reset the zoom when the first page commits
+            self.browser.setZoomFactor(self.zoom)
+        self.page_loaded = self.page_loaded or ok
+        self._hide_splash()
+
+    def _record_load(self, view: QWebEngineView, ok: bool):
+        """Queue the timing of a finished navigation, with its first paint once known"""
+        load_started = self.load_started.pop(view, None)
+        if load_started is None:
+            return
+        record = {
+            "time": time.time(),
+            "event": "load",
+            "ok": ok,
+            "load_ms": round((time.monotonic() - load_started) * 1000),
+            "paint_ms": None,
+        }
+        self.perf_records.append(record)
+        if ok:
+            view.page().runJavaScript(
+                FIRST_PAINT_SCRIPT,
+                QWebEngineScript.ApplicationWorld,
+                lambda paint_ms: record.update(paint_ms=round(paint_ms) if isinstance(paint_ms, (int, float)) else None),
+            )
+
+    def _on_renderer_terminated(self, view: QWebEngineView, status, exit_code: int):
+        """Record a renderer crash and reload the page, unless it keeps crashing"""
+        if status == QWebEnginePage.NormalTerminationStatus:
+            return
+        self.load_started.pop(view, None)
+        self.perf_records.append({"time": time.time(), "event": "crash", "status": int(status), "exit_code": exit_code})
+        now = time.monotonic()
+        if self.last_restart is not None and now - self.last_restart < CRASH_LOOP_SECONDS:
+            return
+        self.last_restart = now
+        self.perf_records.append({"time": time.time(), "event": "restart"})
+        QTimer.singleShot(CRASH_RELOAD_MS, view.reload)
+
+    def _save_perf_log(self):
+        """Write queued performance records, if there are any"""
+        if not self.perf_records:
+            return
+        records, self.perf_records = self.perf_records, []
+        try:
+            append_perf_log(records)
+        except OSError:
+            pass
+
+    def _save_splash(self):
+        """Save a scaled screenshot of the current page for the next launch"""
+        if not self.page_loaded or self.splash is not None or self._current_view() is not self.browser:
+            return
+        pixmap = self.centralWidget().grab()
+        if pixmap.isNull():
+            return
+        if pixmap.width() > SPLASH_MAX_WIDTH:
+            pixmap = pixmap.scaledToWidth(SPLASH_MAX_WIDTH, Qt.SmoothTransformation)
+        tmp_path = SPLASH_PATH.with_suffix(".tmp")
+        if pixmap.save(str(tmp_path), "JPEG", 80):
+            os.replace(tmp_path, SPLASH_PATH)
+
+    def _save_blocked_stats(self):
+        """Persist blocked-request counters if anything new was blocked"""
+        if self.interceptor is None or self.interceptor.blocked == self.interceptor.saved_blocked:
+            return
+        try:
+            self.interceptor.save_stats()
+        except OSError:
+            pass
+
+    def _start_control_server(self):
+        """Listen for requests from the memory governor on a per-process socket"""
+        try:
+            CONTROL_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+        except OSError:
+            return None
+        path = str(CONTROL_DIR / f"{os.getpid()}.sock")
+        QLocalServer.removeServer(path)
+        server = QLocalServer(self)
+        server.setSocketOptions(QLocalServer.UserAccessOption)
+        if not server.listen(path):
+            return None
+        server.newConnection.connect(self._on_control_connection)
+        return server
+
+    def _on_control_connection(self):
+        while self.control_server.hasPendingConnections():
+            conn = self.control_server.nextPendingConnection()
+            conn.readyRead.connect(lambda conn=conn: self._handle_control_request(conn))
+            conn.disconnected.connect(conn.deleteLater)
+
+    def _handle_control_request(self, conn):
+        """Answer one JSON request line: status or discard"""
+        if not conn.canReadLine():
+            return
+        try:
+            command = json.loads(bytes(conn.readLine()).decode()).get("command")
+        except (ValueError, AttributeError):
+            command = None
+        if command == "status":
+            reply = {
+                "app_id": APP_ID,
+                "hidden": self._is_hidden(),
+                "idle": 0 if self.isActiveWindow() else time.monotonic() - self.last_active,
+                "discarded": self.discarded,
+            }
+        elif command == "discard":
+            reply = {"ok": self._discard_page()}
+        else:
+            reply = {"ok": False, "error": "unknown command"}
+        conn.write(json.dumps(reply).encode() + b"\n")
+        conn.flush()
+        conn.disconnectFromServer()
+
+    def _is_hidden(self) -> bool:
+        return self.isMinimized() or not self.isVisible()
+
+    def _discard_page(self) -> bool:
+        """Free the page's renderer memory while the window is hidden.
+
+        The page is reloaded when the window is shown again.
+        """
+        if self.discarded or not self._is_hidden() or not hasattr(QWebEnginePage, "setLifecycleState"):
+            return False
+        views = [view for view in self.views if view in self.opened_views]
+        # Minimized views still count as visible to Chromium
+        for view in views:
+            view.page().setVisible(False)
+            view.page().setLifecycleState(QWebEnginePage.Discarded)
+        self.discarded = any(view.page().lifecycleState() == QWebEnginePage.Discarded for view in views)
+        if not self.discarded:
+            for view in views:
+                view.page().setVisible(view is self._current_view())
+        return self.discarded
+
+    def _check_memory(self):
+        """Free memory when the app's processes together exceed memory_max_mb.
+
+        A hidden page is discarded; otherwise the largest renderer is killed
+        and reloaded like after a crash.
+        """
+        rss = process_tree_rss(os.getpid())
+        if sum(rss.values()) <= self.memory_max or self._discard_page():
+            return
+        renderers = [pid for pid in rss if is_renderer(pid)]
+        if not renderers:
+            return
+        pid = max(renderers, key=rss.get)
+        print(
+            f"[appnera] {sum(rss.values()) // (1024 * 1024)} MB is over the "
+            f"{self.memory_max // (1024 * 1024)} MB limit, restarting renderer {pid}",
+            file=sys.stderr,
+        )
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    def _restore_page(self):
+        """Bring a discarded page back when the window is used again"""
+        if not self.discarded:
+            return
+        self.discarded = False
+        for view in self.views:
+            if view in self.opened_views:
+                view.page().setVisible(view is self._current_view())
+                view.page().setLifecycleState(QWebEnginePage.Active)
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.ActivationChange:
+            self.last_active = time.monotonic()
+        if event.type() in (QEvent.ActivationChange, QEvent.WindowStateChange) and not self._is_hidden():
+            self._restore_page()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._restore_page()
+        if not self.shown_once:
+            self.shown_once = True
+            log_timing("window shown")
+            if self.splash is not None:
+                log_timing("usable window (cached splash)")
 
-        self.setCentralWidget(self.browser)
+    def closeEvent(self, event):
+        if not PREVIEW:
+            try:
+                self._save_splash()
+            except OSError:
+                pass
+            try:
+                self._save_session()
+            except OSError:
+                pass
+            self._save_blocked_stats()
+            self._save_perf_log()
+        if self.control_server is not None:
+            self.control_server.close()
+        super().closeEvent(event)
 
 
 def main():
-    url = os.environ.get("APPNERA_URL", "https://example.com")
-    title = os.environ.get("APPNERA_APP_NAME", "WebApp")
-    
     app = QApplication(sys.argv)
-    window = WebAppWindow(url=url, title=title)
+    log_timing("QApplication created")
+    window = WebAppWindow(
+        urls=APP_URLS, title=APP_NAME, config=CONFIG, profile=create_profile(APP_ID), resources=RESOURCES,
+    )
     window.show()
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    # Pages must be released before the profile they belong to
+    del window
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,238 @@
+"""
+WebKitGTK backend of the app template
+
+Used instead of QtWebEngine for apps created with backend=webkitgtk: the
+page is rendered by the system's WebKitGTK through PyGObject, so the app
+needs no private browser engine and its web processes are smaller. app.py
+hands over its own module (paths, settings and helpers) once the process
+limits are applied, and this file keeps the same profile, cache, session
+and performance log locations. Request blocking, the cached splash and
+the memory governor's discard requests are QtWebEngine-only.
+"""
+
+import json
+import os
+import sys
+import time
+
+import gi
+
+for _api in ("4.1", "4.0"):
+    try:
+        gi.require_version("WebKit2", _api)
+        break
+    except ValueError:
+        pass
+gi.require_version("Gtk", "3.0")
+
+from gi.repository import Gdk, GLib, Gtk, WebKit2  # noqa: E402
+
+# Paint timing of the current document, read in a script world the page's scripts cannot see
+SCRIPT_WORLD = "appnera"
+
+
+class WebKitAppWindow(Gtk.Window):
+    def __init__(self, app):
+        super().__init__(title=app.APP_NAME)
+        self.app = app
+        session = app.load_session()
+
+        width, height = session.get("size") or (0, 0)
+        if not (isinstance(width, int) and isinstance(height, int) and width > 0 and height > 0):
+            display = Gdk.Display.get_default()
+            monitor = display.get_primary_monitor() or display.get_monitor(0)
+            screen = monitor.get_geometry()
+            width, height = int(screen.width * 0.85), int(screen.height * 0.85)
+        self.set_default_size(width, height)
+        try:
+            self.set_icon_from_file(str(app.APP_DIR / "icon.png"))
+        except GLib.Error:
+            pass
+
+        # The app's own persistent storage and HTTP cache, in the same places as with QtWebEngine
+        app.PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        data_manager = WebKit2.WebsiteDataManager(
+            base_data_directory=str(app.PROFILE_DIR),
+            base_cache_directory=str(app.CACHE_ROOT / app.APP_ID),
+        )
+        data_manager.get_cookie_manager().set_persistent_storage(
+            str(app.PROFILE_DIR / "cookies.sqlite"), WebKit2.CookiePersistentStorage.SQLITE
+        )
+        context = WebKit2.WebContext.new_with_website_data_manager(data_manager)
+        self.view = WebKit2.WebView.new_with_context(context)
+        self.add(self.view)
+
+        # Reopen the last page, but only on the app's origin
+        self.home_url = app.APP_URL
+        last_url = str(session.get("url", ""))
+        self.restoring = last_url != self.home_url and app.same_origin(last_url, self.home_url)
+
+        try:
+            self.zoom = min(max(float(session.get("zoom", 1.0)), 0.25), 5.0)
+        except (TypeError, ValueError):
+            self.zoom = 1.0
+        self.view.set_zoom_level(self.zoom)
+        self.connect("key-press-event", self._on_key_press)
+
+        # Navigation timings and web process crashes, flushed to the performance log in batches
+        self.page_loaded = False
+        self.load_started = None
+        self.load_failed = False
+        self.last_restart = None
+        self.perf_records = []
+        self.view.connect("load-changed", self._on_load_changed)
+        self.view.connect("load-failed", self._on_load_failed)
+        self.view.connect("web-process-terminated", self._on_web_process_terminated)
+        GLib.timeout_add(app.PERF_FLUSH_MS, self._save_perf_log_periodically)
+
+        try:
+            self.memory_max = int(app.RESOURCES.get("memory_max_mb", 0)) * 1024 * 1024
+        except ValueError:
+            self.memory_max = 0
+        if self.memory_max > 0:
+            GLib.timeout_add(app.MEMORY_CHECK_MS, self._check_memory)
+
+        self.connect("delete-event", self._on_delete)
+        self.view.load_uri(last_url if self.restoring else self.home_url)
+
+    def _on_key_press(self, widget, event) -> bool:
+        """Ctrl + plus, minus and 0 zoom the page"""
+        if not event.state & Gdk.ModifierType.CONTROL_MASK:
+            return False
+        if event.keyval in (Gdk.KEY_plus, Gdk.KEY_equal, Gdk.KEY_KP_Add):
+            factor = self.view.get_zoom_level() + self.app.ZOOM_STEP
+        elif event.keyval in (Gdk.KEY_minus, Gdk.KEY_KP_Subtract):
+            factor = self.view.get_zoom_level() - self.app.ZOOM_STEP
+        elif event.keyval in (Gdk.KEY_0, Gdk.KEY_KP_0):
+            factor = 1.0
+        else:
+            return False
+        self.view.set_zoom_level(min(max(factor, 0.25), 5.0))
+        return True
+
+    def _on_load_changed(self, view, event):
+        if event == WebKit2.LoadEvent.STARTED:
+            self.load_started = time.monotonic()
+            self.load_failed = False
+        elif event == WebKit2.LoadEvent.FINISHED:
+            self._on_load_finished(not self.load_failed)
+
+    def _on_load_failed(self, view, event, uri, error) -> bool:
+        self.load_failed = True
+        return False
+
+    def _on_load_finished(self, ok: bool):
+        if self.restoring:
+            self.restoring = False
+            if not ok:
+                # The last page is gone; start over from the configured URL
+                self.view.load_uri(self.home_url)
+                return
+        if not self.page_loaded:
+            self.app.log_timing("page load finished")
+        self.page_loaded = self.page_loaded or ok
+        self._record_load(ok)
+
+    def _record_load(self, ok: bool):
+        """Queue the timing of a finished navigation, with its first paint once known"""
+        if self.load_started is None:
+            return
+        record = {
+            "time": time.time(),
+            "event": "load",
+            "ok": ok,
+            "load_ms": round((time.monotonic() - self.load_started) * 1000),
+            "paint_ms": None,
+        }
+        self.load_started = None
+        self.perf_records.append(record)
+        if ok:
+            self._read_first_paint(record)
+
+    def _read_first_paint(self, record: dict):
+        def done(view, result, *args):
+            try:
+                if hasattr(view, "evaluate_javascript_finish"):
+                    value = view.evaluate_javascript_finish(result)
+                else:
+                    value = view.run_javascript_in_world_finish(result).get_js_value()
+            except GLib.Error:
+                return
+            if value.is_number():
+                record["paint_ms"] = round(value.to_double())
+
+        script = self.app.FIRST_PAINT_SCRIPT
+        if hasattr(self.view, "evaluate_javascript"):
+            self.view.evaluate_javascript(script, -1, SCRIPT_WORLD, None, None, done)
+        else:
+            self.view.run_javascript_in_world(script, SCRIPT_WORLD, None, done)
+
+    def _on_web_process_terminated(self, view, reason):
+        """Record a web process crash and reload the page, unless it keeps crashing"""
+        self.load_started = None
+        self.perf_records.append({"time": time.time(), "event": "crash", "status": int(reason), "exit_code": 0})
+        now = time.monotonic()
+        if self.last_restart is not None and now - self.last_restart < self.app.CRASH_LOOP_SECONDS:
+            return
+        self.last_restart = now
+        self.perf_records.append({"time": time.time(), "event": "restart"})
+        GLib.timeout_add(self.app.CRASH_RELOAD_MS, lambda: self.view.reload() and False)
+
+    def _check_memory(self) -> bool:
+        """Restart the web process when the app's processes together exceed memory_max_mb"""
+        rss = self.app.process_tree_rss(os.getpid())
+        if sum(rss.values()) > self.memory_max and hasattr(self.view, "terminate_web_process"):
+            print(
+                f"[appnera] {sum(rss.values()) // (1024 * 1024)} MB is over the "
+                f"{self.memory_max // (1024 * 1024)} MB limit, restarting the web process",
+                file=sys.stderr,
+            )
+            self.view.terminate_web_process()
+        return True
+
+    def _save_perf_log(self):
+        """Write queued performance records, if there are any"""
+        if not self.perf_records:
+            return
+        records, self.perf_records = self.perf_records, []
+        try:
+            self.app.append_perf_log(records)
+        except OSError:
+            pass
+
+    def _save_perf_log_periodically(self) -> bool:
+        self._save_perf_log()
+        return True
+
+    def _save_session(self):
+        """Remember the current page, window size and zoom for the next start"""
+        width, height = self.get_size()
+        session = {"size": [width, height], "zoom": self.view.get_zoom_level()}
+        url = self.view.get_uri() or ""
+        if self.app.same_origin(url, self.home_url):
+            session["url"] = url
+        tmp_path = self.app.SESSION_PATH.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(session, f)
+        os.replace(tmp_path, self.app.SESSION_PATH)
+
+    def _on_delete(self, widget, event) -> bool:
+        try:
+            self._save_session()
+        except OSError:
+            pass
+        self._save_perf_log()
+        Gtk.main_quit()
+        return False
+
+
+def main(app) -> int:
+    """Run an app on WebKitGTK; `app` is the app.py module"""
+    GLib.set_prgname(app.APP_ID)
+    if app.CONFIG.get("block_requests") == "1":
+        print("[appnera] request blocking is not available with WebKitGTK", file=sys.stderr)
+    window = WebKitAppWindow(app)
+    window.show_all()
+    app.log_timing("window shown")
+    Gtk.main()
+    return 0
@@ -17,39 +17,53 @@ mkdir -p "$APP_DIR" "$APP_DESKTOP_DIR" "$APP_ICON_DIR"
 
 echo "Installing '$APP_NAME' into $APP_DIR"
 
+# Fill in a template with the same placeholders AppNEra uses
+render() {
+    local text
+    text="$(<"$SCRIPT_DIR/$1")"
+    text="${text//@APP_NAME@/$APP_NAME}"
+    text="${text//@APP_ID@/$APP_ID}"
+    text="${text//@APP_DIR@/$APP_DIR}"
+    printf '%s\n' "$text" > "$2"
+}
+
 # Copy app runtime
 cp "$SCRIPT_DIR/app.py" "$APP_DIR/app.py"
 cp "$SCRIPT_DIR/icon.png" "$APP_DIR/icon.png"
-cp "$SCRIPT_DIR/uninstall.sh" "$APP_DIR/uninstall.sh"
+render uninstall.sh.in "$APP_DIR/uninstall.sh"
 chmod +x "$APP_DIR/uninstall.sh"
 
 # Create isolated virtual environment
 python3 -m venv "$APP_DIR/venv"
 
-# Create launcher
+# Per-app settings read by app.py
+cat > "$APP_DIR/app.conf" <<EOF
+name=$APP_NAME
+id=$APP_ID
+url=$APP_URL
+EOF
+
+# Create launcher (-I -S skips site processing; app.py sets up its own path)
 cat > "$APP_DIR/run.sh" <<EOF
 #!/usr/bin/env bash
 set -euo pipefail
 
-export APPNERA_APP_NAME="$APP_NAME"
-export APPNERA_APP_ID="$APP_ID"
-export APPNERA_URL="$APP_URL"
-
-exec "$APP_DIR/venv/bin/python" "$APP_DIR/app.py"
+exec "$APP_DIR/venv/bin/python" -I -S "$APP_DIR/app.py" "\$@"
 EOF
 chmod +x "$APP_DIR/run.sh"
 
-# Create .desktop entry inside the app directory (self-contained)
-cat > "$APP_DIR/$APP_ID.desktop" <<EOF
-[Desktop Entry]
-Name=$APP_NAME
-Comment=$APP_NAME
-Exec=$APP_DIR/run.sh
-Icon=$APP_DIR/icon.png
-Terminal=false
-Type=Application
-Categories=Network;WebBrowser;
-EOF
+# Create .desktop entry inside the app directory (self-contained); its
+# Icon= names the app id, which the icons below provide
+render app.desktop.in "$APP_DIR/$APP_ID.desktop"
+
+# Put the icon in the hicolor theme at its own size (read from the PNG header)
+icon_size="$(od -An -tu1 -j16 -N4 "$APP_DIR/icon.png" | awk '{print (($1 * 256 + $2) * 256 + $3) * 256 + $4}')"
+case "$icon_size" in
+    16|22|24|32|48|64|128|256|512)
+        mkdir -p "$APP_ICON_DIR/hicolor/${icon_size}x${icon_size}/apps"
+        cp "$APP_DIR/icon.png" "$APP_ICON_DIR/hicolor/${icon_size}x${icon_size}/apps/$APP_ID.png"
+        ;;
+esac
 
 # Link desktop entry + icon into standard user locations
 ln -sf "$APP_DIR/$APP_ID.desktop" "$APP_DESKTOP_DIR/$APP_ID.desktop"
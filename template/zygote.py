@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+AppNEra zygote: keeps the Qt modules imported and forks apps from them
+
+Started once per user (at login, see `appnera zygote enable`). It imports
+PyQt5 and QtWebEngine without creating a QApplication, then listens on a
+Unix socket. app.py connects to it on launch and sends its script,
+arguments, environment and standard streams; the zygote forks a child
+that becomes that app, so every app still has its own process and
+profile but skips the import and dynamic-linking cost.
+"""
+
+import json
+import os
+import runpy
+import selectors
+import signal
+import socket
+import struct
+import sys
+import traceback
+from pathlib import Path
+
+RUNTIME_CACHE_DIR = Path.home() / ".cache" / "appnera" / "runtime"
+
+# Must match ZYGOTE_SOCKET in app.py
+SOCKET_DIR = Path(os.environ.get("XDG_RUNTIME_DIR") or f"/tmp/appnera-{os.getuid()}")
+SOCKET_PATH = SOCKET_DIR / f"appnera-zygote-py{sys.version_info[0]}{sys.version_info[1]}.sock"
+
+MAX_REQUEST = 1024 * 1024
+REQUEST_TIMEOUT = 5
+
+
+def setup_runtime(site_packages: str = ""):
+    """Import everything app.py imports, from the shared runtime cache by default"""
+    if not site_packages:
+        site_packages = str(RUNTIME_CACHE_DIR / f"python{sys.version_info[0]}.{sys.version_info[1]}")
+    if os.path.isdir(site_packages) and site_packages not in sys.path:
+        sys.path.append(site_packages)
+
+    import marshal, shutil, ssl, threading, time, urllib.parse  # noqa: F401
+    from PyQt5 import QtCore, QtGui, QtNetwork, QtWidgets, QtWebEngineCore, QtWebEngineWidgets  # noqa: F401
+
+
+def read_request(conn: socket.socket) -> tuple:
+    """Receive a launch request and the client's stdin, stdout and stderr"""
+    data, fds, _, _ = socket.recv_fds(conn, MAX_REQUEST, 3)
+    try:
+        while not data.endswith(b"\n"):
+            chunk = conn.recv(MAX_REQUEST)
+            if not chunk or len(data) > MAX_REQUEST:
+                raise ValueError("incomplete request")
+            data += chunk
+        if len(fds) != 3:
+            raise ValueError("request without standard streams")
+        return json.loads(data), fds
+    except ValueError:
+        for fd in fds:
+            os.close(fd)
+        raise
+
+
+def same_user(conn: socket.socket) -> bool:
+    """Only serve processes of the user running the zygote"""
+    creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    _, uid, _ = struct.unpack("3i", creds)
+    return uid == os.getuid()
+
+
+def run_child(request: dict, fds: list, inherited: list):
+    """Become the requested app (runs in the forked child and never returns)"""
+    code = 1
+    try:
+        # Apps must outlive the zygote and get signals of their own
+        os.setsid()
+        signal.set_wakeup_fd(-1)
+        for signum in (signal.SIGCHLD, signal.SIGTERM):
+            signal.signal(signum, signal.SIG_DFL)
+        for sock in inherited:
+            sock.close()
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+
+        os.environ.clear()
+        os.environ.update(request["env"])
+        os.environ["APPNERA_NO_ZYGOTE"] = "1"
+        os.environ["APPNERA_START_TIME"] = repr(request["start_time"])
+        script = request["script"]
+        # The resource monitor finds zygote children by their working directory
+        os.chdir(os.path.dirname(script))
+        sys.argv = [script, *request["argv"]]
+        runpy.run_path(script, run_name="__main__")
+        code = 0
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            code = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def serve(site_packages: str = "") -> int:
+    """Serve launch requests until terminated"""
+    try:
+        setup_runtime(site_packages)
+    except ImportError as e:
+        print(f"appnera zygote: cannot import Qt ({e})", file=sys.stderr)
+        return 1
+
+    SOCKET_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if SOCKET_DIR.stat().st_uid != os.getuid():
+        print(f"appnera zygote: {SOCKET_DIR} belongs to another user", file=sys.stderr)
+        return 1
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    tmp_path = SOCKET_PATH.with_name(f".{SOCKET_PATH.name}.{os.getpid()}")
+    server.bind(str(tmp_path))
+    os.chmod(tmp_path, 0o600)
+    server.listen(16)
+    # Replace the socket of an older zygote atomically
+    os.replace(tmp_path, SOCKET_PATH)
+    socket_inode = SOCKET_PATH.stat().st_ino
+
+    # SIGCHLD only has to wake up select(); children are reaped in the loop
+    wakeup_r, wakeup_w = socket.socketpair()
+    wakeup_r.setblocking(False)
+    wakeup_w.setblocking(False)
+    signal.set_wakeup_fd(wakeup_w.fileno())
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ)
+    selector.register(wakeup_r, selectors.EVENT_READ)
+    # Connections waiting for the exit status of their app, by pid
+    clients = {}
+    try:
+        while True:
+            for key, _ in selector.select():
+                if key.fileobj is wakeup_r:
+                    try:
+                        wakeup_r.recv(4096)
+                    except BlockingIOError:
+                        pass
+                    reap(clients)
+                    continue
+
+                conn, _ = server.accept()
+                try:
+                    conn.settimeout(REQUEST_TIMEOUT)
+                    if not same_user(conn):
+                        raise ValueError("request from another user")
+                    request, fds = read_request(conn)
+                except (OSError, ValueError):
+                    conn.close()
+                    continue
+
+                sys.stdout.flush()
+                sys.stderr.flush()
+                pid = os.fork()
+                if pid == 0:
+                    selector.close()
+                    run_child(request, fds, [server, wakeup_r, wakeup_w, conn, *clients.values()])
+                for fd in fds:
+                    os.close(fd)
+                try:
+                    conn.sendall(json.dumps({"pid": pid}).encode() + b"\n")
+                    clients[pid] = conn
+                except OSError:
+                    conn.close()
+    finally:
+        # Leave the socket alone if a newer zygote has taken over
+        try:
+            if SOCKET_PATH.stat().st_ino == socket_inode:
+                SOCKET_PATH.unlink()
+        except OSError:
+            pass
+        server.close()
+
+
+def reap(clients: dict):
+    """Collect exited apps and report their status to the waiting launcher"""
+    while True:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        conn = clients.pop(pid, None)
+        if conn is None:
+            continue
+        try:
+            conn.sendall(json.dumps({"status": os.waitstatus_to_exitcode(status)}).encode() + b"\n")
+        except OSError:
+            pass
+        conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Prelaunch Qt for AppNEra apps")
+    parser.add_argument("--site-packages", default="", help="where PyQt5 is installed (default: runtime cache)")
+    sys.exit(serve(parser.parse_args().site_packages))